@@ -9,11 +9,13 @@ import argparse
 from gui.mainWindow import MainWindow
 from qtpy import QtWidgets
 
-qApp = QtWidgets.QApplication(sys.argv)
+if __name__ == '__main__':
+    # guarded, as the worker processes of the sweep pool import this module
+    qApp = QtWidgets.QApplication(sys.argv)
 
-parser = argparse.ArgumentParser(prog='CoatingGUI.py')
-parser.add_argument('-p', '--project', help='open CoatingGUI project file PROJECT')
-args = parser.parse_args()
-Window = MainWindow(vars(args))
-Window.show()
-qApp.exec_()
\ No newline at end of file
+    parser = argparse.ArgumentParser(prog='CoatingGUI.py')
+    parser.add_argument('-p', '--project', help='open CoatingGUI project file PROJECT')
+    args = parser.parse_args()
+    Window = MainWindow(vars(args))
+    Window.show()
+    qApp.exec_()
@@ -0,0 +1,168 @@
+#!/usr/bin/env python
+# This work is licensed under the Creative Commons Attribution-NonCommercial-
+# ShareAlike 4.0 International License. To view a copy of this license, visit
+# http://creativecommons.org/licenses/by-nc-sa/4.0/ or send a letter to Creative
+# Commons, PO Box 1866, Mountain View, CA 94042, USA.
+
+"""
+Headless evaluation of CoatingGUI projects, without importing Qt.
+
+The coating of each project is built by Coating.create_from_config(), as in
+the GUI, and the data of the selected plots is computed from the project's
+plot settings by gui.datasets, as for the plots in the GUI. Projects are
+evaluated in parallel worker processes, since the configuration and
+material library are per-process singletons.
+
+For every project and plot, the arrays are written to <project>.<plot>.npz
+in the output directory, and a row is appended to summary.tsv as soon as
+the project is done.
+"""
+
+import os
+import glob
+import time
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+from coatingtk.coating import Coating
+from coatingtk.materials import MaterialLibrary
+from coatingtk.utils.config import Config
+from . import sweep, datasets
+
+DEFAULT_CONFIG = 'default.cgp'
+SUMMARY_FILE = 'summary.tsv'
+SUMMARY_COLUMNS = ['project', 'status', 'layers', 'thickness', 'Rs', 'Rp',
+                   'Ts', 'Tp', 'plots', 'seconds', 'message']
+
+
+def load_project(filename):
+    """Loads a project into the configuration of this process."""
+    config = Config.Instance()
+    config.load_default(DEFAULT_CONFIG)
+    config.load(filename)
+    MaterialLibrary.Instance().load_materials()
+    return config
+
+
+def evaluate_project(filename, name, plots, output):
+    """
+    Evaluates plots (a list of plot names, or None for the project's own
+    plot type) of the project in filename, writes their data to output and
+    returns the project's summary row.
+    """
+    start = time.time()
+    row = dict.fromkeys(SUMMARY_COLUMNS, '')
+    row['project'] = filename
+    try:
+        config = load_project(filename)
+        coating = Coating.create_from_config(config)
+        plots = plots or [config.get('plot.plottype')]
+
+        lambda0 = config.get('coating.lambda0')
+        AOI = config.get('coating.AOI')
+        result = sweep.solve(coating, lambda0, AOI)
+        R = result.reflectivity()
+        T = result.transmission()
+        row.update(layers=len(coating.layers),
+                   thickness='{0:.6g}'.format(np.sum(sweep.stack_thicknesses(coating))),
+                   Rs='{0:.9g}'.format(R[0]), Rp='{0:.9g}'.format(R[1]),
+                   Ts='{0:.9g}'.format(T[0]), Tp='{0:.9g}'.format(T[1]))
+
+        for plot in plots:
+            data = datasets.compute(plot, coating, config.view('plot.'+plot))
+            data.save(os.path.join(output, '{0}.{1}.npz'.format(name, plot)))
+        row.update(status='ok', plots=','.join(plots))
+    except Exception as e:
+        row.update(status='error', message=str(e).replace('\t', ' ').replace('\n', ' '))
+    row['seconds'] = '{0:.2f}'.format(time.time() - start)
+    return row
+
+
+def expand_projects(patterns):
+    """Project files matching patterns, in order and without duplicates."""
+    projects = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern)) or [pattern]
+        projects += [p for p in matches if p not in projects]
+    return projects
+
+
+def output_names(projects):
+    """Unique output file stems for projects, based on their file names."""
+    names = []
+    for p in projects:
+        name = stem = os.path.splitext(os.path.basename(p))[0]
+        ii = 1
+        while name in names:
+            ii += 1
+            name = '{0}_{1}'.format(stem, ii)
+        names.append(name)
+    return names
+
+
+def run(projects, output, plots=None, jobs=None, report=None):
+    """
+    Evaluates all projects with jobs worker processes and writes the results
+    to the directory output. report, if given, is called with each summary
+    row as it is written. Returns the number of failed projects.
+    """
+    if not os.path.isdir(output):
+        os.makedirs(output)
+    jobs = jobs or os.cpu_count() or 1
+    failed = 0
+    with open(os.path.join(output, SUMMARY_FILE), 'w') as fp:
+        fp.write('\t'.join(SUMMARY_COLUMNS) + '\n')
+
+        def write(row):
+            fp.write('\t'.join(str(row[c]) for c in SUMMARY_COLUMNS) + '\n')
+            fp.flush()
+            if report:
+                report(row)
+            return row['status'] != 'ok'
+
+        tasks = list(zip(projects, output_names(projects)))
+        if jobs == 1:
+            for filename, name in tasks:
+                failed += write(evaluate_project(filename, name, plots, output))
+            return failed
+
+        with ProcessPoolExecutor(min(jobs, len(tasks) or 1),
+                mp_context=multiprocessing.get_context('spawn')) as pool:
+            futures = [pool.submit(evaluate_project, filename, name, plots, output)
+                       for filename, name in tasks]
+            for f in as_completed(futures):
+                failed += write(f.result())
+    return failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='CoatingBatch.py',
+        description='Evaluates the plot data of CoatingGUI projects without the GUI.')
+    parser.add_argument('projects', nargs='+',
+        help='project files or glob patterns, e.g. "designs/*.cgp"')
+    parser.add_argument('-o', '--output', default='batch',
+        help='output directory (default: batch)')
+    parser.add_argument('-p', '--plots',
+        help='comma-separated plot types, or "all"; by default the plot type '
+             'selected in each project')
+    parser.add_argument('-j', '--jobs', type=int,
+        help='number of worker processes (default: number of cores)')
+    args = parser.parse_args(argv)
+
+    plots = None
+    if args.plots == 'all':
+        plots = sorted(datasets.evaluators)
+    elif args.plots:
+        plots = args.plots.split(',')
+        unknown = [p for p in plots if p not in datasets.evaluators]
+        if unknown:
+            parser.error('unknown plot types: ' + ', '.join(unknown))
+
+    projects = expand_projects(args.projects)
+    def report(row):
+        print('{0}\t{1}\t{2}'.format(row['status'], row['project'], row['message']))
+    failed = run(projects, args.output, plots, args.jobs, report)
+    print('{0} of {1} projects evaluated, results in {2}'.format(
+        len(projects) - failed, len(projects), args.output))
+    return 1 if failed else 0
@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+# This work is licensed under the Creative Commons Attribution-NonCommercial-
+# ShareAlike 4.0 International License. To view a copy of this license, visit
+# http://creativecommons.org/licenses/by-nc-sa/4.0/ or send a letter to Creative
+# Commons, PO Box 1866, Mountain View, CA 94042, USA.
+
+import hashlib
+import json
+from collections import OrderedDict
+import numpy as np
+
+# default memory budget of ResultCache, in bytes
+CACHE_BYTES = 256 << 20
+
+
+def fingerprint(*items):
+    """Stable hash of JSON-like items, independent of dict ordering."""
+    data = json.dumps(items, sort_keys=True, default=repr)
+    return hashlib.sha1(data.encode('utf-8')).hexdigest()
+
+
+def material_definitions(coating):
+    """Definitions of all distinct materials in coating, keyed by name."""
+    media = ([coating.superstrate, coating.substrate] +
+             [l.material for l in coating.layers])
+    return dict((str(m.name), m.save()) for m in media)
+
+
+def nbytes(value):
+    """
+    Memory held by the arrays of a Dataset, including top-level arrays of
+    its result object, in bytes. Other values count as 0.
+    """
+    arrays = list(getattr(value, 'arrays', {}).values())
+    result = getattr(value, 'result', None)
+    if hasattr(result, '__dict__'):
+        arrays += list(vars(result).values())
+    return sum(a.nbytes for a in arrays if isinstance(a, np.ndarray))
+
+
+class ResultCache(object):
+    """
+    LRU cache of computed plot data, bounded by the memory of its arrays.
+
+    Entries are keyed by a fingerprint of the coating definition, the
+    materials it uses and the plot's configuration, so returning to an
+    earlier state finds its result again. The fingerprint of the current
+    state is memoised per plot until invalidate() is called, which should
+    happen whenever the configuration or a material changes.
+
+    Least recently used entries are evicted until the arrays of all entries
+    take at most maxbytes, see nbytes(); the most recent entry is always
+    kept, even if it exceeds the budget on its own.
+    """
+
+    def __init__(self, maxbytes=CACHE_BYTES):
+        self.maxbytes = maxbytes
+        self.entries = OrderedDict()
+        self.sizes = {}
+        self.size = 0
+        self.current_keys = {}
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, plot, config, coating):
+        if plot not in self.current_keys:
+            self.current_keys[plot] = fingerprint(plot,
+                config.get('coating'), config.get('plot.'+plot),
+                material_definitions(coating))
+        return self.current_keys[plot]
+
+    def invalidate(self):
+        self.current_keys.clear()
+
+    def get(self, key):
+        try:
+            value = self.entries.pop(key)
+        except KeyError:
+            self.misses += 1
+            return None
+        self.entries[key] = value
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        self.remove(key)
+        self.entries[key] = value
+        self.sizes[key] = nbytes(value)
+        self.size += self.sizes[key]
+        while self.size > self.maxbytes and len(self.entries) > 1:
+            self.remove(next(iter(self.entries)))
+
+    def remove(self, key):
+        if key in self.entries:
+            del self.entries[key]
+            self.size -= self.sizes.pop(key)
+
+    def clear(self):
+        self.entries.clear()
+        self.sizes.clear()
+        self.size = 0
+        self.invalidate()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+# This work is licensed under the Creative Commons Attribution-NonCommercial-
+# ShareAlike 4.0 International License. To view a copy of this license, visit
+# http://creativecommons.org/licenses/by-nc-sa/4.0/ or send a letter to Creative
+# Commons, PO Box 1866, Mountain View, CA 94042, USA.
+
+"""
+Tabulated refractive index data with a compiled binary cache.
+
+Parsing large ASCII data files is slow, so the sorted data is kept in a
+memory-mappable .npy sidecar next to the data file. The sidecar holds a
+(2, N+1) float64 array: the first column stores the size and modification
+time of the data file it was compiled from, the remaining columns the x
+and y values.
+"""
+
+import os
+import threading
+import numpy as np
+from coatingtk.utils import UnreadableFile, UnexpectedFileLayout
+
+
+def sidecar_name(filename):
+    return filename + '.npy'
+
+
+def file_signature(filename):
+    st = os.stat(filename)
+    return float(st.st_size), float(st.st_mtime)
+
+
+def parse(filename):
+    """Reads a two-column ASCII file and returns its rows sorted by x."""
+    try:
+        data = np.loadtxt(filename, ndmin=2)
+    except IOError as e:
+        raise UnreadableFile(str(e))
+    except ValueError as e:
+        raise UnexpectedFileLayout(str(e))
+    if data.shape[1] != 2 or data.shape[0] == 0:
+        raise UnexpectedFileLayout(
+            '{0} does not contain two columns of data'.format(filename))
+    x, index = np.unique(data[:,0], return_index=True)
+    return x, data[index,1]
+
+
+def load_sidecar(filename, signature):
+    try:
+        data = np.load(sidecar_name(filename), mmap_mode='r')
+    except (IOError, ValueError):
+        return None
+    if data.ndim != 2 or data.shape[0] != 2 or tuple(data[:,0]) != signature:
+        return None
+    return data[0,1:], data[1,1:]
+
+
+def save_sidecar(filename, signature, x, y):
+    data = np.empty((2, len(x) + 1))
+    data[:,0] = signature
+    data[0,1:] = x
+    data[1,1:] = y
+    sidecar = sidecar_name(filename)
+    tmp = sidecar + '.tmp'
+    try:
+        with open(tmp, 'wb') as fp:
+            np.save(fp, data)
+        os.replace(tmp, sidecar)
+    except (IOError, OSError):
+        # read-only location, just go without the cache
+        pass
+
+
+class TabulatedData(object):
+    """
+    Linearly interpolated (x, y) data from a file, held constant beyond
+    the tabulated range.
+
+    value() accepts arrays and uses a binary search over the sorted x
+    values with precomputed slopes, instead of one interpolation per point.
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        try:
+            self.signature = file_signature(filename)
+        except OSError as e:
+            raise UnreadableFile(str(e))
+        data = load_sidecar(filename, self.signature)
+        if data is None:
+            data = parse(filename)
+            save_sidecar(filename, self.signature, *data)
+        self.x, self.y = data
+        if len(self.x) > 1:
+            self.slope = np.diff(self.y) / np.diff(self.x)
+
+    def value(self, x):
+        x = np.asarray(x, dtype=float)
+        if len(self.x) == 1:
+            return np.full(x.shape, self.y[0])
+        x = np.clip(x, self.x[0], self.x[-1])
+        i = np.clip(np.searchsorted(self.x, x, side='right') - 1,
+                    0, len(self.x) - 2)
+        return self.y[i] + self.slope[i] * (x - self.x[i])
+
+    def is_current(self):
+        try:
+            return file_signature(self.filename) == self.signature
+        except OSError:
+            return False
+
+
+_tables = {}
+_tables_lock = threading.Lock()
+
+
+def tabulated(filename):
+    """Returns the TabulatedData of filename, reloading it if the file changed."""
+    key = os.path.abspath(filename)
+    with _tables_lock:
+        table = _tables.get(key)
+    if table is None or not table.is_current():
+        table = TabulatedData(filename)
+        with _tables_lock:
+            _tables[key] = table
+    return table
@@ -0,0 +1,301 @@
+#!/usr/bin/env python
+# This work is licensed under the Creative Commons Attribution-NonCommercial-
+# ShareAlike 4.0 International License. To view a copy of this license, visit
+# http://creativecommons.org/licenses/by-nc-sa/4.0/ or send a letter to Creative
+# Commons, PO Box 1866, Mountain View, CA 94042, USA.
+
+"""
+Plot data, computed without Qt or matplotlib.
+
+compute(name, coating, config) evaluates the plot type name for a coating,
+with config the plot's view of the project configuration (plot.<name>), and
+returns a Dataset. The plots in gui/plots draw datasets, the batch command
+saves their arrays, and scripts can call compute() directly:
+
+    config = Config.Instance()
+    config.load('design.cgp')
+    coating = Coating.create_from_config(config)
+    data = datasets.compute('r_lambda', coating, config.view('plot.r_lambda'))
+    data['wavelengths'], data['R']
+
+All evaluators take the same keyword arguments: progress is called with the
+completed fraction, backend is the process pool for large sweeps, solver an
+IncrementalSolver for uniform spectral sweeps and max_steps an upper limit
+for the number of sample points, e.g. for quick previews.
+"""
+
+import numpy as np
+from . import sweep, fields, tolerance
+
+
+class Dataset(object):
+    """
+    The data of one plot: named NumPy arrays at full resolution, metadata
+    such as lambda0 and the axis limits, and the result object of the
+    solver for anything the arrays don't hold.
+    """
+
+    def __init__(self, arrays, meta=None, result=None, plot=None):
+        self.arrays = arrays
+        self.meta = meta or {}
+        self.result = result
+        self.plot = plot
+
+    def __getitem__(self, key):
+        return self.arrays[key]
+
+    def __contains__(self, key):
+        return key in self.arrays
+
+    def save(self, filename):
+        """Writes the arrays to a compressed .npz file."""
+        np.savez_compressed(filename, **self.arrays)
+
+
+def steps(config, key='xaxis.steps', max_steps=None):
+    steps = config.get(key)
+    if max_steps:
+        steps = min(steps, max_steps)
+    return steps
+
+
+def wavelength_limits(config):
+    lambda0 = config.parent.get('coating.lambda0')
+    if config.get('xaxis.limits') == 'auto':
+        return [0.7 * lambda0, 1.3 * lambda0]
+    return [config.get('xaxis.min'), config.get('xaxis.max')]
+
+
+def angle_limits(config, axis='xaxis'):
+    AOI = config.parent.get('coating.AOI')
+    if config.get(axis + '.limits') == 'auto':
+        return [0.0, min(max(60, AOI+5), 80)]
+    return [config.get(axis + '.min'), config.get(axis + '.max')]
+
+
+def frequency_limits(config):
+    """Frequency limits and the decades spanned by the logarithmic sweep."""
+    if config.get('xaxis.limits') == 'auto':
+        return [1, 1e4], [0, 4]
+    xlim = [config.get('xaxis.min'), config.get('xaxis.max')]
+    return xlim, [np.floor(np.log10(xlim[0])), np.ceil(np.log10(xlim[1]))]
+
+
+def shift_range(config, max_steps=None):
+    """Thickness changes in percent for the shift map."""
+    lo, hi, step = [config.get('shift.' + k) for k in ['min', 'max', 'step']]
+    rows = int(round((hi - lo) / step)) + 1 if step > 0 else 1
+    if max_steps:
+        rows = min(rows, max_steps)
+    return np.linspace(lo, hi, max(rows, 2))
+
+
+def sample(coating, config, limits, grid, progress=None, backend=None,
+           solver=None, max_steps=None):
+    """
+    Solves coating for sample points X within limits, where grid(X)
+    returns the corresponding (wavelengths, AOI). The points are spaced
+    uniformly or, if selected in the options, adaptively with steps as
+    the point budget. Adaptive grids change from one update to the
+    next, so they bypass the incremental solver.
+    """
+    budget = steps(config, max_steps=max_steps)
+    if config.get('xaxis.sampling') == 'adaptive':
+        def solve(X):
+            return sweep.solve(coating, *grid(X), backend=backend)
+        return sweep.adaptive_sweep(solve, limits, budget, progress=progress)
+    X = np.linspace(*limits, num=budget)
+    if solver is not None:
+        return solver.solve(coating, *grid(X), progress=progress,
+                            backend=backend)
+    return sweep.solve(coating, *grid(X), progress=progress, backend=backend)
+
+
+def spectral_dataset(result, meta):
+    return Dataset({'wavelengths': result.wavelengths,
+                    'R': result.reflectivity(),
+                    'T': result.transmission(),
+                    'phase': result.phase()}, meta, result)
+
+
+def spectral_grid(config, X):
+    return X, config.parent.get('coating.AOI')
+
+
+def spectral_data(coating, config, progress=None, backend=None, solver=None,
+                  max_steps=None):
+    xlim = wavelength_limits(config)
+    result = sample(coating, config, xlim, lambda X: spectral_grid(config, X),
+                    progress, backend, solver, max_steps)
+    return spectral_dataset(result, {'lambda0': config.parent.get('coating.lambda0'),
+                                     'AOI': config.parent.get('coating.AOI'),
+                                     'xlim': xlim})
+
+
+def angle_dataset(result, meta):
+    return Dataset({'AOI': result.AOI, 'R': result.reflectivity(),
+                    'T': result.transmission()}, meta, result)
+
+
+def angle_grid(config, X):
+    return config.parent.get('coating.lambda0'), X
+
+
+def angle_data(coating, config, progress=None, backend=None, solver=None,
+               max_steps=None):
+    xlim = angle_limits(config)
+    result = sample(coating, config, xlim, lambda X: angle_grid(config, X),
+                    progress, backend, solver, max_steps)
+    return angle_dataset(result, {'lambda0': config.parent.get('coating.lambda0'),
+                                  'AOI': config.parent.get('coating.AOI'),
+                                  'xlim': xlim})
+
+
+def efi_data(coating, config, progress=None, backend=None, solver=None,
+             max_steps=None):
+    wavelength = config.get('analysis.lambda')
+    result = fields.efi(coating, wavelength, steps(config, max_steps=max_steps),
+                        config.parent.get('coating.AOI'), progress=progress,
+                        backend=backend)
+    return Dataset({'depths': result.depths, 'efi': result.efi,
+                    'thicknesses': result.thicknesses,
+                    'indices': np.real(np.array(result.indices))},
+                   {'lambda': wavelength}, result)
+
+
+def efi_map_data(coating, config, progress=None, backend=None, solver=None,
+                 max_steps=None):
+    X = np.linspace(*wavelength_limits(config),
+                    num=steps(config, max_steps=max_steps))
+    result = fields.efi(coating, X, config.get('analysis.steps'),
+                        config.parent.get('coating.AOI'), progress=progress,
+                        backend=backend)
+    return Dataset({'wavelengths': X, 'depths': result.depths,
+                    'efi': result.efi.astype(np.float32),
+                    'thicknesses': result.thicknesses},
+                   {'lambda0': config.parent.get('coating.lambda0')}, result)
+
+
+def r_map_data(coating, config, progress=None, backend=None, solver=None,
+               max_steps=None):
+    X = np.linspace(*wavelength_limits(config),
+                    num=steps(config, max_steps=max_steps))
+    Y = np.linspace(*angle_limits(config, 'yaxis'),
+                    num=steps(config, 'yaxis.steps', max_steps))
+    result = sweep.reflectivity_map(coating, X, Y, progress=progress,
+                                    backend=backend)
+    return Dataset({'wavelengths': X, 'AOI': Y, 'R': result.R},
+                   {'lambda0': config.parent.get('coating.lambda0'),
+                    'AOI': config.parent.get('coating.AOI')}, result)
+
+
+def shift_map_data(coating, config, progress=None, backend=None, solver=None,
+                   max_steps=None):
+    X = np.linspace(*wavelength_limits(config),
+                    num=steps(config, max_steps=max_steps))
+    shifts = shift_range(config, max_steps)
+    result = sweep.shift_map(coating, X, 1.0 + shifts / 100.0,
+                             config.parent.get('coating.AOI'),
+                             progress=progress, backend=backend)
+    return Dataset({'wavelengths': X, 'shifts': shifts,
+                    'R': result.R},
+                   {'lambda0': config.parent.get('coating.lambda0')}, result)
+
+
+def tolerance_data(coating, config, progress=None, backend=None, solver=None,
+                   max_steps=None):
+    X = np.linspace(*wavelength_limits(config),
+                    num=steps(config, max_steps=max_steps))
+    sigma_d, sigma_n = tolerance.error_model(coating,
+        config.get('analysis.thickness'), config.get('analysis.index'),
+        config.get('errors.materials'), config.get('errors.layers'))
+    samples = steps(config, 'analysis.samples', max_steps)
+    lambda0 = config.parent.get('coating.lambda0')
+    result = tolerance.analyse(coating, X, lambda0,
+                               config.parent.get('coating.AOI'), sigma_d, sigma_n,
+                               samples, config.get('analysis.seed'),
+                               progress=progress, backend=backend)
+    # percentiles over samples of s, p and their average, along the last axis
+    percentiles = np.array([5, 25, 50, 75, 95])
+    R = np.concatenate((result.R, result.R.mean(axis=-1, keepdims=True)), axis=-1)
+    return Dataset({'wavelengths': X, 'nominal': result.nominal,
+                    'nominal0': result.nominal0,
+                    'percentiles': percentiles,
+                    'R': np.percentile(R, percentiles, axis=0),
+                    'R0': result.R0},
+                   {'lambda0': lambda0}, result)
+
+
+def brownian_noise_data(coating, config, progress=None, backend=None,
+                        solver=None, max_steps=None):
+    k = 1.3806503e-23
+    temperature = config.get('analysis.temperature')
+    beam_size = config.get('analysis.beam_size') * 1e-6
+    xlim, xloglim = frequency_limits(config)
+    X = np.logspace(*xloglim, num=steps(config, max_steps=max_steps))
+    S = 2 * k * temperature / (np.sqrt(np.pi ** 3) * X * beam_size *
+        coating.substrate.Y) * (1 - coating.substrate.sigma ** 2) * coating.phi(beam_size)
+    return Dataset({'frequency': X, 'noise': np.sqrt(S)},
+                   {'xlim': xlim})
+
+
+evaluators = {
+    'r_lambda': spectral_data,
+    'phase': spectral_data,
+    'r_angle': angle_data,
+    'EFI': efi_data,
+    'efi_map': efi_map_data,
+    'r_map': r_map_data,
+    'shift_map': shift_map_data,
+    'tolerance': tolerance_data,
+    'brownian_noise': brownian_noise_data,
+}
+
+
+# plot types that refine() can add samples to: the name of the sweep axis,
+# the sweep grid for sample points X and the function building the Dataset
+refiners = {
+    'r_lambda': ('wavelengths', spectral_grid, spectral_dataset),
+    'phase': ('wavelengths', spectral_grid, spectral_dataset),
+    'r_angle': ('AOI', angle_grid, angle_dataset),
+}
+
+
+def needs_refinement(data, limits, points):
+    """
+    Whether the view limits of a zoomed-in plot hold fewer than half of
+    points samples of data, for the plot types in refiners.
+    """
+    if data.plot not in refiners:
+        return False
+    X = data[refiners[data.plot][0]]
+    lo, hi = max(limits[0], X[0]), min(limits[1], X[-1])
+    if lo >= hi or (lo == X[0] and hi == X[-1]):
+        return False
+    inside = np.searchsorted(X, hi, 'right') - np.searchsorted(X, lo, 'left')
+    return inside < points / 2
+
+
+def refine(data, coating, config, limits, points, progress=None, backend=None):
+    """
+    Returns data with points more samples spread uniformly over limits,
+    within the range of the original sweep. data has to be a Dataset of a
+    plot type in refiners, for the same coating and config.
+    """
+    key, grid, build = refiners[data.plot]
+    X = getattr(data.result, key)
+    lo, hi = max(limits[0], X[0]), min(limits[1], X[-1])
+    result = sweep.solve(coating, *grid(config, np.linspace(lo, hi, points)),
+                         progress=progress, backend=backend)
+    merged = sweep.concatenate([data.result, result])
+    _, index = np.unique(getattr(merged, key), return_index=True)
+    refined = build(sweep.take(merged, index), data.meta)
+    refined.plot = data.plot
+    return refined
+
+
+def compute(name, coating, config, **options):
+    """Computes the Dataset of plot type name; see the module docstring."""
+    data = evaluators[name](coating, config, **options)
+    data.plot = name
+    return data
@@ -0,0 +1,156 @@
+#!/usr/bin/env python
+# This work is licensed under the Creative Commons Attribution-NonCommercial-
+# ShareAlike 4.0 International License. To view a copy of this license, visit
+# http://creativecommons.org/licenses/by-nc-sa/4.0/ or send a letter to Creative
+# Commons, PO Box 1866, Mountain View, CA 94042, USA.
+
+"""
+Batched electric field intensity (EFI) inside coatings.
+
+The tangential fields at every interface follow from one backward pass of
+characteristic matrices from the substrate to the superstrate; the field at
+any depth is then the field at the next interface below, propagated by the
+characteristic matrix of the remaining distance. Both polarisations and all
+wavelengths are handled at once.
+
+The EFI is |E|^2 normalised to the incident wave, including the normal
+field component for p polarisation. Depth 0 is the superstrate interface,
+and depths are in nm.
+
+At normal incidence this is the EFI of the per-wavelength stack.efi() of
+coatingtk. For p polarisation at oblique incidence it deliberately differs:
+the field normal to the layers is added to the tangential one, and the
+incident intensity is that of the full field, the tangential one divided
+by |cos(theta0)|^2, so that s and p are normalised alike. Layers are
+sampled with a fixed number of points per layer ("Steps per Layer").
+"""
+
+import numpy as np
+from .sweep import admittance, stack_indices, stack_thicknesses, MAP_CHUNK_POINTS
+
+
+class FieldResult(object):
+    """
+    EFI of a coating over depths and a wavelength grid. efi has shape
+    (2, len(depths)) + grid shape, for s and p polarisation.
+    """
+
+    def __init__(self, depths, wavelengths, AOI, efi, indices, thicknesses):
+        self.depths = depths
+        self.wavelengths = wavelengths
+        self.AOI = AOI
+        self.efi = efi
+        self.indices = indices
+        self.thicknesses = thicknesses
+
+
+def depth_grid(thicknesses, steps, margins=(0.0, 0.0)):
+    """
+    Sample depths with steps points per layer, plus steps points each over
+    the given distances into the superstrate and substrate.
+    """
+    thicknesses = np.asarray(thicknesses, dtype=float)
+    bounds = np.concatenate(([0.0], np.cumsum(thicknesses)))
+    fractions = np.arange(steps, dtype=float) / steps
+    layers = bounds[:-1,np.newaxis] + thicknesses[:,np.newaxis] * fractions
+    return np.concatenate((-margins[0] * (1.0 - fractions),
+                           layers.ravel(),
+                           bounds[-1] + margins[1] * np.linspace(0, 1, steps)))
+
+
+def field_intensity(indices, thicknesses, wavelengths, depths, AOI=0.0):
+    """
+    EFI at depths for s and p polarisation, as an array of shape
+    (2, len(depths)) + grid shape, where the grid is the broadcast shape of
+    wavelengths, AOI and the indices of all media.
+    """
+    wavelengths = np.asarray(wavelengths, dtype=float)
+    depths = np.asarray(depths, dtype=float)
+    thicknesses = np.asarray(thicknesses, dtype=float)
+    N = len(thicknesses)
+    n_sin = np.asarray(indices[0], dtype=complex) * np.sin(np.radians(AOI))
+    grid = np.broadcast_shapes(*[np.shape(a) for a in [wavelengths, n_sin] + list(indices)])
+
+    n = np.array([np.broadcast_to(np.asarray(i, dtype=complex), grid)
+                  for i in indices])
+    cos, eta = admittance(n, n_sin)
+    eta = np.moveaxis(eta, 0, 1)
+    k = 2 * np.pi * n * cos / wavelengths
+
+    # tangential fields at each interface, from substrate to superstrate
+    E = np.empty((N + 1, 2) + grid, dtype=complex)
+    H = np.empty_like(E)
+    E[N] = 1.0
+    H[N] = eta[N+1]
+    for j in range(N, 0, -1):
+        phase = k[j] * thicknesses[j-1]
+        c = np.cos(phase)
+        s = 1j * np.sin(phase)
+        E[j-1] = c * E[j] + s / eta[j] * H[j]
+        H[j-1] = s * eta[j] * E[j] + c * H[j]
+
+    # propagate from the interface below each depth (for the substrate, the
+    # last interface) over the remaining distance
+    bounds = np.concatenate(([0.0], np.cumsum(thicknesses)))
+    medium = np.searchsorted(bounds, depths, side='right')
+    below = np.minimum(medium, N)
+    distance = (bounds[below] - depths).reshape((-1,) + (1,) * len(grid))
+    phase = (k[medium] * distance)[:,np.newaxis]
+    c = np.cos(phase)
+    s = 1j * np.sin(phase)
+    Ez = c * E[below] + s / eta[medium] * H[below]
+    Hz = s * eta[medium] * E[below] + c * H[below]
+
+    # incident tangential field and its total amplitude
+    E_inc = (eta[0] * E[0] + H[0]) / (2 * eta[0])
+    I_inc = np.abs(E_inc)**2
+    I_inc[1] /= np.abs(cos[0])**2
+
+    efi = np.abs(Ez)**2
+    efi[:,1] += np.abs(n_sin * Hz[:,1] / n[medium]**2)**2
+    return np.moveaxis(efi / I_inc, 1, 0)
+
+
+def efi(coating, wavelengths, steps, AOI=0.0, margins=None, progress=None,
+        backend=None):
+    """
+    FieldResult of coating at steps points per layer over wavelengths.
+    By default, half a wavelength of superstrate and substrate is included.
+    Grids over 1D wavelengths are solved in blocks of wavelengths; progress
+    is called with the completed fraction after each block. If given,
+    backend splits large grids across its worker processes.
+    """
+    wavelengths = np.asarray(wavelengths, dtype=float)
+    indices = stack_indices(coating, wavelengths)
+    thicknesses = stack_thicknesses(coating)
+    if margins is None:
+        lambda_max = np.max(wavelengths)
+        margins = (0.5 * lambda_max / np.max(np.real(indices[0])),
+                   0.5 * lambda_max / np.max(np.real(indices[-1])))
+    depths = depth_grid(thicknesses, steps, margins)
+    if wavelengths.ndim != 1 or np.ndim(AOI) != 0:
+        I = field_intensity(indices, thicknesses, wavelengths, depths, AOI)
+        if progress:
+            progress(1.0)
+        return FieldResult(depths, wavelengths, AOI, I, indices, thicknesses)
+
+    shape = (2, len(depths), len(wavelengths))
+    use_backend = backend and backend.parallel(len(depths) * len(wavelengths))
+    if use_backend:
+        parts = backend.blocks(len(wavelengths))
+    else:
+        columns = max(1, MAP_CHUNK_POINTS // len(depths))
+        parts = [slice(w, w+columns) for w in range(0, len(wavelengths), columns)]
+    blocks = [((slice(None), slice(None), b), field_intensity,
+               ([n[b] for n in indices], thicknesses, wavelengths[b],
+                depths, AOI))
+              for b in parts]
+    if use_backend:
+        I = backend.fill(shape, float, blocks, progress)
+    else:
+        I = np.empty(shape)
+        for ii, (index, func, args) in enumerate(blocks):
+            I[index] = func(*args)
+            if progress:
+                progress(float(ii + 1) / len(blocks))
+    return FieldResult(depths, wavelengths, AOI, I, indices, thicknesses)
@@ -9,16 +9,27 @@ import re
 
 from qtpy.QtCore import *
 from qtpy.QtGui import *
-from qtpy.QtWidgets import QMainWindow, QTableWidgetItem, QMessageBox, QFileDialog
+from qtpy.QtWidgets import QMainWindow, QHeaderView, QMessageBox, QFileDialog, QProgressBar, QPushButton
 from qtpy import uic
 from coatingtk.materials import MaterialLibrary
 from coatingtk.coating import Coating
 from coatingtk.utils.config import Config
 
-from . import __version__, version_string, newer_version, plothandler, wizard
+from . import __version__, version_string, newer_version, plothandler, wizard, parallel, sweep, datasets
 from .helpers import export_data, block_signals, float_set_from_lineedit, export_stack_formula
 from .materialDialog import MaterialDialog
 from .wizard import Wizard
+from .worker import PlotWorker, RefineWorker
+from .cache import ResultCache
+from .stackmodel import StackModel
+from .plots.blit import BlitManager
+
+# delay after the last edit before a live update, and the number of
+# sweep points for the quick preview that is drawn first
+LIVE_UPDATE_DELAY = 30
+LIVE_PREVIEW_STEPS = 200
+# delay after the last zoom or pan before the visible range is refined
+REFINE_DELAY = 300
 
 def add_extension_if_missing(filename, ext):
     if filename.endswith(ext):
@@ -40,6 +51,23 @@ class MainWindow(QMainWindow):
 
         cid = self.pltMain.figure.canvas.mpl_connect('motion_notify_event', 
             lambda ev: self.mpl_on_mouse_move(ev))
+        self.pltMain.figure.canvas.mpl_connect('button_press_event',
+            lambda ev: self.mpl_on_click(ev))
+        self.rendered_plot = None
+        self.rendered_data = None
+        self.rendered_key = None
+        self.blitter = BlitManager(self.pltMain.figure.canvas)
+
+        self.worker = None
+        self.cache = ResultCache()
+        self.live_timer = QTimer(self)
+        self.live_timer.setSingleShot(True)
+        self.live_timer.setInterval(LIVE_UPDATE_DELAY)
+        self.live_timer.timeout.connect(self.live_update)
+        self.refine_timer = QTimer(self)
+        self.refine_timer.setSingleShot(True)
+        self.refine_timer.setInterval(REFINE_DELAY)
+        self.refine_timer.timeout.connect(self.refine_view)
 
         self.update_title('untitled')
         self.config.set_callback(self.handle_modified)
@@ -54,6 +82,12 @@ class MainWindow(QMainWindow):
             except IOError as e:
                 QMessageBox.critical(self, 'Could not open file', str(e))
         
+        self.stack = StackModel(self, self.parse_thickness)
+        self.stack.dataChanged.connect(self.handle_stack_changed)
+        self.stack.conversion_failed.connect(self.float_conversion_error)
+        self.tblStack.setModel(self.stack)
+        self.tblStack.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+
         self.initialise_plotoptions()
         self.initialise_materials()
         self.initialise_stack()
@@ -63,6 +97,15 @@ class MainWindow(QMainWindow):
             geometry = QByteArray.fromHex(self.config.get('window_geometry').encode())
             self.restoreGeometry(geometry)
 
+        self.prgCompute = QProgressBar(self.stbStatus)
+        self.prgCompute.setRange(0, 100)
+        self.prgCompute.setMaximumWidth(150)
+        self.btnCancel = QPushButton('Cancel', self.stbStatus)
+        self.btnCancel.clicked.connect(self.cancel_worker)
+        self.stbStatus.addPermanentWidget(self.prgCompute)
+        self.stbStatus.addPermanentWidget(self.btnCancel)
+        self.show_progress(False)
+
         self.stbStatus.showMessage(version_string)
 
     def update_title(self, filename=None, changed=False):
@@ -104,34 +147,21 @@ class MainWindow(QMainWindow):
         self.txtLambda0.setText(str(self.config.get('coating.lambda0')))
         self.txtAOI.setText(str(self.config.get('coating.AOI')))
 
-        layers = self.config.get('coating.layers')
-        self.tblStack.setRowCount(len(layers))
-        self.tblStack.setColumnCount(2)
-        self.prototype = QTableWidgetItem('0')
-        self.prototype.setTextAlignment(Qt.AlignRight)
-        self.tblStack.setItemPrototype(self.prototype)
-        with block_signals(self.tblStack) as tbl:
-            for ii in range(len(layers)):
-                tt = QTableWidgetItem(str(layers[ii][1]))
-                it = QTableWidgetItem(str(layers[ii][0]))
-                tt.setTextAlignment(Qt.AlignRight)
-                it.setTextAlignment(Qt.AlignRight)
-                tbl.setItem(ii,1,tt)
-                tbl.setItem(ii,0,it)
+        self.stack.set_stack(self.config.get('coating.layers'),
+                             self.config.get('coating.blocks') or [])
+
+    def get_stack(self):
+        """Layers and groups of repeated layers in the table."""
+        return self.stack.get_stack()
 
     def get_layers(self):
-        stack_d = []
-        stack_n = []
-        for row in range(self.tblStack.rowCount()):
-            item_d = self.tblStack.item(row, 1)
-            item_n = self.tblStack.item(row, 0)
-            if item_d and item_n:
-                try:
-                    stack_d.append(float(item_d.text()))
-                    stack_n.append(str(item_n.text()))
-                except ValueError:
-                    self.float_conversion_error(str(item_d.text()))
-        return map(list, zip(stack_n, stack_d))
+        return self.get_stack()[0]
+
+    def store_stack(self):
+        layers, blocks = self.get_stack()
+        self.stack.blocks_changed = False
+        self.config.set('coating.layers', layers)
+        self.config.set('coating.blocks', blocks)
 
     def build_coating(self):
         return Coating.create_from_config(self.config)
@@ -144,8 +174,97 @@ class MainWindow(QMainWindow):
             if reply == QMessageBox.No:
                 event.ignore()
                 return
+        self.cancel_worker()
+        parallel.backend.shutdown()
         event.accept()
 
+    def update_plot(self, preview=False):
+        """
+        Draws the selected plot, from the cache if possible. With preview,
+        a coarse version is drawn first and errors are not reported.
+        """
+        try:
+            coating = self.build_coating()
+        except materials.MaterialNotDefined as e:
+            if not preview:
+                QMessageBox.critical(self, 'Material Error', str(e))
+            return
+        idx = self.cbPlotType.currentIndex()
+        plot = str(self.cbPlotType.itemData(idx))
+
+        klass = self.plots[plot]['plotter']
+        key = self.cache.key(plot, self.config, coating)
+        data = self.cache.get(key)
+        if data is not None:
+            self.cancel_worker()
+            self.render_plot(klass(), data, key)
+            return
+
+        full = klass()
+        if preview and full.steps() > LIVE_PREVIEW_STEPS:
+            coarse = klass()
+            coarse.max_steps = LIVE_PREVIEW_STEPS
+            self.start_worker(coarse, coating, followup=(full, coating, key))
+        else:
+            self.start_worker(full, coating, key)
+
+    def start_worker(self, plot, coating, key=None, followup=None):
+        """
+        Computes plot in the background, superseding any running computation.
+        The result is cached under key, if given; followup holds the arguments
+        of another computation to start once this one has been rendered.
+        """
+        self.run_worker(PlotWorker(plot, coating, self), key, followup)
+
+    def run_worker(self, worker, key=None, followup=None):
+        """Starts worker, superseding any running computation."""
+        self.cancel_worker()
+        self.worker = worker
+        self.worker.key = key
+        self.worker.followup = followup
+        self.worker.progressed.connect(self.handle_worker_progress)
+        self.worker.computed.connect(self.handle_worker_result)
+        self.worker.failed.connect(self.handle_worker_error)
+        self.worker.finished.connect(self.worker.deleteLater)
+        self.prgCompute.setValue(0)
+        self.show_progress(True)
+        self.worker.start()
+
+    def render_plot(self, plot, data, key=None, keep_view=False):
+        """
+        Draws data, which is cached under key. If the plot type and layout
+        are unchanged, only the data of the current artists is updated and
+        redrawn with blitting; the whole figure is redrawn otherwise. With
+        keep_view, e.g. for refined data, the x and y limits of the current
+        view are kept even if the figure has to be redrawn.
+        """
+        current = self.rendered_plot
+        self.rendered_data = data
+        self.rendered_key = key
+        if (current is not None and current.name == plot.name and
+                current.update(data)):
+            self.blitter.update()
+            return
+        view = None
+        if keep_view and current is not None and current.name == plot.name:
+            view = self.plotHandle.get_xlim(), self.plotHandle.get_ylim()
+        self.blitter.clear()
+        self.pltMain.figure.clear()
+        self.plotHandle = self.pltMain.figure.add_subplot(111)
+        plot.render(data, self.plotHandle)
+        if view is not None:
+            self.plotHandle.set_xlim(view[0])
+            self.plotHandle.set_ylim(view[1])
+        self.plotHandle.callbacks.connect('xlim_changed', self.handle_xlim_changed)
+        self.rendered_plot = plot
+        if plot.rendered_layout is not None:
+            self.blitter.add(plot.artists + plot.overlays)
+        self.pltMain.draw()
+
+    def show_progress(self, visible):
+        self.prgCompute.setVisible(visible)
+        self.btnCancel.setVisible(visible)
+
     def float_conversion_error(self, text):
         QMessageBox.critical(self, 'Conversion Error',
             'The input "{0}" could not be converted to a floating point number.'.format(text))
@@ -154,34 +273,110 @@ class MainWindow(QMainWindow):
 
     @Slot()
     def handle_modified(self):
+        self.cache.invalidate()
         self.update_title(changed=True)
+        if self.chkLiveUpdate.isChecked():
+            self.live_timer.start()
+
+    @Slot()
+    def live_update(self):
+        self.update_plot(preview=True)
+
+    @Slot()
+    def cancel_worker(self):
+        if self.worker:
+            self.worker.cancel()
+            self.worker = None
+        self.show_progress(False)
+
+    @Slot(float)
+    def handle_worker_progress(self, fraction):
+        if self.sender() is self.worker:
+            self.prgCompute.setValue(int(100 * fraction))
+
+    @Slot(object)
+    def handle_worker_result(self, data):
+        if self.sender() is not self.worker:
+            return
+        plot = self.worker.plot
+        key = self.worker.key
+        followup = self.worker.followup
+        refined = isinstance(self.worker, RefineWorker)
+        if key:
+            self.cache.put(key, data)
+        self.worker = None
+        self.show_progress(False)
+        self.render_plot(plot, data, key, keep_view=refined)
+        if followup:
+            self.start_worker(*followup)
+
+    @Slot(str)
+    def handle_worker_error(self, message):
+        if self.sender() is not self.worker:
+            return
+        self.worker = None
+        self.show_progress(False)
+        QMessageBox.critical(self, 'Computation Error', message)
+
+    @Slot()
+    def refine_view(self):
+        """
+        Recomputes the visible range of a zoomed-in wavelength or angle plot
+        at screen resolution in the background. The refined samples are
+        merged into the cached data, so zooming out again is free.
+        """
+        plot, data = self.rendered_plot, self.rendered_data
+        if plot is None or self.rendered_key is None:
+            return
+        if self.worker is not None and not isinstance(self.worker, RefineWorker):
+            return
+        limits = sorted(self.plotHandle.get_xlim())
+        points = int(self.plotHandle.bbox.width)
+        if not datasets.needs_refinement(data, limits, points):
+            return
+        try:
+            coating = self.build_coating()
+        except materials.MaterialNotDefined:
+            return
+        # the project may have been edited since data was computed
+        if self.cache.key(plot.name, self.config, coating) != self.rendered_key:
+            return
+        self.run_worker(RefineWorker(plot, coating, data, limits, points, self),
+                        self.rendered_key)
+
+    # matplotlib slots
+    def handle_xlim_changed(self, ax):
+        self.refine_timer.start()
 
-    # matplotlib slot
     def mpl_on_mouse_move(self, event):
         if event.xdata and event.ydata:
             yformat = self.plotHandle.yaxis.get_major_formatter()
             xformat = self.plotHandle.xaxis.get_major_formatter()
             self.stbStatus.showMessage(u'x={:} y={:}'.format(xformat.format_data_short(event.xdata),
                                                              yformat.format_data_short(event.ydata)))    
+
+    def mpl_on_click(self, event):
+        if event.inaxes is not self.plotHandle or self.rendered_plot is None:
+            return
+        action = self.rendered_plot.click_action(event.xdata, event.ydata)
+        if action is None:
+            return
+        question, apply = action
+        if QMessageBox.question(self, 'Apply to Stack', question,
+                QMessageBox.Yes | QMessageBox.No) == QMessageBox.Yes:
+            apply()
+            self.initialise_stack()
     
     ### SLOTS - PLOT WINDOW
 
     @Slot()
     def on_btnUpdate_clicked(self):
-        try:
-            coating = self.build_coating()
-        except materials.MaterialNotDefined as e:
-            QMessageBox.critical(self, 'Material Error', str(e))
-            return
-        idx = self.cbPlotType.currentIndex()
-        plot = str(self.cbPlotType.itemData(idx))
+        self.update_plot()
 
-        self.pltMain.figure.clear()
-        self.plotHandle = self.pltMain.figure.add_subplot(111)
-        klass = self.plots[plot]['plotter']
-        plot = klass(self.plotHandle)
-        plot.plot(coating)
-        self.pltMain.draw()
+    @Slot(bool)
+    def on_chkLiveUpdate_toggled(self, checked):
+        if checked:
+            self.live_timer.start()
 
     @Slot(str)
     def update_plot_widget(self, plot):
@@ -201,19 +396,34 @@ class MainWindow(QMainWindow):
 
     @Slot()
     def on_btnRemoveLayer_clicked(self):
-        self.tblStack.removeRow(self.tblStack.currentRow())
-        self.config.set('coating.layers', self.get_layers())
+        if self.stack.removeRows(self.tblStack.currentIndex().row(), 1):
+            self.store_stack()
 
     @Slot()
     def on_btnAddLayer_clicked(self):
-        row = self.tblStack.currentRow()+1
-        self.tblStack.insertRow(row)
+        row = self.tblStack.currentIndex().row()+1
+        self.stack.insertRows(row, 1)
 
     @Slot()
     def on_btnClearStack_clicked(self):
         self.config.set('coating.layers', [])
+        self.config.set('coating.blocks', [])
+        self.initialise_stack()
+
+    @Slot()
+    def on_btnGroupLayers_clicked(self):
+        layers = self.config.get('coating.layers')
+        repeats = sweep.find_repeats([(str(m), float(d)) for m, d in layers],
+                                     min_layers=4)
+        self.config.set('coating.blocks', [list(r) for r in repeats])
         self.initialise_stack()
 
+    @Slot(QModelIndex)
+    def on_tblStack_doubleClicked(self, index):
+        # expand a group of repeated layers into single layers, which
+        # stores the stack through handle_stack_changed
+        self.stack.expand(index.row())
+
     @Slot(str)
     def on_cbSuperstrate_currentIndexChanged(self, text):
         self.config.set('coating.superstrate', str(text))
@@ -230,33 +440,36 @@ class MainWindow(QMainWindow):
     def on_txtAOI_editingFinished(self):
         float_set_from_lineedit(self.txtAOI, self.config, 'coating.AOI', self)
 
-    @Slot(int, int)
-    def on_tblStack_cellChanged(self, row, col):
-        txt = self.tblStack.item(row, col).text()
-        if col == 1:
-            xlambda = 0.0
-            # auto-convert L/x or l/x or just /x to lambda/x thicknesses
-            m = re.match('^[Ll]?/(\d+)$', txt)
+    @Slot(QModelIndex, QModelIndex)
+    def handle_stack_changed(self, top_left, bottom_right):
+        # the model has updated the edited entry of its layer list in place,
+        # which only needs to be handed to the config again
+        if self.stack.blocks_changed:
+            self.store_stack()
+        else:
+            self.config.set('coating.layers', self.stack.layers)
+
+    def parse_thickness(self, row, txt):
+        xlambda = 0.0
+        # auto-convert L/x or l/x or just /x to lambda/x thicknesses
+        m = re.match('^[Ll]?/(\d+)$', txt)
+        if m:
+            xlambda = 1.0/int(m.groups()[0])
+        else:
+            # auto-convert *x to x*lambda/4 thicknesses
+            m = re.match('^\*([\d\.]+)$', txt)
             if m:
-                xlambda = 1.0/int(m.groups()[0])
-            else:
-                # auto-convert *x to x*lambda/4 thicknesses
-                m = re.match('^\*([\d\.]+)$', txt)
-                if m:
-                    xlambda = 0.25*float(m.groups()[0])
-
-            if xlambda > 0.0:
-                mat = self.tblStack.item(row, col-1).text()
-                try:
-                    mat = self.materials.get_material(str(mat))
-                    lambda0 = self.config.get('coating.lambda0')
-                    t_lox = xlambda * lambda0/mat.n(lambda0)
-                    with block_signals(self.tblStack) as tbl:
-                        tbl.item(row, col).setText('{:.1f}'.format(t_lox))
-                except materials.MaterialNotDefined:
-                    pass
-
-        self.config.set('coating.layers', self.get_layers())
+                xlambda = 0.25*float(m.groups()[0])
+
+        if xlambda > 0.0:
+            mat = self.stack.material_name(row)
+            try:
+                mat = self.materials.get_material(str(mat))
+                lambda0 = self.config.get('coating.lambda0')
+                return round(xlambda * lambda0/mat.n(lambda0), 1)
+            except materials.MaterialNotDefined:
+                pass
+        return float(txt)
 
     @Slot()
     def on_btnWizard_clicked(self):
@@ -303,6 +516,7 @@ class MainWindow(QMainWindow):
         dlg.load_material()
         if dlg.exec_() == QDialog.Accepted:
             dlg.save_material()
+            self.cache.invalidate()
             self.update_material_list()
 
     @Slot()
@@ -314,6 +528,7 @@ class MainWindow(QMainWindow):
             dlg.load_material(material)
             if dlg.exec_() == QDialog.Accepted:
                 dlg.save_material()
+                self.cache.invalidate()
 
     @Slot()
     def on_btnDeleteMaterial_clicked(self):
@@ -321,6 +536,7 @@ class MainWindow(QMainWindow):
         if row >= 0:
             material = str(self.lstMaterials.item(row).text())
             materials.MaterialLibrary.Instance().unregister(material)
+            self.cache.invalidate()
             self.lstMaterials.takeItem(row)
             self.cbSuperstrate.removeItem(self.cbSuperstrate.findText(material))
             self.cbSubstrate.removeItem(self.cbSubstrate.findText(material))
@@ -333,7 +549,8 @@ class MainWindow(QMainWindow):
         filename = QFileDialog.getSaveFileName(self, 'Export Plot',
                             splitext(self.filename)[0]+'.pdf', 'PDF (*.pdf)');
         if filename:
-            self.pltMain.figure.savefig(str(filename))
+            with self.blitter.static():
+                self.pltMain.figure.savefig(str(filename))
     
     @Slot()
     def on_actionExportFormula_triggered(self):
@@ -361,9 +578,14 @@ class MainWindow(QMainWindow):
             if legend:
                 for t in legend.get_texts():
                     labels.append(t.get_text())
+            # lines are decimated for display, export their full data
             for line in ax.lines:
-                xdata.append(line.get_xdata())
-                ydata.append(line.get_ydata())
+                if self.rendered_plot is not None:
+                    X, Y = self.rendered_plot.full_data(line)
+                else:
+                    X, Y = line.get_xdata(), line.get_ydata()
+                xdata.append(X)
+                ydata.append(Y)
         
         labels.insert(0, xlabel)
         # TODO: y labels, plot title?
@@ -0,0 +1,476 @@
+#!/usr/bin/env python
+# This work is licensed under the Creative Commons Attribution-NonCommercial-
+# ShareAlike 4.0 International License. To view a copy of this license, visit
+# http://creativecommons.org/licenses/by-nc-sa/4.0/ or send a letter to Creative
+# Commons, PO Box 1866, Mountain View, CA 94042, USA.
+
+"""
+Layer thickness optimisation against reflectivity, transmission and phase
+targets.
+
+The merit function is a weighted mean squared deviation from each target
+over its grid of wavelengths and angles of incidence. Its gradient with
+respect to all layer thicknesses is computed analytically: a forward pass
+accumulates the products P_j of the first j layer matrices, and a backward
+(adjoint) pass carries the derivative of the merit with respect to the
+total characteristic matrix through the remaining layers, so that
+
+    d merit / d d_j = 2 Re tr(S_j+1 W^T P_j dL_j/dd_j)
+
+for all layers at once, where W holds the derivatives with respect to the
+total matrix and S_j+1 is the product of the layers after j. This costs
+about three solves, independent of the number of layers.
+
+Needle optimisation inserts thin layers of the coating's own materials.
+The change of the merit per nm of a needle inserted at depth z of layer j
+follows from the same two passes, with P_j L_j(z) carrying the fields from
+the superstrate to z and L_j(d_j-z) S_j+1 W^T the adjoint back from the
+substrate, so that all candidate depths are evaluated without re-solving
+the stack.
+"""
+
+import copy
+import numpy as np
+from .sweep import (admittance, multiply, dispersions, material_keys,
+                    stack_thicknesses, IDENTITY)
+
+# weights of s and p polarisation in the optimised quantity
+POLARISATIONS = {
+    's': (1.0, 0.0),
+    'p': (0.0, 1.0),
+    'avg': (0.5, 0.5),
+    'delta': (1.0, -1.0),
+}
+
+
+class Target(object):
+    """
+    Target for quantity 'R', 'T' or 'phase' (in degrees) of polarisation
+    's', 'p', 'avg' or, for phase, 'delta' (s minus p), over the grid of
+    wavelengths and AOI. condition '=' penalises any deviation from value,
+    '>=' and '<=' only values below or above it.
+    """
+
+    def __init__(self, quantity, wavelengths, AOI=0.0, value=0.0,
+                 polarisation='avg', condition='=', weight=1.0):
+        if quantity not in ['R', 'T', 'phase']:
+            raise ValueError('unknown target quantity {0}'.format(quantity))
+        if polarisation not in POLARISATIONS:
+            raise ValueError('unknown polarisation {0}'.format(polarisation))
+        if condition not in ['=', '>=', '<=']:
+            raise ValueError('unknown target condition {0}'.format(condition))
+        self.quantity = quantity
+        self.wavelengths = np.atleast_1d(np.asarray(wavelengths, dtype=float))
+        self.AOI = np.atleast_1d(np.asarray(AOI, dtype=float))
+        self.value = float(value)
+        self.polarisation = polarisation
+        self.condition = condition
+        self.weight = float(weight)
+
+    @classmethod
+    def from_config(cls, target):
+        """
+        Creates a target from a config entry, in which wavelength and AOI
+        are given as [min, max, steps].
+        """
+        def grid(limits):
+            return np.linspace(limits[0], limits[1], int(limits[2]))
+        return cls(target['quantity'], grid(target['wavelength']),
+                   grid(target['AOI']), target['value'],
+                   target.get('polarisation', 'avg'),
+                   target.get('condition', '='), target.get('weight', 1.0))
+
+
+class MeritFunction(object):
+    """
+    Merit of the layer thicknesses of a coating against a list of targets.
+
+    The distinct layer materials of the coating form a palette, and each
+    layer refers to one of them by its index in layers, so that the layer
+    structure can change while the dispersion data is evaluated only once.
+    Only numpy arrays are kept, so that it can be sent to worker processes.
+    """
+
+    def __init__(self, coating, targets):
+        materials = [l.material for l in coating.layers]
+        keys = material_keys(materials)
+        palette = []
+        self.layers = np.zeros(len(materials), dtype=int)
+        for j, key in enumerate(keys):
+            if key not in palette:
+                palette.append(key)
+            self.layers[j] = palette.index(key)
+        materials = [materials[keys.index(k)] for k in palette]
+        self.names = [str(m.name) for m in materials]
+        self.thicknesses = stack_thicknesses(coating)
+        media = [coating.superstrate] + materials + [coating.substrate]
+        self.terms = [self.prepare(media, t) for t in targets]
+
+    @staticmethod
+    def prepare(media, target):
+        """
+        Phase factors per nm and admittances of the superstrate, all palette
+        materials and the substrate over the target grid.
+        """
+        X = target.wavelengths[np.newaxis,:]
+        indices = [np.asarray(n, dtype=complex)[np.newaxis,:]
+                   for n in dispersions.indices(media, target.wavelengths)]
+        n_sin = indices[0] * np.sin(np.radians(target.AOI[:,np.newaxis]))
+        media = [admittance(n, n_sin) for n in indices]
+        term = {
+            'target': target,
+            'eta0': media[0][1],
+            'etas': media[-1][1],
+            'eta': [eta for _, eta in media[1:-1]],
+            'k': [2 * np.pi * n * cos / X
+                  for n, (cos, _) in zip(indices[1:-1], media[1:-1])],
+            'pol': np.reshape(POLARISATIONS[target.polarisation], (2, 1, 1)),
+        }
+        if target.quantity == 'phase':
+            term['value'] = np.radians(target.value)
+        else:
+            term['value'] = target.value
+        return term
+
+    def restructure(self, layers, thicknesses):
+        """Copy of this merit function for a different layer structure."""
+        merit = copy.copy(self)
+        merit.layers = np.asarray(layers, dtype=int)
+        merit.thicknesses = np.asarray(thicknesses, dtype=float)
+        return merit
+
+    def design(self, thicknesses=None):
+        """Layers as [material name, thickness] pairs, for coating.layers."""
+        if thicknesses is None:
+            thicknesses = self.thicknesses
+        return [[self.names[m], float(d)] for m, d in zip(self.layers, thicknesses)]
+
+    def __call__(self, d):
+        return self.evaluate(d, gradient=False)[0]
+
+    def evaluate(self, d, gradient=True):
+        """Returns the merit of thicknesses d and its gradient."""
+        d = np.asarray(d, dtype=float)
+        merit = 0.0
+        grad = np.zeros(len(d))
+        for term in self.terms:
+            value, layers, prefix, adjoints = self.solve_term(term, d, gradient)
+            merit += value
+            if not adjoints:
+                continue
+            for j, m in enumerate(self.layers):
+                Q = multiply(adjoints[j], prefix[j])
+                dL = self.layer_derivative(term['k'][m], term['eta'][m], d[j])
+                grad[j] += 2 * np.sum(np.real(Q[0] * dL[0] + Q[1] * dL[2] +
+                                              Q[2] * dL[1] + Q[3] * dL[3]))
+        return merit, grad
+
+    @staticmethod
+    def layer_matrix(k, eta, d):
+        phase = k * d
+        c = np.cos(phase)
+        s = 1j * np.sin(phase)
+        return (c, s / eta, s * eta, c)
+
+    @staticmethod
+    def layer_derivative(k, eta, d):
+        """Derivative of the layer matrix with respect to its thickness."""
+        phase = k * d
+        c = 1j * k * np.cos(phase)
+        s = -k * np.sin(phase)
+        return (s, c / eta, c * eta, s)
+
+    def solve_term(self, term, d, adjoint=True):
+        """
+        Forward and, if adjoint is set, backward pass for one target. Returns
+        the merit, the layer matrices L_j, the prefix products P_j of the
+        layers before j and the adjoint products S_j+1 W^T; the latter is
+        None if adjoint is not set.
+        """
+        target = term['target']
+        eta0, etas = term['eta0'], term['etas']
+
+        # forward pass
+        layers = [self.layer_matrix(term['k'][m], term['eta'][m], dj)
+                  for m, dj in zip(self.layers, d)]
+        prefix = [IDENTITY]
+        for L in layers:
+            prefix.append(multiply(prefix[-1], L))
+        M = prefix[-1]
+        B = M[0] + M[1] * etas
+        C = M[2] + M[3] * etas
+        den = eta0 * B + C
+        r = (eta0 * B - C) / den
+        t = 2 * eta0 / den
+
+        # quantity and the complex factors g of its derivative,
+        # dq = 2 Re(g_r dr + g_t dt)
+        g_r = g_t = 0.0
+        if target.quantity == 'R':
+            q = np.abs(r)**2
+            g_r = np.conj(r)
+        elif target.quantity == 'T':
+            scale = np.real(etas) / np.real(eta0)
+            q = scale * np.abs(t)**2
+            g_t = scale * np.conj(t)
+        else:
+            q = np.angle(r)
+            g_r = -0.5j / r
+
+        error = np.sum(term['pol'] * q, axis=0) - term['value']
+        if target.quantity == 'phase':
+            error = np.angle(np.exp(1j * error))
+        if target.condition == '>=':
+            error = np.minimum(error, 0.0)
+        elif target.condition == '<=':
+            error = np.maximum(error, 0.0)
+        merit = target.weight * np.mean(error**2)
+        if not adjoint:
+            return merit, layers, prefix, None
+
+        # adjoint of the total matrix, W_ab = d merit / d M_ab
+        a = term['pol'] * (2 * target.weight * error / error.size)
+        g_r = a * g_r
+        g_t = a * g_t
+        den2 = den**2
+        G_B = (g_r * 2 * eta0 * C - g_t * 2 * eta0**2) / den2
+        G_C = (-g_r * 2 * eta0 * B - g_t * 2 * eta0) / den2
+        Z = (G_B, G_C, G_B * etas, G_C * etas)  # W transposed
+
+        # backward pass
+        adjoints = [None] * len(layers)
+        for j in reversed(range(len(layers))):
+            adjoints[j] = Z
+            Z = multiply(layers[j], Z)
+        return merit, layers, prefix, adjoints
+
+    def insertion_sensitivity(self, d, steps):
+        """
+        Change of the merit per nm of a needle of each palette material
+        inserted at steps depths inside every layer. Returns the layer
+        index and the position within the layer of each depth, and an array
+        of shape (len(names), len(layer)). Needles of the material of the
+        layer they are in are set to zero.
+        """
+        d = np.asarray(d, dtype=float)
+        fractions = (np.arange(steps) + 0.5) / steps
+        layer = np.repeat(np.arange(len(d)), steps)
+        position = (d[:,np.newaxis] * fractions).ravel()
+        sensitivity = np.zeros((len(self.names), len(layer)))
+        z = fractions.reshape(-1, 1, 1, 1)
+        for term in self.terms:
+            _, layers, prefix, adjoints = self.solve_term(term, d)
+            for j, m in enumerate(self.layers):
+                k, eta = term['k'][m], term['eta'][m]
+                # fields at the needle and adjoint fields behind it
+                left = multiply(prefix[j], self.layer_matrix(k, eta, z * d[j]))
+                right = multiply(self.layer_matrix(k, eta, (1 - z) * d[j]),
+                                 adjoints[j])
+                X = multiply(right, left)
+                for n in range(len(self.names)):
+                    # d L / d d of a needle at zero thickness
+                    k_n, eta_n = term['k'][n], term['eta'][n]
+                    trace = 1j * k_n * (X[1] * eta_n + X[2] / eta_n)
+                    sensitivity[n, j*steps:(j+1)*steps] += 2 * np.sum(
+                        np.real(trace), axis=(1, 2, 3))
+        sensitivity[self.layers[layer], np.arange(len(layer))] = 0.0
+        return layer, position, sensitivity
+
+
+def minimise(evaluate, x0, lower=0.0, iterations=200, tolerance=1e-12,
+             memory=8, callback=None):
+    """
+    Minimises the function evaluate(x) -> (f, gradient) subject to x >= lower,
+    using a projected limited-memory BFGS method with backtracking line
+    search. Stops after iterations or when the relative improvement of f
+    drops below tolerance. callback(iteration, x, f) is called after each
+    iteration and may raise to abort. Returns (x, f).
+    """
+    x = np.maximum(np.asarray(x0, dtype=float), lower)
+    f, g = evaluate(x)
+    S, Y = [], []
+    for ii in range(iterations):
+        # variables held at the bound are left out of the step
+        free = (x > lower) | (g < 0)
+        gf = np.where(free, g, 0.0)
+        if not np.any(gf):
+            break
+
+        q = gf.copy()
+        alphas = []
+        for s, y in reversed(list(zip(S, Y))):
+            alpha = s.dot(q) / y.dot(s)
+            q -= alpha * y
+            alphas.append(alpha)
+        if S:
+            q *= S[-1].dot(Y[-1]) / Y[-1].dot(Y[-1])
+        else:
+            # first step changes no thickness by more than 1nm
+            q /= np.max(np.abs(q))
+        for (s, y), alpha in zip(zip(S, Y), reversed(alphas)):
+            q += s * (alpha - y.dot(q) / y.dot(s))
+        p = -np.where(free, q, 0.0)
+        if gf.dot(p) >= 0:
+            p = -gf / np.max(np.abs(gf))
+            S, Y = [], []
+
+        step = 1.0
+        while True:
+            xn = np.maximum(x + step * p, lower)
+            fn, gn = evaluate(xn)
+            if fn <= f + 1e-4 * g.dot(xn - x):
+                break
+            step *= 0.5
+            if step < 1e-8:
+                return x, f
+
+        s, y = xn - x, gn - g
+        if s.dot(y) > 1e-16:
+            S.append(s)
+            Y.append(y)
+            if len(S) > memory:
+                S.pop(0)
+                Y.pop(0)
+        converged = f - fn <= tolerance * max(abs(f), 1e-300)
+        x, f, g = xn, fn, gn
+        if callback:
+            callback(ii, x, f)
+        if converged:
+            break
+    return x, f
+
+
+def optimise_start(merit, x0, lower, iterations):
+    """Runs one start of a multi-start optimisation, returning (x..., f)."""
+    x, f = minimise(merit.evaluate, x0, lower, iterations)
+    return np.append(x, f)
+
+
+class OptimisationResult(object):
+    """Best thicknesses and merit, with the final merit of every start."""
+
+    def __init__(self, thicknesses, merit, initial, merits):
+        self.thicknesses = thicknesses
+        self.merit = merit
+        self.initial = initial
+        self.merits = merits
+
+
+def optimise(merit, starts=1, spread=10.0, seed=0, lower=0.0, iterations=200,
+             progress=None, backend=None):
+    """
+    Optimises the thicknesses of merit's coating. The first start is the
+    current design; further starts perturb it by random relative errors with
+    a standard deviation of spread percent, drawn from a generator seeded
+    with seed. With more than one start and worker, starts run in parallel
+    on backend.
+    """
+    x0 = merit.thicknesses
+    N = len(x0)
+    rng = np.random.default_rng(seed)
+    X0 = x0 * (1 + spread / 100.0 * rng.standard_normal((starts, N)))
+    X0[0] = x0
+    X0 = np.maximum(X0, lower)
+
+    if backend and backend.workers > 1 and starts > 1:
+        blocks = [((ii,), optimise_start, (merit, X0[ii], lower, iterations))
+                  for ii in range(starts)]
+        results = backend.fill((starts, N + 1), float, blocks, progress)
+    else:
+        results = np.empty((starts, N + 1))
+        for ii in range(starts):
+            def callback(iteration, x, f):
+                if progress:
+                    progress((ii + float(iteration + 1) / iterations) / starts)
+            x, f = minimise(merit.evaluate, X0[ii], lower, iterations,
+                            callback=callback)
+            results[ii] = np.append(x, f)
+
+    best = np.argmin(results[:,-1])
+    return OptimisationResult(results[best,:-1], results[best,-1],
+                              merit(x0), results[:,-1])
+
+
+def remove_thin_layers(layers, thicknesses, min_thickness):
+    """
+    Removes layers thinner than min_thickness, or of zero thickness, and
+    merges the neighbours of the same material that this brings together.
+    """
+    new_layers, new_thicknesses = [], []
+    for m, d in zip(layers, thicknesses):
+        if d <= 0 or d < min_thickness:
+            continue
+        if new_layers and new_layers[-1] == m:
+            new_thicknesses[-1] += d
+        else:
+            new_layers.append(m)
+            new_thicknesses.append(d)
+    return np.array(new_layers, dtype=int), np.array(new_thicknesses)
+
+
+class NeedleResult(object):
+    """
+    Best design found by needle optimisation, with the merit after each
+    cycle and the condition that stopped it.
+    """
+
+    def __init__(self, merit, value, initial, history, reason):
+        self.design = merit.design()
+        self.layers = merit.layers
+        self.thicknesses = merit.thicknesses
+        self.merit = value
+        self.initial = initial
+        self.history = history
+        self.reason = reason
+
+
+def needle_optimise(merit, needles=10, steps=20, min_thickness=1.0,
+                    iterations=200, max_layers=0, tolerance=1e-3,
+                    progress=None):
+    """
+    Alternately optimises all thicknesses and inserts a needle of zero
+    thickness where the insertion sensitivity is most negative. Layers
+    thinner than min_thickness are removed after each optimisation. Stops
+    after inserting needles needles, when no needle would lower the merit,
+    when a cycle improves the merit by less than the fraction tolerance,
+    or when a needle would exceed max_layers layers (0 for no limit).
+    """
+    initial = merit(merit.thicknesses)
+    history = []
+    best = None
+    d = merit.thicknesses
+    reason = 'maximum number of needles inserted'
+    for cycle in range(needles + 1):
+        def callback(iteration, x, f):
+            if progress:
+                progress((cycle + float(iteration + 1) / iterations) / (needles + 1))
+        d, _ = minimise(merit.evaluate, d, 0.0, iterations, callback=callback)
+        merit = merit.restructure(*remove_thin_layers(merit.layers, d, min_thickness))
+        d = merit.thicknesses
+        f = merit(d)
+        history.append(f)
+        if best and f > best[0] * (1 - tolerance):
+            reason = 'merit no longer improving'
+            break
+        best = (f, merit)
+        if cycle == needles:
+            break
+        if f == 0.0:
+            reason = 'all targets met'
+            break
+        if max_layers and len(d) + 2 > max_layers:
+            reason = 'maximum number of layers reached'
+            break
+
+        layer, position, sensitivity = merit.insertion_sensitivity(d, steps)
+        n, ii = np.unravel_index(np.argmin(sensitivity), sensitivity.shape)
+        if sensitivity[n, ii] >= 0:
+            reason = 'no needle lowers the merit'
+            break
+        j = layer[ii]
+        layers = np.insert(merit.layers, j + 1, [n, merit.layers[j]])
+        d = np.insert(d, j + 1, [0.0, d[j] - position[ii]])
+        d[j] = position[ii]
+        merit = merit.restructure(layers, d)
+    merit = best[1]
+    return NeedleResult(merit, best[0], initial, history, reason)
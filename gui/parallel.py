@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+# This work is licensed under the Creative Commons Attribution-NonCommercial-
+# ShareAlike 4.0 International License. To view a copy of this license, visit
+# http://creativecommons.org/licenses/by-nc-sa/4.0/ or send a letter to Creative
+# Commons, PO Box 1866, Mountain View, CA 94042, USA.
+
+"""
+Process pool execution of large sweeps.
+
+A sweep is split into blocks, each of which fills one region of the result
+array. With more than one worker, the result array lives in shared memory
+and the workers write their blocks into it directly, so only the small
+inputs of each block are pickled. Block functions must be module-level
+functions, so that the worker processes can import them.
+
+Workers are started with the spawn method, as forking a process that runs
+Qt threads is not safe.
+"""
+
+import os
+import threading
+import multiprocessing
+from multiprocessing import shared_memory
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+import numpy as np
+
+# grids with fewer points are not worth the overhead of the pool
+MIN_PARALLEL_POINTS = 1 << 15
+# blocks per worker, so that cancellation and progress stay responsive
+BLOCKS_PER_WORKER = 4
+
+
+def split(length, parts):
+    """Splits range(length) into at most parts contiguous slices."""
+    bounds = np.linspace(0, length, max(min(parts, length), 1) + 1).astype(int)
+    return [slice(a, b) for a, b in zip(bounds[:-1], bounds[1:])]
+
+
+def _fill_block(name, shape, dtype, index, func, args):
+    value = func(*args)
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        out = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+        out[index] = value
+        del out
+    finally:
+        shm.close()
+
+
+class ProcessBackend(object):
+    """
+    Fills result arrays block by block, in a pool of worker processes or,
+    with a single worker, in the calling thread.
+
+    The pool is created on first use and kept until the number of workers
+    changes or shutdown() is called.
+    """
+
+    def __init__(self, workers=1):
+        self.workers = workers
+        self.executor = None
+        self.lock = threading.Lock()
+
+    def configure(self, workers):
+        """Sets the number of worker processes; 0 or None uses all cores."""
+        workers = int(workers or os.cpu_count() or 1)
+        with self.lock:
+            if workers != self.workers:
+                self._shutdown()
+                self.workers = workers
+
+    def parallel(self, points):
+        """Whether a grid of the given size should be split across processes."""
+        return self.workers > 1 and points >= MIN_PARALLEL_POINTS
+
+    def blocks(self, length):
+        """Slices of range(length) for one sweep axis, sized for the pool."""
+        return split(length, self.workers * BLOCKS_PER_WORKER)
+
+    def pool(self):
+        with self.lock:
+            if self.executor is None:
+                self.executor = ProcessPoolExecutor(self.workers,
+                    mp_context=multiprocessing.get_context('spawn'))
+            return self.executor
+
+    def fill(self, shape, dtype, blocks, progress=None):
+        """
+        Returns an array of shape and dtype, where out[index] = func(*args)
+        for each (index, func, args) in blocks. progress is called with the
+        completed fraction after each block; if it raises, outstanding
+        blocks are cancelled.
+        """
+        if self.workers <= 1 or len(blocks) <= 1:
+            out = np.empty(shape, dtype=dtype)
+            for ii, (index, func, args) in enumerate(blocks):
+                out[index] = func(*args)
+                if progress:
+                    progress(float(ii + 1) / len(blocks))
+            return out
+
+        dtype = np.dtype(dtype)
+        size = max(int(np.prod(shape)) * dtype.itemsize, 1)
+        shm = shared_memory.SharedMemory(create=True, size=size)
+        try:
+            pool = self.pool()
+            futures = [pool.submit(_fill_block, shm.name, shape, dtype.str,
+                                   index, func, args)
+                       for index, func, args in blocks]
+            try:
+                pending = set(futures)
+                while pending:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for f in done:
+                        f.result()
+                    if progress:
+                        progress(1.0 - float(len(pending)) / len(futures))
+            except BaseException:
+                for f in futures:
+                    f.cancel()
+                # running blocks still write into the shared memory
+                wait(futures)
+                raise
+            return np.ndarray(shape, dtype=dtype, buffer=shm.buf).copy()
+        finally:
+            shm.close()
+            shm.unlink()
+
+    def _shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+    def shutdown(self):
+        with self.lock:
+            self._shutdown()
+
+
+backend = ProcessBackend()
@@ -11,6 +11,8 @@ from qtpy.QtWidgets import QWidget
 from qtpy import uic
 from coatingtk.utils.config import Config
 from gui.version import version_string
+from gui import sweep, parallel, datasets
+from .decimate import Decimator
 
 class BasePlotOptionWidget(QWidget):
     def __init__(self, name, parent):
@@ -37,15 +39,126 @@ class BasePlot(object):
               '#8EBA42',
               '#FFB5B8']
     
-    def __init__(self, name, handle):
+    # upper limit for xaxis.steps, e.g. for quick preview plots
+    max_steps = None
+    # IncrementalSolver for uniform sweeps, see datasets.sample()
+    solver = None
+
+    def __init__(self, name, handle=None):
+        self.name = name
+        self.handle = None
+        # artists that update() changes in place, the artists drawn on top
+        # of them and the layout they were rendered with
+        self.artists = []
+        self.overlays = []
+        self.rendered_layout = None
+        self.decimator = None
+        self.config = Config.Instance().view('plot.'+name)
+        if handle:
+            self.attach(handle)
+
+    def attach(self, handle):
+        """Sets the axes that render() draws into."""
         self.handle = handle
         self.handle.set_prop_cycle('color', self.colors)
-        self.config = Config.Instance().view('plot.'+name)
+
+    def compute(self, coating, progress=None):
+        """
+        Computes the Dataset for render() with gui.datasets. This does not
+        touch the axes, so it can run outside the GUI thread; progress is
+        passed on to the sweep.
+        """
+        return datasets.compute(self.name, coating, self.config,
+                                progress=progress, backend=self.backend(),
+                                solver=self.solver, max_steps=self.max_steps)
+
+    def refine(self, data, coating, limits, points, progress=None):
+        """Adds points samples within limits to data, see datasets.refine()."""
+        return datasets.refine(data, coating, self.config, limits, points,
+                               progress=progress, backend=self.backend())
+
+    def backend(self):
+        """
+        The process pool for large sweeps, with the number of workers set by
+        parallel.workers in the project config (0 for all cores).
+        """
+        parallel.backend.configure(self.config.parent.get('parallel.workers'))
+        return parallel.backend
+
+    def steps(self):
+        return datasets.steps(self.config, max_steps=self.max_steps)
+
+    def render(self, data, axes=None):
+        """Draws the Dataset data into axes, or the attached axes."""
+        if axes is not None:
+            self.attach(axes)
+        self.artists = []
+        self.overlays = []
+        self.decimator = None
+        self.draw(data)
+        self.rendered_layout = self.layout(data)
 
     @abc.abstractmethod
-    def plot(self, coating):
+    def draw(self, data):
         pass
 
+    def layout(self, data):
+        """
+        Everything other than the data of the artists that the rendered plot
+        depends on, e.g. axis limits and scales. Plots that return None are
+        always redrawn from scratch.
+        """
+        return None
+
+    def update(self, data):
+        """
+        Updates the rendered artists to data in place, if the layout hasn't
+        changed. Returns False if the plot has to be rendered again instead.
+        """
+        layout = self.layout(data)
+        if layout is None or layout != self.rendered_layout:
+            return False
+        return self.update_artists(data)
+
+    def update_artists(self, data):
+        """Sets the data of self.artists; False if that isn't possible."""
+        return False
+
+    def plot(self, coating):
+        self.render(self.compute(coating))
+
+    def click_action(self, x, y):
+        """
+        Action for a click at data coordinates (x, y) of the rendered plot,
+        as a (question, function) pair, or None if the plot has none.
+        """
+        return None
+
+    def plot_lines(self, X, Y, *args, **kwargs):
+        """
+        Like self.handle.plot(X, Y), but the lines are decimated for display
+        and re-decimated on zoom; full_data() has their data.
+        """
+        if self.decimator is None:
+            self.decimator = Decimator(self.handle)
+        return self.decimator.plot(X, Y, *args, **kwargs)
+
+    def full_data(self, line):
+        """The data of a rendered line at full resolution."""
+        if self.decimator is None:
+            return line.get_xdata(), line.get_ydata()
+        return self.decimator.full_data(line)
+
+    def rescale(self):
+        """
+        Autoscales the y axis to the updated artists. Returns False if that
+        changed the limits, so that the axis has to be drawn again.
+        """
+        ylim = self.handle.get_ylim()
+        self.handle.relim()
+        self.handle.autoscale_view(scalex=False)
+        return self.handle.get_ylim() == ylim
+
     def add_grid(self, ax=None):
         if not ax:
             ax = self.handle
@@ -53,7 +166,19 @@ class BasePlot(object):
         ax.grid(which='minor', color='0.7', linestyle=':')
 
     def add_legend(self, handles, entries, loc="upper right"):
-        self.handle.legend(handles, entries, fontsize=10, frameon=False, loc=loc)
+        self.overlays.append(self.handle.legend(handles, entries, fontsize=10,
+                                                frameon=False, loc=loc))
 
     def add_copyright(self):
         self.handle.set_title(version_string, loc='right', size=8)
+
+
+class SpectralPlot(BasePlot):
+    """
+    Base class for plots over wavelength.
+
+    The solver is shared by all spectral plots, so that editing a single
+    layer only re-solves that layer over the previous sweep grid.
+    """
+
+    solver = sweep.IncrementalSolver()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+# This work is licensed under the Creative Commons Attribution-NonCommercial-
+# ShareAlike 4.0 International License. To view a copy of this license, visit
+# http://creativecommons.org/licenses/by-nc-sa/4.0/ or send a letter to Creative
+# Commons, PO Box 1866, Mountain View, CA 94042, USA.
+
+from contextlib import contextmanager
+
+
+class BlitManager(object):
+    """
+    Redraws the data artists of a figure on their own, over a cached copy of
+    everything else (axes, ticks, labels, legend).
+
+    The artists are animated, so full draws of the canvas leave them out;
+    the background is copied after every full draw, e.g. after resizing or
+    panning, and the artists are drawn on top of it again.
+    """
+
+    def __init__(self, canvas):
+        self.canvas = canvas
+        self.artists = []
+        self.background = None
+        canvas.mpl_connect('draw_event', self.on_draw)
+
+    def add(self, artists):
+        """
+        Manages artists, which are drawn in the given order. The spines of
+        their axes are drawn on top of them again, as in a full draw.
+        """
+        artists = list(artists)
+        for ax in set(a.axes for a in artists):
+            artists += list(ax.spines.values())
+        for a in artists:
+            a.set_animated(True)
+        self.artists += artists
+
+    def clear(self):
+        self.artists = []
+        self.background = None
+
+    def on_draw(self, event):
+        # savefig() draws the figure on a canvas of its own
+        if event is not None and event.canvas is not self.canvas:
+            return
+        self.background = self.canvas.copy_from_bbox(self.canvas.figure.bbox)
+        self.draw_artists()
+
+    def draw_artists(self):
+        for a in self.artists:
+            a.axes.draw_artist(a)
+
+    def update(self):
+        """Redraws the artists after their data has changed."""
+        if self.background is None:
+            self.canvas.draw()
+            return
+        self.canvas.restore_region(self.background)
+        self.draw_artists()
+        self.canvas.blit(self.canvas.figure.bbox)
+
+    @contextmanager
+    def static(self):
+        """Includes the artists in full draws, e.g. for savefig()."""
+        for a in self.artists:
+            a.set_animated(False)
+        try:
+            yield
+        finally:
+            for a in self.artists:
+                a.set_animated(True)
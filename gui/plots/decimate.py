@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+# This work is licensed under the Creative Commons Attribution-NonCommercial-
+# ShareAlike 4.0 International License. To view a copy of this license, visit
+# http://creativecommons.org/licenses/by-nc-sa/4.0/ or send a letter to Creative
+# Commons, PO Box 1866, Mountain View, CA 94042, USA.
+
+"""
+Min/max decimation of dense curves for display.
+
+Lines only get about two samples per pixel of the axes width for the
+current view, the minimum and maximum of the samples in that column, so
+that peaks and narrow features stay visible. The full data is kept and
+re-decimated whenever the x limits or the size of the axes change.
+"""
+
+import numpy as np
+
+# buckets per pixel of the axes width, each contributing its min and max
+BUCKETS_PER_PIXEL = 1
+
+
+def minmax(X, Y, lo, hi, buckets, log=False):
+    """
+    Reduces the samples (X, Y), with X ascending, to the minimum and maximum
+    of Y in each of buckets equal intervals of the view [lo, hi] (of log X
+    for log=True). One sample beyond either end of the view is included, so
+    that the line runs up to the edges. Fewer samples than that are returned
+    unchanged.
+    """
+    i0 = max(np.searchsorted(X, lo, 'left') - 1, 0)
+    i1 = min(np.searchsorted(X, hi, 'right') + 1, len(X))
+    Xv, Yv = X[i0:i1], Y[i0:i1]
+    if len(Xv) <= 2 * buckets:
+        return Xv, Yv
+
+    if log and Xv[0] > 0:
+        edges = np.geomspace(Xv[0], Xv[-1], buckets+1)
+    else:
+        edges = np.linspace(Xv[0], Xv[-1], buckets+1)
+    starts = np.unique(np.searchsorted(Xv, edges[:-1]))
+    ends = np.append(starts[1:], len(Xv)) - 1
+    ymin = np.minimum.reduceat(Yv, starts)
+    ymax = np.maximum.reduceat(Yv, starts)
+
+    # min first in rising buckets, max first in falling ones
+    falling = Yv[starts] > Yv[ends]
+    first = np.where(falling, ymax, ymin)
+    last = np.where(falling, ymin, ymax)
+    return (np.column_stack((Xv[starts], Xv[ends])).ravel(),
+            np.column_stack((first, last)).ravel())
+
+
+class Decimator(object):
+    """
+    Lines of an axes whose full data is decimated for display. The lines
+    are re-decimated whenever the x limits or the canvas size change, as
+    long as this object is referenced.
+    """
+
+    def __init__(self, ax):
+        self.ax = ax
+        self.data = {}
+        # bound methods are only weakly referenced by matplotlib, so the
+        # callbacks go away together with the plot that owns this object
+        ax.callbacks.connect('xlim_changed', self.handle_event)
+        ax.figure.canvas.mpl_connect('resize_event', self.handle_event)
+
+    def handle_event(self, event):
+        self.update()
+
+    def buckets(self):
+        return max(int(self.ax.bbox.width * BUCKETS_PER_PIXEL), 1)
+
+    def decimate(self, X, Y, view=None):
+        lo, hi = view or sorted(self.ax.get_xlim())
+        return minmax(X, Y, lo, hi, self.buckets(),
+                      self.ax.get_xscale() == 'log')
+
+    def plot(self, X, Y, *args, **kwargs):
+        """Like Axes.plot(X, Y), with one line for each column of Y."""
+        X = np.asarray(X)
+        Y = np.asarray(Y).reshape(len(X), -1)
+        lines = []
+        # new lines span all of X, since the x limits aren't set yet
+        for y in Y.T:
+            line, = self.ax.plot(*self.decimate(X, y, (X[0], X[-1])),
+                                 *args, **kwargs)
+            self.data[line] = (X, y)
+            lines.append(line)
+        return lines
+
+    def set_data(self, line, X, Y):
+        self.data[line] = (X, Y)
+        line.set_data(*self.decimate(X, Y))
+
+    def full_data(self, line):
+        """The data of line before decimation."""
+        if line in self.data:
+            return self.data[line]
+        return line.get_xdata(), line.get_ydata()
+
+    def update(self):
+        for line, (X, Y) in self.data.items():
+            line.set_data(*self.decimate(X, Y))
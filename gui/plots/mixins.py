@@ -118,3 +118,24 @@ class XAxisSteps(object):
     def on_txtXSteps_editingFinished(self):
         int_set_from_lineedit(self.txtXSteps, self.config, 'xaxis.steps', self)
 
+
+class YAxisSteps(object):
+    def initialise_options(self):
+        self.txtYSteps.setText(to_float(self.config.get('yaxis.steps')))
+
+        super(YAxisSteps, self).initialise_options()
+
+    @Slot()
+    def on_txtYSteps_editingFinished(self):
+        int_set_from_lineedit(self.txtYSteps, self.config, 'yaxis.steps', self)
+
+
+class XAxisSampling(object):
+    def initialise_options(self):
+        self.chkXAdaptive.setChecked(self.config.get('xaxis.sampling') == 'adaptive')
+
+        super(XAxisSampling, self).initialise_options()
+
+    @Slot(bool)
+    def on_chkXAdaptive_clicked(self, checked):
+        self.config.set('xaxis.sampling', 'adaptive' if checked else 'uniform')
@@ -14,34 +14,25 @@ from ..helpers import to_float, float_set_from_lineedit
 
 
 class BrownianNoisePlot(BasePlot):
-    def __init__(self, handle):
+    def __init__(self, handle=None):
         super(BrownianNoisePlot, self).__init__('brownian_noise', handle)
 
-    def brownian_noise(self, coating, freq, beam_size, temperature):
-        k = 1.3806503e-23;
-        return 2 * k * temperature / (np.sqrt(np.pi ** 3) * freq *
-            beam_size * coating.substrate.Y) * (1 - coating.substrate.sigma ** 2) * coating.phi(beam_size)
-
-    def plot(self, coating):
-        temperature = self.config.get('analysis.temperature')
-        beam_size = self.config.get('analysis.beam_size') * 1e-6
-        steps = self.config.get('xaxis.steps')
-
-        if self.config.get('xaxis.limits') == 'auto':
-            xlim = [1, 1e4]
-            xloglim = [0, 4]
-        else:
-            xlim = [self.config.get('xaxis.min'),
-                    self.config.get('xaxis.max')]
-            xloglim = [np.floor(np.log10(xlim[0])),
-                       np.ceil(np.log10(xlim[1]))]
+    def layout(self, data):
+        return tuple(data.meta['xlim'])
 
-        mpl.rc('mathtext', default='regular') #TODO: this should probably go somewhere else?!
+    def update_artists(self, data):
+        self.decimator.set_data(self.artists[0], data['frequency'], data['noise'])
+        return self.rescale()
+
+    def draw(self, data):
+        X = data['frequency']
+        xlim = data.meta['xlim']
 
-        X = np.logspace(*xloglim, num=steps)
-        Y = self.brownian_noise(coating, X, beam_size, temperature)
+        mpl.rc('mathtext', default='regular') #TODO: this should probably go somewhere else?!
 
-        line = self.handle.loglog(X,np.sqrt(Y))
+        self.handle.set_xscale('log')
+        self.handle.set_yscale('log')
+        line = self.artists = self.plot_lines(X, data['noise'])
 
         self.add_grid()
         self.handle.set_xlim(xlim)
@@ -5,46 +5,82 @@
 # Commons, PO Box 1866, Mountain View, CA 94042, USA.
 
 import numpy as np
+from matplotlib.collections import PolyCollection
+from matplotlib.transforms import blended_transform_factory
 from qtpy.QtCore import Slot
 from .baseplot import BasePlot, BasePlotOptionWidget
 from .mixins import YAxisLimits, YAxisScale, XAxisSteps
 from ..helpers import to_float, float_set_from_lineedit
 
+
+class LayerLabels(object):
+    """
+    Thickness labels for the layers in an EFI plot. Labels are only created
+    for layers that are in view and wide enough on screen to hold one, and
+    are updated whenever the x limits or the canvas size change, as long as
+    this object is referenced.
+    """
+
+    # minimum layer width in pixels for a label to be shown
+    min_width = 12
+
+    def __init__(self, ax, spans, texts):
+        self.ax = ax
+        self.centres = spans.mean(axis=1)
+        self.widths = spans[:,1] - spans[:,0]
+        self.texts = texts
+        self.artists = []
+        # bound methods are only weakly referenced by matplotlib, so the
+        # callbacks go away together with the plot that owns this object
+        ax.callbacks.connect('xlim_changed', self.handle_event)
+        ax.figure.canvas.mpl_connect('resize_event', self.handle_event)
+
+    def handle_event(self, event):
+        self.update()
+
+    def update(self):
+        for a in self.artists:
+            a.remove()
+        x0, x1 = self.ax.get_xlim()
+        scale = self.ax.bbox.width / (x1 - x0)
+        visible = np.nonzero((self.widths * scale >= self.min_width) &
+                             (self.centres >= x0) & (self.centres <= x1))[0]
+        self.artists = [self.ax.text(self.centres[ii], 0.8, self.texts[ii],
+                            horizontalalignment='center', rotation='vertical')
+                        for ii in visible]
+
+
 class EFIPlot(BasePlot):
     @staticmethod
     def get_alpha(n):
         """Converts refractive index n into alpha transparency value"""
-        return min(np.log(n)/1.39, 1.0)
+        return np.clip(np.log(n)/1.39, 0.0, 1.0)
 
-    def __init__(self, handle):
+    def __init__(self, handle=None):
         super(EFIPlot, self).__init__('EFI', handle)
-    
-    def plot(self, coating):
-        wavelength = self.config.get('analysis.lambda')
-        AOI = self.config.parent.get('coating.AOI')
-        stack = coating.create_stack(wavelength, AOI=AOI)
+
+    def draw(self, data):
+        wavelength = data.meta['lambda']
+        stacks_d = data['thicknesses']
+        stacks_n = data['indices']
         
         handles = [] # holds the individual curves
 
         # create visual representation of stack
         # and refractive indices
-        total_d = np.sum(stack.stacks_d)
-        xmin = -0.5 * wavelength / stack.stacks_n[0]
-        xmax = total_d + 0.5 * wavelength / stack.stacks_n[-1]
-        xvalues = len(stack.stacks_d) * 2 + 4
+        total_d = np.sum(stacks_d)
+        xmin = -0.5 * wavelength / stacks_n[0]
+        xmax = total_d + 0.5 * wavelength / stacks_n[-1]
+        xvalues = len(stacks_d) * 2 + 4
         X = np.zeros(xvalues)
         Y = np.zeros(xvalues)
         X[0] = xmin; X[1] = -1; X[-1] = xmax; X[-2] = total_d
-        Y[0] = Y[1] = stack.stacks_n[0]
-        Y[-1] = Y[-2] = stack.stacks_n[-1]
-        ii = 1
-        current_d = 0
-        for d, n in zip(stack.stacks_d, stack.stacks_n[1:-1]):
-            X[ii*2] = current_d
-            X[ii*2+1] = current_d+d-1
-            Y[ii*2] = Y[ii*2+1] = n
-            current_d += d
-            ii += 1
+        Y[0] = Y[1] = stacks_n[0]
+        Y[-1] = Y[-2] = stacks_n[-1]
+        bounds = np.concatenate(([0], np.cumsum(stacks_d)))
+        X[2:-2:2] = bounds[:-1]
+        X[3:-2:2] = bounds[1:]-1
+        Y[2:-2] = np.repeat(stacks_n[1:-1], 2)
         handles += self.handle.plot(X,Y, color=self.colors[3])
 
         # now create EFI plot
@@ -53,31 +89,35 @@ class EFIPlot(BasePlot):
         ax2.set_ylabel('Normalised Electric Field Intensity')
         if self.config.get('yaxis.scale') == 'log':
             ax2.set_yscale('log')
-        Xefi_s,Yefi_s = stack.efi(self.config.get('xaxis.steps'), 's')
-        Xefi_p,Yefi_p = stack.efi(self.config.get('xaxis.steps'), 'p')
-        handles += ax2.plot(Xefi_s,Yefi_s, color=self.colors[0])
-        handles += ax2.plot(Xefi_p,Yefi_p, color=self.colors[1])
+        handles += ax2.plot(data['depths'], data['efi'][0], color=self.colors[0])
+        handles += ax2.plot(data['depths'], data['efi'][1], color=self.colors[1])
         if self.config.get('yaxis.limits') == 'user':
             ymin = self.config.get('yaxis.min')
             ymax = self.config.get('yaxis.max')
             ax2.set_ylim(ymin,ymax)
 
         # add in colored rectangles to visually indicate
-        # layers and their index of refraction
-        for ii in range(0, xvalues//2):
-            self.handle.axvspan(X[ii*2], X[ii*2+1],
-                color=(0.52,0.61,0.73), alpha=EFIPlot.get_alpha(Y[ii*2]))
-            if ii == 0:
-                text = 'superstrate'
-            elif ii == xvalues//2 - 1:
-                text = 'substrate'
-            else:
-                text = '{:.0f}nm'.format(stack.stacks_d[ii-1])
-            self.handle.text((X[ii*2]+X[ii*2+1])//2, 0.8, text, 
-                horizontalalignment='center', rotation='vertical')
+        # layers and their index of refraction, as a single artist
+        spans = X.reshape(-1, 2)
+        verts = np.zeros((len(spans), 4, 2))
+        verts[:,0,0] = verts[:,3,0] = spans[:,0]
+        verts[:,1,0] = verts[:,2,0] = spans[:,1]
+        verts[:,2,1] = verts[:,3,1] = 1.0
+        colors = np.zeros((len(spans), 4))
+        colors[:,:3] = (0.52,0.61,0.73)
+        colors[:,3] = EFIPlot.get_alpha(Y[::2])
+        transform = blended_transform_factory(self.handle.transData,
+                                              self.handle.transAxes)
+        self.handle.add_collection(PolyCollection(verts, facecolors=colors,
+            edgecolors='none', transform=transform), autolim=False)
+
+        texts = (['superstrate'] +
+                 ['{:.0f}nm'.format(d) for d in stacks_d] +
+                 ['substrate'])
+        self.labels = LayerLabels(self.handle, spans, texts)
 
         self.handle.set_xlim(xmin, xmax)
-        self.handle.set_ylim(0, np.max(stack.stacks_n)+1)
+        self.handle.set_ylim(0, np.max(stacks_n)+1)
         self.handle.set_ylabel('Refractive Index')
         self.handle.set_xlabel('Position (nm)')
         self.add_legend(handles, ['Refr. index', 'EFI s-pol', 'EFI p-pol'])
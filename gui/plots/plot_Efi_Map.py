@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+# This work is licensed under the Creative Commons Attribution-NonCommercial-
+# ShareAlike 4.0 International License. To view a copy of this license, visit
+# http://creativecommons.org/licenses/by-nc-sa/4.0/ or send a letter to Creative
+# Commons, PO Box 1866, Mountain View, CA 94042, USA.
+
+import numpy as np
+from matplotlib.colors import LogNorm
+from qtpy.QtCore import Slot
+from .baseplot import SpectralPlot, BasePlotOptionWidget
+from .mixins import XAxisLimits, XAxisSteps
+from ..helpers import to_float, int_set_from_lineedit
+
+
+class EFIMapPlot(SpectralPlot):
+    """
+    Electric field intensity over depth and wavelength for one polarisation.
+    All wavelengths are computed in a single batched pass.
+    """
+
+    def __init__(self, handle=None):
+        super(EFIMapPlot, self).__init__('efi_map', handle)
+
+    def draw(self, data):
+        lambda0 = data.meta['lambda0']
+        pol = 1 if self.config.get('analysis.polarisation') == 'p' else 0
+        X, depths = data['wavelengths'], data['depths']
+        Z = data['efi'][pol]
+
+        norm = None
+        if self.config.get('colorbar.scale') == 'log':
+            norm = LogNorm(vmin=max(np.min(Z), 1e-6 * np.max(Z)), vmax=np.max(Z))
+        mesh = self.handle.pcolormesh(X, depths, Z,
+                                      shading='auto', norm=norm)
+        self.handle.figure.colorbar(mesh, ax=self.handle,
+            label='Normalised Electric Field Intensity')
+
+        # layer interfaces as a single artist
+        bounds = np.concatenate(([0], np.cumsum(data['thicknesses'])))
+        self.handle.hlines(bounds, X[0], X[-1],
+                           colors='w', linewidth=0.5, alpha=0.5)
+        self.handle.axvline(lambda0, ls='--', color=self.colors[4], linewidth=1.5)
+
+        self.handle.set_xlim(X[0], X[-1])
+        self.handle.set_ylim(depths[-1], depths[0])
+        self.handle.set_xlabel('Wavelength (nm)')
+        self.handle.set_ylabel('Position (nm)')
+        self.add_copyright()
+
+
+class EFIMapOptions(XAxisLimits, XAxisSteps, BasePlotOptionWidget):
+    def __init__(self, parent):
+        super(EFIMapOptions, self).__init__('efi_map', parent)
+
+    def initialise_options(self):
+        super(EFIMapOptions, self).initialise_options()
+        self.txtDepthSteps.setText(to_float(self.config.get('analysis.steps')))
+        if self.config.get('analysis.polarisation') == 'p':
+            self.rbPolP.setChecked(True)
+        else:
+            self.rbPolS.setChecked(True)
+        if self.config.get('colorbar.scale') == 'log':
+            self.rbCScaleLog.setChecked(True)
+        else:
+            self.rbCScaleLin.setChecked(True)
+
+    # ==== SLOTS ====
+    @Slot()
+    def on_txtDepthSteps_editingFinished(self):
+        int_set_from_lineedit(self.txtDepthSteps, self.config, 'analysis.steps', self)
+
+    @Slot(bool)
+    def on_rbPolS_clicked(self, checked):
+        if checked:
+            self.config.set('analysis.polarisation', 's')
+
+    @Slot(bool)
+    def on_rbPolP_clicked(self, checked):
+        if checked:
+            self.config.set('analysis.polarisation', 'p')
+
+    @Slot(bool)
+    def on_rbCScaleLin_clicked(self, checked):
+        if checked:
+            self.config.set('colorbar.scale', 'lin')
+
+    @Slot(bool)
+    def on_rbCScaleLog_clicked(self, checked):
+        if checked:
+            self.config.set('colorbar.scale', 'log')
+
+
+info = {
+    'efi_map': {
+        'description': 'EFI over Depth and Wavelength',
+        'plotter': EFIMapPlot,
+        'options': EFIMapOptions,
+    }
+}
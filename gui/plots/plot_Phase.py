@@ -7,41 +7,43 @@
 import numpy as np
 import matplotlib
 from qtpy.QtCore import Slot
-from .baseplot import BasePlot, BasePlotOptionWidget
-from .mixins import YAxisLimits, XAxisLimits, XAxisSteps
+from .baseplot import SpectralPlot, BasePlotOptionWidget
+from .mixins import YAxisLimits, XAxisLimits, XAxisSteps, XAxisSampling
 
-class PhasePlot(BasePlot):
-    def __init__(self, handle):
+class PhasePlot(SpectralPlot):
+    def __init__(self, handle=None):
         super(PhasePlot, self).__init__('phase', handle)
 
-    def plot(self, coating):
-        #TODO: refactor this into another function, which can be used to plot transmission as well
-        
-        lambda0 = self.config.parent.get('coating.lambda0')
-        if self.config.get('xaxis.limits') == 'auto':
-            xlim = [0.7 * lambda0, 1.3 * lambda0]
-        else:
-            xlim = [self.config.get('xaxis.min'),
-                    self.config.get('xaxis.max')]
-        
-        X = np.linspace(*xlim, num=self.config.get('xaxis.steps'))
-        Y = np.zeros((len(X), 3))
+    @staticmethod
+    def curves(data):
+        return (np.unwrap(data['phase'], axis=0)%(2*np.pi))*180/np.pi
+
+    def ylim(self):
+        # the phase is wrapped to [0, 360), so auto limits don't depend on it
+        if self.config.get('yaxis.limits') == 'user':
+            return (self.config.get('yaxis.min'), self.config.get('yaxis.max'))
+        return (0.0, 360.0)
+
+    def layout(self, data):
+        return tuple(data.meta['xlim']), self.ylim(), data.meta['lambda0']
 
-        AOI = self.config.parent.get('coating.AOI')
-        for step in range(len(X)):
-            stack = coating.create_stack(X[step], AOI=AOI)
-            Y[step,:] = stack.phase()
+    def update_artists(self, data):
+        for line, y in zip(self.artists, self.curves(data).T):
+            self.decimator.set_data(line, data['wavelengths'], y)
+        return True
 
-        handles = self.handle.plot(X,(np.unwrap(Y, axis=0)%(2*np.pi))*180/np.pi)
+    def draw(self, data):
+        lambda0 = data.meta['lambda0']
+        xlim = data.meta['xlim']
+        X = data['wavelengths']
+        handles = self.artists = self.plot_lines(X, self.curves(data))
 
         self.add_grid()
         self.handle.set_xlim(xlim)
-        if self.config.get('yaxis.limits') == 'user':
-            self.handle.set_ylim(
-                self.config.get('yaxis.min'),
-                self.config.get('yaxis.max'))
+        self.handle.set_ylim(self.ylim())
 
-        self.handle.axvline(lambda0, ls='--', color=self.colors[4], linewidth=1.5)
+        self.overlays.append(self.handle.axvline(lambda0, ls='--',
+            color=self.colors[4], linewidth=1.5))
         
         self.handle.set_xlabel('Wavelength (nm)')
         self.handle.set_ylabel('Phase (deg)')
@@ -49,7 +51,7 @@ class PhasePlot(BasePlot):
         self.add_copyright()
 
 
-class PhaseOptions(XAxisLimits, YAxisLimits, XAxisSteps, BasePlotOptionWidget):
+class PhaseOptions(XAxisLimits, YAxisLimits, XAxisSteps, XAxisSampling, BasePlotOptionWidget):
     def __init__(self, parent):
         super(PhaseOptions, self).__init__('phase', parent)
 
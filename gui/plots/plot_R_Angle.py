@@ -8,40 +8,20 @@ import numpy as np
 import matplotlib
 from qtpy.QtCore import Slot
 from .baseplot import BasePlot, BasePlotOptionWidget
-from .mixins import YAxisLimits, XAxisLimits, YAxisScale, XAxisSteps
+from .. import sweep
+from .mixins import YAxisLimits, XAxisLimits, YAxisScale, XAxisSteps, XAxisSampling
 
 
 class R_AnglePlot(BasePlot):
 
-    def __init__(self, handle):
-        super(R_AnglePlot, self).__init__('r_angle', handle)
-
-    def plot(self, coating):
-        def to_refl(val, position):
-            refl = 1-10**(-val)
-            return '{:.7g}'.format(refl)
-
-        yLocator = matplotlib.ticker.MultipleLocator(1.0)
-        yFormatter = matplotlib.ticker.FuncFormatter(to_refl)
-        
-        #TODO: refactor this into another function, which can be used to plot transmission as well
-        
-        AOI = self.config.parent.get('coating.AOI')
-        lambda0 = self.config.parent.get('coating.lambda0')
-
-        if self.config.get('xaxis.limits') == 'auto':
-            xlim = [0.0, min(max(60,AOI+5), 80)]
-        else:
-            xlim = [self.config.get('xaxis.min'),
-                    self.config.get('xaxis.max')]
-        
-        X = np.linspace(*xlim, num=self.config.get('xaxis.steps'))
-        Y = np.zeros((len(X), 2))
+    solver = sweep.IncrementalSolver()
 
-        for step in range(len(X)):
-            stack = coating.create_stack(lambda0, AOI=X[step])
-            Y[step,:] = stack.reflectivity()
+    def __init__(self, handle=None):
+        super(R_AnglePlot, self).__init__('r_angle', handle)
 
+    def curves(self, data):
+        """Reflectivity as drawn, and the y limits."""
+        Y = data['R']
         auto_y = self.config.get('yaxis.limits') == 'auto'
         
         if auto_y:
@@ -60,14 +40,40 @@ class R_AnglePlot(BasePlot):
             else:
                 ylim[0] = -np.log10(1.0-ylim[0])
                 ylim[1] = -np.log10(1.0-ylim[1]+1e-6)
+        return Y, ylim
+
+    def layout(self, data):
+        _, ylim = self.curves(data)
+        return (tuple(data.meta['xlim']), tuple(ylim),
+                self.config.get('yaxis.scale'), data.meta['AOI'])
+
+    def update_artists(self, data):
+        Y, _ = self.curves(data)
+        for line, y in zip(self.artists, Y.T):
+            self.decimator.set_data(line, data['AOI'], y)
+        return True
+
+    def draw(self, data):
+        def to_refl(val, position):
+            refl = 1-10**(-val)
+            return '{:.7g}'.format(refl)
+
+        yLocator = matplotlib.ticker.MultipleLocator(1.0)
+        yFormatter = matplotlib.ticker.FuncFormatter(to_refl)
+        
+        AOI = data.meta['AOI']
+        xlim = data.meta['xlim']
+        X = data['AOI']
+        Y, ylim = self.curves(data)
 
-        handles = self.handle.plot(X,Y)
+        handles = self.artists = self.plot_lines(X, Y)
 
         self.add_grid()
         self.handle.set_xlim(xlim)
         self.handle.set_ylim(ylim)
         
-        self.handle.axvline(AOI, ls='--', color=self.colors[4], linewidth=1.5)
+        self.overlays.append(self.handle.axvline(AOI, ls='--',
+            color=self.colors[4], linewidth=1.5))
          
         if self.config.get('yaxis.scale') == 'log':
             self.handle.set_yscale('log')
@@ -80,7 +86,7 @@ class R_AnglePlot(BasePlot):
         self.add_copyright()
 
 
-class R_AngleOptions(XAxisLimits, YAxisLimits, YAxisScale, XAxisSteps, BasePlotOptionWidget):
+class R_AngleOptions(XAxisLimits, YAxisLimits, YAxisScale, XAxisSteps, XAxisSampling, BasePlotOptionWidget):
     def __init__(self, parent):
         super(R_AngleOptions, self).__init__('r_angle', parent)
 
@@ -6,39 +6,17 @@
 
 import numpy as np
 import matplotlib
-from .mixins import YAxisLimits, XAxisLimits, YAxisScale, XAxisSteps
-from .baseplot import BasePlot, BasePlotOptionWidget
+from .mixins import YAxisLimits, XAxisLimits, YAxisScale, XAxisSteps, XAxisSampling
+from .baseplot import SpectralPlot, BasePlotOptionWidget
 from qtpy.QtCore import Slot
 
-class R_LambdaPlot(BasePlot):
-    def __init__(self, handle):
+class R_LambdaPlot(SpectralPlot):
+    def __init__(self, handle=None):
         super(R_LambdaPlot, self).__init__('r_lambda', handle)
         
-    def plot(self, coating):
-        def to_refl(val, position):
-            refl = 1-10**(-val)
-            return '{:.7g}'.format(refl)
-
-        yLocator = matplotlib.ticker.MultipleLocator(1.0)
-        yFormatter = matplotlib.ticker.FuncFormatter(to_refl)
-        
-        #TODO: refactor this into another function, which can be used to plot transmission as well
-        
-        lambda0 = self.config.parent.get('coating.lambda0')
-        if self.config.get('xaxis.limits') == 'auto':
-            xlim = [0.7 * lambda0, 1.3 * lambda0]
-        else:
-            xlim = [self.config.get('xaxis.min'),
-                    self.config.get('xaxis.max')]
-        
-        X = np.linspace(*xlim, num=self.config.get('xaxis.steps'))
-        Y = np.zeros((len(X), 2))
-
-        AOI = self.config.parent.get('coating.AOI')
-        for step in range(len(X)):
-            stack = coating.create_stack(X[step], AOI=AOI)
-            Y[step,:] = stack.reflectivity()
-
+    def curves(self, data):
+        """Reflectivity as drawn, and the y limits."""
+        Y = data['R']
         auto_y = self.config.get('yaxis.limits') == 'auto'
         
         if auto_y:
@@ -57,14 +35,40 @@ class R_LambdaPlot(BasePlot):
             else:
                 ylim[0] = -np.log10(1.0-ylim[0])
                 ylim[1] = -np.log10(1.0-ylim[1]+1e-6)
+        return Y, ylim
+
+    def layout(self, data):
+        _, ylim = self.curves(data)
+        return (tuple(data.meta['xlim']), tuple(ylim),
+                self.config.get('yaxis.scale'), data.meta['lambda0'])
+
+    def update_artists(self, data):
+        Y, _ = self.curves(data)
+        for line, y in zip(self.artists, Y.T):
+            self.decimator.set_data(line, data['wavelengths'], y)
+        return True
+
+    def draw(self, data):
+        def to_refl(val, position):
+            refl = 1-10**(-val)
+            return '{:.7g}'.format(refl)
+
+        yLocator = matplotlib.ticker.MultipleLocator(1.0)
+        yFormatter = matplotlib.ticker.FuncFormatter(to_refl)
+        
+        lambda0 = data.meta['lambda0']
+        xlim = data.meta['xlim']
+        X = data['wavelengths']
+        Y, ylim = self.curves(data)
 
-        handles = self.handle.plot(X,Y)
+        handles = self.artists = self.plot_lines(X, Y)
 
         self.add_grid()
         self.handle.set_xlim(xlim)
         self.handle.set_ylim(ylim)
         
-        self.handle.axvline(lambda0, ls='--', color=self.colors[4], linewidth=1.5)
+        self.overlays.append(self.handle.axvline(lambda0, ls='--',
+            color=self.colors[4], linewidth=1.5))
         if self.config.get('yaxis.scale') == 'log':
             self.handle.set_yscale('log')
             self.handle.yaxis.set_major_formatter(yFormatter)
@@ -76,7 +80,7 @@ class R_LambdaPlot(BasePlot):
         self.add_copyright()
 
 
-class R_LambdaOptions(XAxisSteps, XAxisLimits, YAxisLimits, YAxisScale, BasePlotOptionWidget):
+class R_LambdaOptions(XAxisSteps, XAxisSampling, XAxisLimits, YAxisLimits, YAxisScale, BasePlotOptionWidget):
     def __init__(self, parent):
         super(R_LambdaOptions, self).__init__('r_lambda', parent)
 
@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+# This work is licensed under the Creative Commons Attribution-NonCommercial-
+# ShareAlike 4.0 International License. To view a copy of this license, visit
+# http://creativecommons.org/licenses/by-nc-sa/4.0/ or send a letter to Creative
+# Commons, PO Box 1866, Mountain View, CA 94042, USA.
+
+import numpy as np
+from qtpy.QtCore import Slot
+from .baseplot import SpectralPlot, BasePlotOptionWidget
+from .mixins import XAxisLimits, YAxisLimits, XAxisSteps, YAxisSteps
+
+
+class R_MapPlot(SpectralPlot):
+    """
+    Reflectivity over wavelength and angle of incidence as an image. The
+    grid is solved in blocks by sweep.reflectivity_map(), so large
+    resolutions only cost the memory of the image itself.
+    """
+
+    def __init__(self, handle=None):
+        super(R_MapPlot, self).__init__('r_map', handle)
+
+    def image(self, data):
+        """Reflectivity of the selected polarisation."""
+        pol = self.config.get('analysis.polarisation')
+        if pol == 's':
+            return data['R'][...,0]
+        elif pol == 'p':
+            return data['R'][...,1]
+        else:
+            return data['R'].mean(axis=-1)
+
+    def layout(self, data):
+        X, Y = data['wavelengths'], data['AOI']
+        return (X[0], X[-1], len(X), Y[0], Y[-1], len(Y),
+                data.meta['lambda0'], data.meta['AOI'])
+
+    def update_artists(self, data):
+        self.artists[0].set_data(self.image(data))
+        return True
+
+    def draw(self, data):
+        lambda0 = data.meta['lambda0']
+        AOI = data.meta['AOI']
+        Z = self.image(data)
+
+        # extent covers the pixel edges, so pixels are centred on the samples
+        X, Y = data['wavelengths'], data['AOI']
+        dx = (X[-1] - X[0]) / max(len(X) - 1, 1) / 2
+        dy = (Y[-1] - Y[0]) / max(len(Y) - 1, 1) / 2
+        image = self.handle.imshow(Z, origin='lower', aspect='auto',
+            interpolation='nearest', vmin=0.0, vmax=1.0,
+            extent=[X[0]-dx, X[-1]+dx, Y[0]-dy, Y[-1]+dy])
+        self.artists = [image]
+        self.handle.figure.colorbar(image, ax=self.handle, label='Reflectivity')
+
+        self.overlays.append(self.handle.axvline(lambda0, ls='--',
+            color=self.colors[4], linewidth=1.5))
+        self.overlays.append(self.handle.axhline(AOI, ls='--',
+            color=self.colors[4], linewidth=1.5))
+
+        self.handle.set_xlabel('Wavelength (nm)')
+        self.handle.set_ylabel('Angle of Incidence (deg)')
+        self.add_copyright()
+
+
+class R_MapOptions(XAxisLimits, YAxisLimits, XAxisSteps, YAxisSteps, BasePlotOptionWidget):
+    def __init__(self, parent):
+        super(R_MapOptions, self).__init__('r_map', parent)
+
+    def initialise_options(self):
+        super(R_MapOptions, self).initialise_options()
+        pol = self.config.get('analysis.polarisation')
+        if pol == 's':
+            self.rbPolS.setChecked(True)
+        elif pol == 'p':
+            self.rbPolP.setChecked(True)
+        else:
+            self.rbPolAvg.setChecked(True)
+
+    # ==== SLOTS ====
+    @Slot(bool)
+    def on_rbPolS_clicked(self, checked):
+        if checked:
+            self.config.set('analysis.polarisation', 's')
+
+    @Slot(bool)
+    def on_rbPolP_clicked(self, checked):
+        if checked:
+            self.config.set('analysis.polarisation', 'p')
+
+    @Slot(bool)
+    def on_rbPolAvg_clicked(self, checked):
+        if checked:
+            self.config.set('analysis.polarisation', 'avg')
+
+
+info = {
+    'r_map': {
+        'description': 'Reflectivity over Wavelength and Angle',
+        'plotter': R_MapPlot,
+        'options': R_MapOptions,
+    }
+}
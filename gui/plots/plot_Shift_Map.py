@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+# This work is licensed under the Creative Commons Attribution-NonCommercial-
+# ShareAlike 4.0 International License. To view a copy of this license, visit
+# http://creativecommons.org/licenses/by-nc-sa/4.0/ or send a letter to Creative
+# Commons, PO Box 1866, Mountain View, CA 94042, USA.
+
+import numpy as np
+from qtpy.QtCore import Slot
+from .baseplot import SpectralPlot, BasePlotOptionWidget
+from ..wizard import Wizard
+from .mixins import XAxisLimits, XAxisSteps
+from ..helpers import to_float, float_set_from_lineedit
+
+
+class Shift_MapPlot(SpectralPlot):
+    """
+    Reflectivity over wavelength with all layer thicknesses scaled by a
+    range of percentages, as in Wizard.shift_stack(). All shifts are solved
+    in one batched sweep with shared dispersion data; clicking on a row
+    applies its shift to the stack.
+    """
+
+    def __init__(self, handle=None):
+        super(Shift_MapPlot, self).__init__('shift_map', handle)
+        self.shifts = None
+
+    def image(self, data):
+        """Reflectivity of the selected polarisation."""
+        pol = self.config.get('analysis.polarisation')
+        if pol == 's':
+            return data['R'][...,0]
+        elif pol == 'p':
+            return data['R'][...,1]
+        else:
+            return data['R'].mean(axis=-1)
+
+    def layout(self, data):
+        X, Y = data['wavelengths'], data['shifts']
+        return (X[0], X[-1], len(X), Y[0], Y[-1], len(Y), data.meta['lambda0'])
+
+    def update_artists(self, data):
+        self.artists[0].set_data(self.image(data))
+        return True
+
+    def draw(self, data):
+        lambda0 = data.meta['lambda0']
+        Z = self.image(data)
+
+        # extent covers the pixel edges, so pixels are centred on the samples
+        X = data['wavelengths']
+        Y = self.shifts = data['shifts']
+        dx = (X[-1] - X[0]) / max(len(X) - 1, 1) / 2
+        dy = (Y[-1] - Y[0]) / max(len(Y) - 1, 1) / 2
+        image = self.handle.imshow(Z, origin='lower', aspect='auto',
+            interpolation='nearest', vmin=0.0, vmax=1.0,
+            extent=[X[0]-dx, X[-1]+dx, Y[0]-dy, Y[-1]+dy])
+        self.artists = [image]
+        self.handle.figure.colorbar(image, ax=self.handle, label='Reflectivity')
+
+        self.overlays.append(self.handle.axvline(lambda0, ls='--',
+            color=self.colors[4], linewidth=1.5))
+        self.overlays.append(self.handle.axhline(0.0, ls='--',
+            color=self.colors[4], linewidth=1.5))
+
+        self.handle.set_xlabel('Wavelength (nm)')
+        self.handle.set_ylabel('Thickness Change (%)')
+        self.add_copyright()
+
+    def click_action(self, x, y):
+        if self.shifts is None:
+            return None
+        shift = float(self.shifts[np.argmin(np.abs(self.shifts - y))])
+        if shift == 0:
+            return None
+        def apply():
+            Wizard(None).shift_stack(shift)
+        return 'Change all layer thicknesses by {0:+.4g}%?'.format(shift), apply
+
+
+class Shift_MapOptions(XAxisLimits, XAxisSteps, BasePlotOptionWidget):
+    def __init__(self, parent):
+        super(Shift_MapOptions, self).__init__('shift_map', parent)
+
+    def initialise_options(self):
+        super(Shift_MapOptions, self).initialise_options()
+        self.txtShiftMin.setText(to_float(self.config.get('shift.min')))
+        self.txtShiftMax.setText(to_float(self.config.get('shift.max')))
+        self.txtShiftStep.setText(to_float(self.config.get('shift.step')))
+        pol = self.config.get('analysis.polarisation')
+        if pol == 's':
+            self.rbPolS.setChecked(True)
+        elif pol == 'p':
+            self.rbPolP.setChecked(True)
+        else:
+            self.rbPolAvg.setChecked(True)
+
+    # ==== SLOTS ====
+    @Slot()
+    def on_txtShiftMin_editingFinished(self):
+        float_set_from_lineedit(self.txtShiftMin, self.config, 'shift.min', self)
+
+    @Slot()
+    def on_txtShiftMax_editingFinished(self):
+        float_set_from_lineedit(self.txtShiftMax, self.config, 'shift.max', self)
+
+    @Slot()
+    def on_txtShiftStep_editingFinished(self):
+        float_set_from_lineedit(self.txtShiftStep, self.config, 'shift.step', self)
+
+    @Slot(bool)
+    def on_rbPolS_clicked(self, checked):
+        if checked:
+            self.config.set('analysis.polarisation', 's')
+
+    @Slot(bool)
+    def on_rbPolP_clicked(self, checked):
+        if checked:
+            self.config.set('analysis.polarisation', 'p')
+
+    @Slot(bool)
+    def on_rbPolAvg_clicked(self, checked):
+        if checked:
+            self.config.set('analysis.polarisation', 'avg')
+
+
+info = {
+    'shift_map': {
+        'description': 'Stack Shift Explorer',
+        'plotter': Shift_MapPlot,
+        'options': Shift_MapOptions,
+    }
+}
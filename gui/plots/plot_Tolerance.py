@@ -0,0 +1,179 @@
+#!/usr/bin/env python
+# This work is licensed under the Creative Commons Attribution-NonCommercial-
+# ShareAlike 4.0 International License. To view a copy of this license, visit
+# http://creativecommons.org/licenses/by-nc-sa/4.0/ or send a letter to Creative
+# Commons, PO Box 1866, Mountain View, CA 94042, USA.
+
+import numpy as np
+from qtpy.QtCore import Slot, Qt
+from qtpy.QtWidgets import QTableWidgetItem
+from .baseplot import SpectralPlot, BasePlotOptionWidget
+from .mixins import XAxisLimits, YAxisLimits, XAxisSteps
+from ..tolerance import ToleranceResult
+from ..helpers import (to_float, float_set_from_lineedit, int_set_from_lineedit,
+                       block_signals, float_conversion_error)
+
+
+class TolerancePlot(SpectralPlot):
+    """
+    Monte Carlo tolerance analysis: percentile bands of the reflectivity of
+    randomly perturbed coatings over the nominal curve, and the spread and
+    yield at lambda0.
+    """
+
+    # percentile ranges shown as shaded bands, from outer to inner
+    bands = [(5, 95), (25, 75)]
+
+    def __init__(self, handle=None):
+        super(TolerancePlot, self).__init__('tolerance', handle)
+
+    def draw(self, data):
+        pol = self.config.get('analysis.polarisation')
+        spec = self.config.get('analysis.spec')
+        lambda0 = data.meta['lambda0']
+        X = data['wavelengths']
+        polarisation = ToleranceResult.polarisation
+        rows = list(data['percentiles'])
+        # R holds s, p and their average along the last axis
+        R = data['R'][..., {'s': 0, 'p': 1}.get(pol, 2)]
+
+        handles = []
+        labels = []
+        for (lo, hi), alpha in zip(self.bands, [0.25, 0.45]):
+            handles.append(self.handle.fill_between(X, R[rows.index(lo)],
+                R[rows.index(hi)], alpha=alpha, linewidth=0, color=self.colors[0]))
+            labels.append('{0}-{1}%'.format(lo, hi))
+        handles += self.plot_lines(X, R[rows.index(50)], '--',
+                                   color=self.colors[0])
+        labels.append('median')
+        handles += self.plot_lines(X, polarisation(data['nominal'], pol),
+                                   color=self.colors[1])
+        labels.append('nominal')
+        self.handle.axvline(lambda0, ls='--', color=self.colors[4], linewidth=1.5)
+
+        R0 = polarisation(data['R0'], pol)
+        lo, med, hi = np.percentile(R0, [5, 50, 95])
+        self.handle.text(0.02, 0.02,
+            'R at {0:g}nm: nominal {1:.6g}, median {2:.6g}\n'
+            '5-95%: {3:.6g} - {4:.6g}, yield (R >= {5:g}): {6:.1%}'.format(
+                lambda0, polarisation(data['nominal0'], pol),
+                med, lo, hi, spec, np.mean(R0 >= spec)),
+            transform=self.handle.transAxes, size=9,
+            bbox=dict(facecolor='white', alpha=0.8, edgecolor='none'))
+
+        self.add_grid()
+        self.handle.set_xlim(X[0], X[-1])
+        if self.config.get('yaxis.limits') == 'user':
+            self.handle.set_ylim(
+                self.config.get('yaxis.min'),
+                self.config.get('yaxis.max'))
+        self.handle.set_xlabel('Wavelength (nm)')
+        self.handle.set_ylabel('Reflectivity')
+        self.add_legend(handles, labels)
+        self.add_copyright()
+
+
+class ToleranceOptions(XAxisLimits, YAxisLimits, XAxisSteps, BasePlotOptionWidget):
+    def __init__(self, parent):
+        super(ToleranceOptions, self).__init__('tolerance', parent)
+
+    def initialise_options(self):
+        super(ToleranceOptions, self).initialise_options()
+        self.txtSamples.setText(to_float(self.config.get('analysis.samples')))
+        self.txtSeed.setText(to_float(self.config.get('analysis.seed')))
+        self.txtThickness.setText(to_float(self.config.get('analysis.thickness')))
+        self.txtIndex.setText(to_float(self.config.get('analysis.index')))
+        self.txtSpec.setText(to_float(self.config.get('analysis.spec')))
+        pol = self.config.get('analysis.polarisation')
+        if pol == 's':
+            self.rbPolS.setChecked(True)
+        elif pol == 'p':
+            self.rbPolP.setChecked(True)
+        else:
+            self.rbPolAvg.setChecked(True)
+        self.initialise_errors()
+
+    def initialise_errors(self):
+        """Lists the materials of the current stack with their error overrides."""
+        errors = self.config.get('errors.materials') or {}
+        names = []
+        for m, _ in self.config.parent.get('coating.layers'):
+            if m not in names:
+                names.append(m)
+        with block_signals(self.tblErrors) as tbl:
+            tbl.setRowCount(len(names))
+            for ii, name in enumerate(names):
+                item = QTableWidgetItem(name)
+                item.setFlags(item.flags() & ~Qt.ItemIsEditable)
+                tbl.setItem(ii, 0, item)
+                for col, key in [(1, 'thickness'), (2, 'index')]:
+                    value = errors.get(name, {}).get(key)
+                    item = QTableWidgetItem('' if value is None else to_float(value))
+                    item.setTextAlignment(Qt.AlignRight)
+                    tbl.setItem(ii, col, item)
+
+    # ==== SLOTS ====
+    @Slot()
+    def on_txtSamples_editingFinished(self):
+        int_set_from_lineedit(self.txtSamples, self.config, 'analysis.samples', self)
+
+    @Slot()
+    def on_txtSeed_editingFinished(self):
+        int_set_from_lineedit(self.txtSeed, self.config, 'analysis.seed', self)
+
+    @Slot()
+    def on_txtThickness_editingFinished(self):
+        float_set_from_lineedit(self.txtThickness, self.config, 'analysis.thickness', self)
+
+    @Slot()
+    def on_txtIndex_editingFinished(self):
+        float_set_from_lineedit(self.txtIndex, self.config, 'analysis.index', self)
+
+    @Slot()
+    def on_txtSpec_editingFinished(self):
+        float_set_from_lineedit(self.txtSpec, self.config, 'analysis.spec', self)
+
+    @Slot(bool)
+    def on_rbPolS_clicked(self, checked):
+        if checked:
+            self.config.set('analysis.polarisation', 's')
+
+    @Slot(bool)
+    def on_rbPolP_clicked(self, checked):
+        if checked:
+            self.config.set('analysis.polarisation', 'p')
+
+    @Slot(bool)
+    def on_rbPolAvg_clicked(self, checked):
+        if checked:
+            self.config.set('analysis.polarisation', 'avg')
+
+    @Slot(QTableWidgetItem)
+    def on_tblErrors_itemChanged(self, item):
+        # empty cells fall back to the default error
+        errors = dict(self.config.get('errors.materials') or {})
+        name = str(self.tblErrors.item(item.row(), 0).text())
+        entry = {}
+        for col, key in [(1, 'thickness'), (2, 'index')]:
+            text = str(self.tblErrors.item(item.row(), col).text()).strip()
+            if text:
+                try:
+                    entry[key] = float(text)
+                except ValueError:
+                    float_conversion_error(text, self)
+                    self.initialise_errors()
+                    return
+        if entry:
+            errors[name] = entry
+        else:
+            errors.pop(name, None)
+        self.config.set('errors.materials', errors)
+
+
+info = {
+    'tolerance': {
+        'description': 'Tolerance Analysis (Monte Carlo)',
+        'plotter': TolerancePlot,
+        'options': ToleranceOptions,
+    }
+}
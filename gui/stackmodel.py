@@ -0,0 +1,270 @@
+#!/usr/bin/env python
+# This work is licensed under the Creative Commons Attribution-NonCommercial-
+# ShareAlike 4.0 International License. To view a copy of this license, visit
+# http://creativecommons.org/licenses/by-nc-sa/4.0/ or send a letter to Creative
+# Commons, PO Box 1866, Mountain View, CA 94042, USA.
+
+"""
+Table model of the layer stack.
+
+The rows are kept in compact arrays, an index into the list of material
+names and the thickness of each row, so that views only create the cells
+that are visible. Rows of a group of repeated layers, shown collapsed,
+refer to their period and count through a third array.
+
+Next to the rows, the model keeps the layer list and groups in the form
+stored in the config, and edits update them in place: changing a cell
+replaces a single entry of the layer list, so that the stack can be stored
+again without rebuilding it.
+"""
+
+import numpy as np
+from qtpy.QtCore import Qt, QAbstractTableModel, QModelIndex, Signal
+
+HEADERS = ['Material/Refr. Index', 'Thickness (nm)']
+
+
+def stack_rows(layers, blocks):
+    """
+    Table rows of the stack: [material, thickness] for single layers and
+    (period, count) for each group in blocks, given as [start, period,
+    count] into layers. Groups that no longer match the layers are shown
+    expanded.
+    """
+    starts = dict((b[0], b[1:]) for b in blocks)
+    rows = []
+    j = 0
+    while j < len(layers):
+        if j in starts:
+            period, count = starts[j]
+            group = layers[j:j+period*count]
+            if (period > 0 and count > 1 and len(group) == period*count and
+                    group == layers[j:j+period] * count):
+                rows.append((layers[j:j+period], count))
+                j += period * count
+                continue
+        rows.append(layers[j])
+        j += 1
+    return rows
+
+
+def format_thickness(d):
+    return '{0:.12g}'.format(d)
+
+
+class StackModel(QAbstractTableModel):
+    """
+    Rows of the stack table, see stack_rows(). New rows are empty (material
+    -1, thickness NaN) and left out of the stack until both are entered.
+
+    layers and blocks are the stack as [material, thickness] pairs and
+    [start, period, count] groups, kept up to date in place; size holds the
+    number of layers of each row. blocks_changed is set whenever the groups
+    change, e.g. as layers above a group are added or removed.
+
+    Thicknesses are entered as text and converted by parse(row, text), which
+    raises ValueError for invalid input; conversion_failed is then emitted
+    with the text and the row is left unchanged.
+    """
+
+    conversion_failed = Signal(str)
+
+    def __init__(self, parent=None, parse=None):
+        super(StackModel, self).__init__(parent)
+        self.parse = parse or (lambda row, text: float(text))
+        self.set_stack([], [])
+
+    def set_stack(self, layers, blocks):
+        rows = stack_rows(layers, blocks)
+        self.beginResetModel()
+        self.layers = [[str(m), float(d)] for m, d in layers]
+        self.blocks = []
+        self.blocks_changed = False
+        self.names = []
+        self.lookup = {}
+        self.periods = []
+        self.material = np.full(len(rows), -1, dtype=np.int32)
+        self.thickness = np.full(len(rows), np.nan)
+        self.group = np.full(len(rows), -1, dtype=np.int32)
+        self.size = np.ones(len(rows), dtype=np.int64)
+        start = 0
+        for ii, row in enumerate(rows):
+            if isinstance(row, tuple):
+                period, count = row
+                self.group[ii] = len(self.periods)
+                self.periods.append((period, count))
+                self.thickness[ii] = count * sum(d for _, d in period)
+                self.size[ii] = len(period) * count
+                self.blocks.append([start, len(period), count])
+            else:
+                self.material[ii] = self.material_index(row[0])
+                self.thickness[ii] = row[1]
+            start += self.size[ii]
+        self.endResetModel()
+
+    def material_index(self, name):
+        name = str(name)
+        if name not in self.lookup:
+            self.lookup[name] = len(self.names)
+            self.names.append(name)
+        return self.lookup[name]
+
+    def get_stack(self):
+        """Layers and groups of repeated layers, see MainWindow.get_stack()."""
+        return self.layers, self.blocks
+
+    def layer_index(self, row):
+        """Index into layers of the first layer of row."""
+        return int(self.size[:row].sum())
+
+    def block_index(self, row):
+        """Index into blocks of the group in row."""
+        return int(np.count_nonzero(self.group[:row] >= 0))
+
+    def shift_blocks(self, row, offset):
+        """Moves the groups below row by offset layers."""
+        for block in self.blocks[self.block_index(row + 1):]:
+            block[0] += offset
+        if offset:
+            self.blocks_changed = True
+
+    def is_group(self, row):
+        return 0 <= row < len(self.group) and self.group[row] >= 0
+
+    def material_name(self, row):
+        m = self.material[row]
+        return self.names[m] if m >= 0 else ''
+
+    def expand(self, row):
+        """Replaces the group in row by its single layers."""
+        if not self.is_group(row):
+            return False
+        period, count = self.periods[self.group[row]]
+        layers = [list(l) for l in period] * count
+        # the layers are already in place, only the group goes away
+        del self.blocks[self.block_index(row)]
+        self.blocks_changed = True
+        end = row + len(layers)
+        self.beginRemoveRows(QModelIndex(), row, row)
+        self.delete_rows(slice(row, row + 1))
+        self.endRemoveRows()
+        self.beginInsertRows(QModelIndex(), row, end - 1)
+        self.insert_rows(row, len(layers), 1)
+        self.endInsertRows()
+        self.material[row:end] = [self.material_index(m) for m, _ in layers]
+        self.thickness[row:end] = [d for _, d in layers]
+        self.dataChanged.emit(self.index(row, 0), self.index(end-1, 1))
+        return True
+
+    def insert_rows(self, row, count, size):
+        self.material = np.insert(self.material, row, np.full(count, -1))
+        self.thickness = np.insert(self.thickness, row, np.full(count, np.nan))
+        self.group = np.insert(self.group, row, np.full(count, -1))
+        self.size = np.insert(self.size, row, np.full(count, size))
+
+    def delete_rows(self, rows):
+        self.material = np.delete(self.material, rows)
+        self.thickness = np.delete(self.thickness, rows)
+        self.group = np.delete(self.group, rows)
+        self.size = np.delete(self.size, rows)
+
+    ### QAbstractTableModel
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.group)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else 2
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal:
+            return HEADERS[section]
+        return str(section + 1)
+
+    def flags(self, index):
+        flags = Qt.ItemIsSelectable | Qt.ItemIsEnabled
+        if not self.is_group(index.row()):
+            flags |= Qt.ItemIsEditable
+        return flags
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row, col = index.row(), index.column()
+        if role in (Qt.DisplayRole, Qt.EditRole):
+            if col == 1:
+                d = self.thickness[row]
+                return '' if np.isnan(d) else format_thickness(d)
+            if self.is_group(row):
+                period, count = self.periods[self.group[row]]
+                return '{0} x ({1})'.format(count, ' '.join(str(m) for m, _ in period))
+            return self.material_name(row)
+        if role == Qt.TextAlignmentRole:
+            return int(Qt.AlignRight | Qt.AlignVCenter)
+        if self.is_group(row):
+            if role == Qt.ToolTipRole:
+                return 'Double-click to expand'
+            if role == Qt.UserRole and col == 0:
+                period, count = self.periods[self.group[row]]
+                return [period, count]
+        return None
+
+    def setData(self, index, value, role=Qt.EditRole):
+        if not index.isValid() or role != Qt.EditRole or self.is_group(index.row()):
+            return False
+        row, col = index.row(), index.column()
+        text = str(value).strip()
+        if col == 0:
+            self.material[row] = self.material_index(text) if text else -1
+        elif not text:
+            self.thickness[row] = np.nan
+        else:
+            try:
+                self.thickness[row] = self.parse(row, text)
+            except ValueError:
+                self.conversion_failed.emit(text)
+                return False
+        self.update_layer(row)
+        self.dataChanged.emit(index, index)
+        return True
+
+    def update_layer(self, row):
+        """Brings the entry of row in layers up to date."""
+        j = self.layer_index(row)
+        complete = self.material[row] >= 0 and not np.isnan(self.thickness[row])
+        if complete:
+            layer = [self.names[self.material[row]], float(self.thickness[row])]
+            if self.size[row]:
+                self.layers[j] = layer
+            else:
+                self.layers.insert(j, layer)
+        elif self.size[row]:
+            del self.layers[j]
+        if self.size[row] != complete:
+            self.shift_blocks(row, int(complete) - int(self.size[row]))
+            self.size[row] = int(complete)
+
+    def insertRows(self, row, count, parent=QModelIndex()):
+        self.beginInsertRows(parent, row, row + count - 1)
+        self.insert_rows(row, count, 0)
+        self.endInsertRows()
+        return True
+
+    def removeRows(self, row, count, parent=QModelIndex()):
+        if row < 0 or row + count > len(self.group):
+            return False
+        self.beginRemoveRows(parent, row, row + count - 1)
+        rows = slice(row, row + count)
+        j = self.layer_index(row)
+        removed = int(self.size[rows].sum())
+        first, last = self.block_index(row), self.block_index(row + count)
+        self.shift_blocks(row + count - 1, -removed)
+        if last > first:
+            del self.blocks[first:last]
+            self.blocks_changed = True
+        del self.layers[j:j+removed]
+        self.delete_rows(rows)
+        self.endRemoveRows()
+        return True
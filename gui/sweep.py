@@ -0,0 +1,814 @@
+#!/usr/bin/env python
+# This work is licensed under the Creative Commons Attribution-NonCommercial-
+# ShareAlike 4.0 International License. To view a copy of this license, visit
+# http://creativecommons.org/licenses/by-nc-sa/4.0/ or send a letter to Creative
+# Commons, PO Box 1866, Mountain View, CA 94042, USA.
+
+"""
+Batched transfer-matrix evaluation of coatings.
+
+Instead of building one stack per sample point via coating.create_stack(),
+the characteristic matrices of all sample points are held as arrays and
+multiplied together layer by layer. Wavelengths, angles of incidence and
+thicknesses can be given as arrays of any broadcast-compatible shape.
+
+The stack is ordered superstrate, coating.layers[0], ..., coating.layers[-1],
+substrate; wavelengths and thicknesses are in nm, angles in degrees.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+from .cache import fingerprint
+from .datafile import tabulated, file_signature
+from . import parallel
+
+
+def dispersion(material, wavelengths):
+    """
+    Evaluates the refractive index of material at all wavelengths at once.
+
+    Tabulated materials are interpolated from their compiled data file;
+    materials whose n() cannot handle arrays are evaluated point by point.
+    """
+    wavelengths = np.asarray(wavelengths, dtype=float)
+    n_file = material.save().get('n_file')
+    if n_file:
+        return tabulated(n_file).value(wavelengths)
+    try:
+        n = np.asarray(material.n(wavelengths))
+    except (TypeError, ValueError):
+        n = None
+    if n is None or n.shape not in [(), wavelengths.shape]:
+        n = np.array([material.n(w) for w in wavelengths.ravel()])
+        n = n.reshape(wavelengths.shape)
+    return np.broadcast_to(n, wavelengths.shape)
+
+
+def stack_materials(coating):
+    """Returns all media of coating, from superstrate to substrate."""
+    return ([coating.superstrate] +
+            [l.material for l in coating.layers] +
+            [coating.substrate])
+
+
+def material_key(material):
+    """
+    Identifies a material by its name and full definition, and by the size
+    and modification time of its tabulated data file, if it has one.
+    """
+    definition = material.save()
+    signature = None
+    n_file = definition.get('n_file')
+    if n_file:
+        try:
+            signature = file_signature(n_file)
+        except OSError:
+            pass
+    return fingerprint(str(material.name), definition, signature)
+
+
+def material_keys(media):
+    """material_key() of each medium, computed once per distinct material."""
+    known = {}
+    for m in media:
+        if id(m) not in known:
+            known[id(m)] = material_key(m)
+    return [known[id(m)] for m in media]
+
+
+def array_nbytes(a):
+    """Memory held by array a, counting broadcast dimensions only once."""
+    return a.itemsize * int(np.prod([n for n, stride in zip(a.shape, a.strides)
+                                     if stride != 0]))
+
+
+def array_key(*arrays):
+    """Identifies the contents of arrays, for use as a dictionary key."""
+    arrays = [np.asarray(a, dtype=float) for a in arrays]
+    digest = hashlib.sha1()
+    for a in arrays:
+        digest.update(a.tobytes())
+    return tuple(a.shape for a in arrays) + (digest.hexdigest(),)
+
+
+# default memory budget of DispersionTable, in bytes
+DISPERSION_BYTES = 64 << 20
+
+
+class DispersionTable(object):
+    """
+    Refractive indices of materials over sweep grids. Each distinct material
+    is evaluated once per grid, and the result is shared by all layers made
+    of it and by all sweeps over the same grid until it is evicted.
+
+    Entries are keyed by material_key(), so editing a material or its data
+    file never returns stale indices. Least recently used entries are
+    evicted until the index arrays take at most maxbytes.
+    """
+
+    def __init__(self, maxbytes=DISPERSION_BYTES):
+        self.maxbytes = maxbytes
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.size = 0
+
+    def lookup(self, material, wavelengths, key=None, grid=None):
+        key = (key or material_key(material), grid or array_key(wavelengths))
+        with self.lock:
+            n = self.entries.pop(key, None)
+            if n is not None:
+                self.entries[key] = n
+                return n
+        n = dispersion(material, wavelengths)
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.size -= array_nbytes(old)
+            self.entries[key] = n
+            self.size += array_nbytes(n)
+            while self.size > self.maxbytes and len(self.entries) > 1:
+                _, old = self.entries.popitem(last=False)
+                self.size -= array_nbytes(old)
+        return n
+
+    def indices(self, media, wavelengths, keys=None):
+        """Refractive indices of all media, one array per medium."""
+        grid = array_key(wavelengths)
+        if keys is None:
+            keys = material_keys(media)
+        return [self.lookup(m, wavelengths, k, grid) for m, k in zip(media, keys)]
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+
+dispersions = DispersionTable()
+
+
+def stack_indices(coating, wavelengths):
+    """Refractive indices of all media of coating, one array per medium."""
+    return dispersions.indices(stack_materials(coating), wavelengths)
+
+
+def stack_thicknesses(coating):
+    return np.array([l.thickness for l in coating.layers], dtype=float)
+
+
+def admittance(n, n_sin):
+    """
+    Returns cos(theta) inside a medium of index n and its tilted optical
+    admittances for s and p polarisation, stacked along the first axis.
+
+    n_sin is the Snell invariant n0*sin(theta0).
+    """
+    n = np.asarray(n, dtype=complex)
+    cos = np.sqrt(1.0 - (n_sin / n)**2)
+    return cos, np.stack(np.broadcast_arrays(n * cos, n / cos))
+
+
+def layer_matrix(n, d, wavelengths, n_sin):
+    """
+    Characteristic matrix of a single layer as a tuple (m11, m12, m21, m22),
+    each of shape (2, ...) for s and p polarisation.
+    """
+    cos, eta = admittance(n, n_sin)
+    phase = 2 * np.pi * n * cos * d / wavelengths
+    c = np.cos(phase)
+    s = 1j * np.sin(phase)
+    return (c, s / eta, s * eta, c)
+
+
+IDENTITY = (1.0, 0.0, 0.0, 1.0)
+
+
+def multiply(a, b):
+    """Element-wise product of two batched 2x2 matrices a*b."""
+    return (a[0]*b[0] + a[1]*b[2], a[0]*b[1] + a[1]*b[3],
+            a[2]*b[0] + a[3]*b[2], a[2]*b[1] + a[3]*b[3])
+
+
+def normalise(M, scale=0.0):
+    """
+    Divides the batched 2x2 matrix M by its largest element at each point
+    and adds the logarithm of that factor to scale. Returns (M, scale).
+    """
+    norm = np.maximum(np.maximum(np.abs(M[0]), np.abs(M[1])),
+                      np.maximum(np.abs(M[2]), np.abs(M[3])))
+    norm = np.where(norm > 0, norm, 1.0)
+    return tuple(m / norm for m in M), scale + np.log(norm)
+
+
+def matrix_power(M, count):
+    """
+    M**count of a batched 2x2 matrix by repeated squaring, as (M, scale)
+    with the result normalised by exp(scale) so that it cannot overflow.
+    """
+    M, scale = normalise(M)
+    result, result_scale = IDENTITY, 0.0
+    while count:
+        if count & 1:
+            result, result_scale = normalise(multiply(result, M),
+                                             result_scale + scale)
+        count >>= 1
+        if count:
+            M, scale = normalise(multiply(M, M), 2 * scale)
+    return result, result_scale
+
+
+# repeated groups of layers are evaluated as matrix powers if they span at
+# least MIN_REPEAT_LAYERS layers, with up to MAX_REPEAT_PERIOD layers per period
+MIN_REPEAT_LAYERS = 8
+MAX_REPEAT_PERIOD = 8
+
+# the product of the layer matrices is rescaled after this many layers,
+# since it grows exponentially inside stop bands and in absorbing layers
+NORMALISE_LAYERS = 32
+
+
+def find_repeats(signatures, max_period=MAX_REPEAT_PERIOD,
+                 min_layers=MIN_REPEAT_LAYERS):
+    """
+    Finds runs of a repeated group of layers in a list of layer signatures,
+    such as (material, thickness) pairs. Returns (start, period, count) for
+    each run of count repetitions of period layers that spans at least
+    min_layers layers; runs are picked greedily from the top of the stack.
+    """
+    repeats = []
+    N = len(signatures)
+    j = 0
+    while j < N:
+        period, count = 0, 0
+        for p in range(1, min(max_period, (N - j) // 2) + 1):
+            c = 1
+            while (j + (c + 1) * p <= N and
+                   signatures[j+c*p:j+(c+1)*p] == signatures[j:j+p]):
+                c += 1
+            if c > 1 and p * c > period * count:
+                period, count = p, c
+        if period * count >= min_layers:
+            repeats.append((j, period, count))
+            j += period * count
+        else:
+            j += 1
+    return repeats
+
+
+def stack_repeats(coating):
+    """find_repeats() over the layers of coating."""
+    keys = material_keys([l.material for l in coating.layers])
+    return find_repeats(list(zip(keys, stack_thicknesses(coating).tolist())))
+
+
+def amplitudes(indices, thicknesses, wavelengths, AOI=0.0, progress=None,
+               repeats=()):
+    """
+    Complex reflection and transmission amplitudes of a multi-layer stack.
+
+    indices holds one array (or scalar) per medium, from superstrate to
+    substrate, and thicknesses one entry per layer; both broadcast against
+    wavelengths and AOI. Returns (r, t) with a leading axis of length 2 for
+    s and p polarisation.
+
+    repeats lists repeated groups of layers as (start, period, count), as
+    returned by find_repeats(); each is evaluated as the count-th power of
+    the matrix of its first period, in O(log count) products.
+
+    If given, progress is called with the completed fraction after each
+    layer or repeated group; it may raise to abort the computation.
+    """
+    wavelengths = np.asarray(wavelengths, dtype=float)
+    n_sin = np.asarray(indices[0], dtype=complex) * np.sin(np.radians(AOI))
+    # give the Snell invariant the dimensions of the full grid, so that the
+    # polarisation axis of all admittances lines up
+    ndim = max(np.ndim(a) for a in [wavelengths] + list(indices) + list(thicknesses))
+    n_sin = n_sin.reshape((1,) * (ndim - n_sin.ndim) + n_sin.shape)
+
+    M = None
+    scale = 0.0
+    num_layers = len(indices) - 2
+    repeats = dict((r[0], r[1:]) for r in repeats)
+    j = 0
+    while j < num_layers:
+        if j in repeats:
+            period, count = repeats[j]
+            L = IDENTITY
+            for k in range(j, j + period):
+                L = multiply(L, layer_matrix(indices[k+1], thicknesses[k],
+                                             wavelengths, n_sin))
+            L, block_scale = matrix_power(L, count)
+            M, scale = normalise(L if M is None else multiply(M, L),
+                                 scale + block_scale)
+            j += period * count
+        else:
+            L = layer_matrix(indices[j+1], thicknesses[j], wavelengths, n_sin)
+            M = L if M is None else multiply(M, L)
+            j += 1
+            if j % NORMALISE_LAYERS == 0:
+                M, scale = normalise(M, scale)
+        if progress:
+            progress(float(j) / num_layers)
+
+    _, eta0 = admittance(indices[0], n_sin)
+    _, etas = admittance(indices[-1], n_sin)
+    r, t = terminate(M or IDENTITY, eta0, etas)
+    # M was divided by exp(scale); r does not depend on its magnitude
+    return r, t * np.exp(-scale)
+
+
+def terminate(M, eta0, etas):
+    """
+    Reflection and transmission amplitudes of the stack with total
+    characteristic matrix M between media of admittances eta0 and etas.
+    """
+    B = M[0] + M[1] * etas
+    C = M[2] + M[3] * etas
+    denom = eta0 * B + C
+    return (eta0 * B - C) / denom, 2 * eta0 / denom
+
+
+class SpectralResult(object):
+    """
+    Complex amplitudes of a coating from a single sweep, from which
+    reflectivity, transmission and phase are derived without solving the
+    stack again.
+
+    r and t carry a leading axis of length 2 for s and p polarisation.
+    """
+
+    def __init__(self, wavelengths, AOI, r, t, eta0, etas):
+        self.wavelengths = wavelengths
+        self.AOI = AOI
+        self.r = r
+        self.t = t
+        self.eta0 = eta0
+        self.etas = etas
+
+    @staticmethod
+    def _pol_last(Y):
+        return np.moveaxis(Y, 0, -1)
+
+    def reflectivity(self):
+        """s and p reflectivity, with polarisation as the last axis."""
+        return self._pol_last(np.abs(self.r)**2)
+
+    def transmission(self):
+        """s and p transmission, with polarisation as the last axis."""
+        T = np.real(self.etas) / np.real(self.eta0) * np.abs(self.t)**2
+        return self._pol_last(T)
+
+    def phase(self):
+        """
+        Reflection phase (rad) of s and p polarisation and their difference,
+        with these three as the last axis.
+        """
+        phi = np.angle(self.r)
+        return self._pol_last(np.concatenate((phi, phi[:1] - phi[1:])))
+
+
+def concatenate(results):
+    """Joins SpectralResults of one-dimensional sweeps along the sweep axis."""
+    def join(values):
+        if np.ndim(values[0]) == 0:
+            return values[0]
+        return np.concatenate(values, axis=-1)
+    return SpectralResult(*[join([getattr(r, a) for r in results])
+        for a in ['wavelengths', 'AOI', 'r', 't', 'eta0', 'etas']])
+
+
+def take(result, index):
+    """Selects samples of a SpectralResult of a one-dimensional sweep."""
+    def pick(value):
+        if np.ndim(value) == 0:
+            return value
+        return np.take(value, index, axis=-1)
+    return SpectralResult(*[pick(getattr(result, a))
+        for a in ['wavelengths', 'AOI', 'r', 't', 'eta0', 'etas']])
+
+
+ADAPTIVE_TOLERANCE = 1e-3
+
+
+def interpolation_error(X, Y):
+    """
+    Estimates the error of linear interpolation on each interval of the
+    sampled curves Y(X), from how far each point deviates from the straight
+    line through its neighbours.
+    """
+    w = (X[1:-1] - X[:-2]) / (X[2:] - X[:-2])
+    line = Y[:-2] + w[:,np.newaxis] * (Y[2:] - Y[:-2])
+    err = np.zeros(len(X))
+    err[1:-1] = np.max(np.abs(Y[1:-1] - line), axis=1)
+    return np.maximum(err[:-1], err[1:])
+
+
+def adaptive_sweep(solve, limits, budget, tolerance=ADAPTIVE_TOLERANCE,
+                   progress=None):
+    """
+    Samples a one-dimensional sweep with at most budget points, starting
+    from a coarse uniform grid and repeatedly bisecting the intervals where
+    the complex reflection amplitudes deviate from linear interpolation by
+    more than tolerance. solve(X) has to return a SpectralResult for the
+    sample points X; progress is called after each refinement round.
+
+    Returns the SpectralResult over all sample points, in ascending order.
+    """
+    X = np.linspace(limits[0], limits[1], min(budget, max(budget // 4, 16)))
+    result = solve(X)
+    min_width = abs(limits[1] - limits[0]) * 1e-9
+    while len(X) < budget:
+        if progress:
+            progress(float(len(X)) / budget)
+        Y = np.concatenate((result.r.real, result.r.imag)).T
+        err = interpolation_error(X, Y)
+        refine = np.nonzero((err > tolerance) & (np.diff(X) > min_width))[0]
+        if len(refine) == 0:
+            break
+        refine = refine[np.argsort(err[refine])[::-1]][:budget - len(X)]
+        Xnew = 0.5 * (X[refine] + X[refine + 1])
+        X = np.concatenate((X, Xnew))
+        result = concatenate([result, solve(Xnew)])
+        order = np.argsort(X)
+        X = X[order]
+        result = take(result, order)
+    return result
+
+
+def amplitude_block(indices, thicknesses, wavelengths, AOI, repeats=()):
+    """r and t of one block of a sweep grid, stacked along the first axis."""
+    return np.array(amplitudes(indices, thicknesses, wavelengths, AOI,
+                               repeats=repeats))
+
+
+def grid_block(a, grid, axis, index):
+    """
+    The part of a, which broadcasts against grid, that lines up with index
+    along axis. Arrays that are constant along axis are passed unchanged.
+    """
+    a = np.asarray(a)
+    a = a.reshape((1,) * (len(grid) - a.ndim) + a.shape)
+    if a.shape[axis] == 1:
+        return a
+    return a[(slice(None),) * axis + (index,)]
+
+
+def solve(coating, wavelengths, AOI=0.0, progress=None, backend=None):
+    """
+    Solves coating over the broadcast grid of wavelengths and AOI and
+    returns a SpectralResult.
+
+    The refractive indices are only evaluated over wavelengths, so sweeping
+    AOI at a single wavelength computes the dispersion just once. Repeated
+    groups of layers are evaluated as matrix powers. Large grids are split
+    along their longest axis across the worker processes of backend, if
+    given.
+    """
+    wavelengths = np.asarray(wavelengths, dtype=float)
+    indices = stack_indices(coating, wavelengths)
+    thicknesses = stack_thicknesses(coating)
+    repeats = stack_repeats(coating)
+    n_sin = np.asarray(indices[0], dtype=complex) * np.sin(np.radians(AOI))
+    _, eta0 = admittance(indices[0], n_sin)
+    _, etas = admittance(indices[-1], n_sin)
+    grid = np.broadcast_shapes(*[np.shape(a) for a in [wavelengths, n_sin] + list(indices)])
+    if backend and grid and backend.parallel(np.prod(grid)):
+        axis = int(np.argmax(grid))
+        def block(index):
+            take = lambda a: grid_block(a, grid, axis, index)
+            return ((slice(None),) * (axis + 2) + (index,), amplitude_block,
+                    ([take(n) for n in indices], thicknesses,
+                     take(wavelengths), take(AOI), repeats))
+        r, t = backend.fill((2, 2) + grid, complex,
+                            [block(b) for b in backend.blocks(grid[axis])],
+                            progress)
+    else:
+        r, t = amplitudes(indices, thicknesses, wavelengths, AOI, progress,
+                          repeats)
+    return SpectralResult(wavelengths, AOI, r, t, eta0, etas)
+
+
+def reflectivity(coating, wavelengths, AOI=0.0):
+    """
+    Reflectivity of coating for s and p polarisation, as an array of the
+    broadcast shape of wavelengths and AOI with a trailing axis of length 2.
+    """
+    return solve(coating, wavelengths, AOI).reflectivity()
+
+
+# number of grid points solved at once by reflectivity_map(); each point
+# needs a few hundred bytes of complex intermediates
+MAP_CHUNK_POINTS = 1 << 17
+
+
+class ReflectivityMap(object):
+    """
+    Reflectivity of a coating over a grid of angles and wavelengths. R has
+    shape (len(AOI), len(wavelengths), 2) with s and p polarisation last.
+    """
+
+    def __init__(self, wavelengths, AOI, R):
+        self.wavelengths = wavelengths
+        self.AOI = AOI
+        self.R = R
+
+    def average(self):
+        return self.R.mean(axis=-1)
+
+
+def reflectivity_block(indices, thicknesses, wavelengths, AOI, repeats=(),
+                       progress=None):
+    """Reflectivity of one block of a grid, with polarisation last."""
+    r, _ = amplitudes(indices, thicknesses, wavelengths, AOI, progress, repeats)
+    return np.moveaxis(np.abs(r)**2, 0, -1)
+
+
+def solve_map(shape, block, chunk_points=MAP_CHUNK_POINTS, progress=None,
+              backend=None):
+    """
+    Fills a reflectivity array of shape (rows, wavelengths, 2) in blocks of
+    at most chunk_points points. block(rows, columns) returns the function
+    and arguments that solve the given slices of the grid; the function
+    must accept a progress keyword. If given, backend solves the blocks in
+    parallel for large grids.
+    """
+    points = shape[0] * shape[1]
+    use_backend = backend and backend.parallel(points)
+    if use_backend:
+        # enough blocks to keep all workers busy
+        parts = backend.workers * parallel.BLOCKS_PER_WORKER
+        chunk_points = min(chunk_points, -(-points // parts))
+    columns = min(shape[1], chunk_points)
+    rows = max(1, chunk_points // max(columns, 1))
+    blocks = [((slice(a, a+rows), slice(w, w+columns)),) +
+              block(slice(a, a+rows), slice(w, w+columns))
+              for a in range(0, shape[0], rows)
+              for w in range(0, shape[1], columns)]
+    shape = tuple(shape) + (2,)
+    if use_backend:
+        return backend.fill(shape, np.float32, blocks, progress)
+
+    R = np.empty(shape, dtype=np.float32)
+    for ii, (index, func, args) in enumerate(blocks):
+        def block_progress(fraction):
+            progress((ii + fraction) / len(blocks))
+        R[index] = func(*args, progress=block_progress if progress else None)
+    return R
+
+
+def reflectivity_map(coating, wavelengths, AOI, chunk_points=MAP_CHUNK_POINTS,
+                     progress=None, backend=None):
+    """
+    Solves coating over the grid spanned by the 1D arrays wavelengths and
+    AOI in blocks of at most chunk_points points, so that only the real
+    reflectivity of the full grid is held in memory. The refractive indices
+    are evaluated once over wavelengths.
+
+    If given, backend solves the blocks in parallel for large grids.
+    """
+    wavelengths = np.asarray(wavelengths, dtype=float)
+    AOI = np.asarray(AOI, dtype=float)
+    indices = stack_indices(coating, wavelengths)
+    thicknesses = stack_thicknesses(coating)
+    repeats = stack_repeats(coating)
+
+    def block(rows, columns):
+        return reflectivity_block, ([n[columns] for n in indices], thicknesses,
+            wavelengths[columns], AOI[rows,np.newaxis], repeats)
+    R = solve_map((len(AOI), len(wavelengths)), block, chunk_points,
+                  progress, backend)
+    return ReflectivityMap(wavelengths, AOI, R)
+
+
+class ShiftMap(object):
+    """
+    Reflectivity of a coating with all layer thicknesses scaled by each of
+    factors. R has shape (len(factors), len(wavelengths), 2) with s and p
+    polarisation last.
+    """
+
+    def __init__(self, wavelengths, factors, AOI, R):
+        self.wavelengths = wavelengths
+        self.factors = factors
+        self.AOI = AOI
+        self.R = R
+
+    def average(self):
+        return self.R.mean(axis=-1)
+
+
+def shifted_block(indices, thicknesses, factors, wavelengths, AOI, repeats=(),
+                  progress=None):
+    """
+    Reflectivity of one block of a shift map, with the thicknesses scaled
+    by factors along the first axis and polarisation last.
+    """
+    thicknesses = [d * factors[:,np.newaxis] for d in thicknesses]
+    r, _ = amplitudes(indices, thicknesses, wavelengths[np.newaxis,:], AOI,
+                      progress, repeats)
+    r = np.broadcast_to(r, (2, len(factors), len(wavelengths)))
+    return np.moveaxis(np.abs(r)**2, 0, -1)
+
+
+def shift_map(coating, wavelengths, factors, AOI=0.0,
+              chunk_points=MAP_CHUNK_POINTS, progress=None, backend=None):
+    """
+    Solves coating over wavelengths with all layer thicknesses scaled by
+    each of factors, in blocks of at most chunk_points points. Scaling
+    keeps repeated groups of layers intact, so they are still evaluated as
+    matrix powers. If given, backend solves the blocks in parallel for
+    large grids.
+    """
+    wavelengths = np.asarray(wavelengths, dtype=float)
+    factors = np.asarray(factors, dtype=float)
+    indices = stack_indices(coating, wavelengths)
+    thicknesses = stack_thicknesses(coating)
+    repeats = stack_repeats(coating)
+
+    def block(rows, columns):
+        return shifted_block, ([n[columns] for n in indices], thicknesses,
+            factors[rows], wavelengths[columns], AOI, repeats)
+    R = solve_map((len(factors), len(wavelengths)), block, chunk_points,
+                  progress, backend)
+    return ShiftMap(wavelengths, factors, AOI, R)
+
+
+# largest number of layers times sweep points that is solved incrementally;
+# a SweepState holds two 2x2 complex matrices for s and p polarisation per
+# layer and point, 256 bytes, so this keeps each state below about 128 MB
+INCREMENTAL_MAX_SIZE = 500000
+
+
+class SweepState(object):
+    """
+    Prefix and suffix products of the layer matrices of a coating over one
+    sweep grid, so that changing a single layer's material or thickness
+    costs one layer's worth of work instead of a full re-solve. The layer
+    matrices themselves are not kept, but recomputed when needed.
+
+    prefix[j] is the product of layers 0..j-1 and suffix[j] that of layers
+    j..N-1, each as (M, scale) with M divided by exp(scale) so that deep
+    stacks cannot overflow; they are normalised every NORMALISE_LAYERS
+    layers, counted from the top for prefixes and from the bottom for
+    suffixes. After an edit only the products adjacent to the edited layer
+    are kept up to date; the others are brought up to date on the next edit.
+
+    A state can also just remember the coating it was last asked for, with
+    prefix None, so that the products are only built on the next edit.
+    """
+
+    def __init__(self, wavelengths, AOI):
+        self.wavelengths = wavelengths
+        self.AOI = AOI
+        self.keys = None
+        self.thicknesses = None
+        self.prefix = None
+
+    def changed_layers(self, keys, thicknesses):
+        """Indices of layers that differ, or None if a rebuild is needed."""
+        if (self.keys is None or len(keys) != len(self.keys) or
+                keys[0] != self.keys[0] or keys[-1] != self.keys[-1]):
+            return None
+        return [j for j in range(len(thicknesses))
+                if keys[j+1] != self.keys[j+1] or
+                   thicknesses[j] != self.thicknesses[j]]
+
+    def remember(self, keys, thicknesses):
+        """Records a coating solved without this state and drops the products."""
+        self.keys = list(keys)
+        self.thicknesses = np.array(thicknesses)
+        self.prefix = self.suffix = None
+
+    @staticmethod
+    def product(a, b, normalised):
+        """Product of two (M, scale) pairs, normalised if requested."""
+        M, scale = multiply(a[0], b[0]), a[1] + b[1]
+        return normalise(M, scale) if normalised else (M, scale)
+
+    def layer(self, k):
+        return (layer_matrix(self.indices[k+1], self.thicknesses[k],
+                             self.wavelengths, self.n_sin), 0.0)
+
+    def prefix_product(self, k):
+        """prefix[k+1] from prefix[k] and the matrix of layer k."""
+        return self.product(self.prefix[k], self.layer(k),
+                            (k + 1) % NORMALISE_LAYERS == 0)
+
+    def suffix_product(self, k):
+        """suffix[k] from the matrix of layer k and suffix[k+1]."""
+        N = len(self.thicknesses)
+        return self.product(self.layer(k), self.suffix[k+1],
+                            (N - k) % NORMALISE_LAYERS == 0)
+
+    def rebuild(self, media, keys, thicknesses, progress=None):
+        # build everything on a new state first, so that a cancelled
+        # rebuild leaves the previous state intact
+        wavelengths = self.wavelengths
+        new = SweepState(wavelengths, self.AOI)
+        new.indices = indices = dispersions.indices(media, wavelengths, keys)
+        new.n_sin = n_sin = np.asarray(indices[0], dtype=complex) * np.sin(np.radians(self.AOI))
+        new.thicknesses = np.array(thicknesses)
+        N = len(thicknesses)
+        new.prefix = [(IDENTITY, 0.0)]
+        for j in range(N):
+            new.prefix.append(new.prefix_product(j))
+            if progress:
+                progress(0.5 * (j + 1) / N)
+        new.suffix = [(IDENTITY, 0.0)] * (N + 1)
+        for j in reversed(range(N)):
+            new.suffix[j] = new.suffix_product(j)
+            if progress:
+                progress(0.5 + 0.5 * (N - j) / N)
+
+        self.keys = list(keys)
+        self.thicknesses = new.thicknesses
+        self.indices = indices
+        self.n_sin = n_sin
+        _, self.eta0 = admittance(indices[0], n_sin)
+        _, self.etas = admittance(indices[-1], n_sin)
+        self.prefix = new.prefix
+        self.suffix = new.suffix
+        self.prefix_valid = N
+        self.suffix_valid = 0
+        self.total = normalise(*self.prefix[N])
+
+    def replace_layer(self, j, material, key, thickness):
+        # bring the products adjacent to layer j up to date; this is only
+        # needed when the previous edit was to a different layer
+        for k in range(self.prefix_valid, j):
+            self.prefix[k+1] = self.prefix_product(k)
+        for k in reversed(range(j + 1, self.suffix_valid)):
+            self.suffix[k] = self.suffix_product(k)
+        self.prefix_valid = j
+        self.suffix_valid = j + 1
+
+        n = dispersions.lookup(material, self.wavelengths, key)
+        self.indices[j+1] = n
+        self.keys[j+1] = key
+        self.thicknesses[j] = thickness
+        self.total = self.product(self.product(self.prefix[j], self.layer(j), False),
+                                  self.suffix[j+1], True)
+
+    def result(self):
+        M, scale = self.total
+        r, t = terminate(M, self.eta0, self.etas)
+        # M was divided by exp(scale); r does not depend on its magnitude
+        return SpectralResult(self.wavelengths, self.AOI, r, t * np.exp(-scale),
+                              self.eta0, self.etas)
+
+
+class IncrementalSolver(object):
+    """
+    Solves coatings while keeping a SweepState for each of the most
+    recently used sweep grids, so that a coarse preview and the full
+    resolution sweep can both be updated incrementally.
+
+    Any change other than to a single layer (superstrate, substrate, number
+    of layers or several layers at once) rebuilds the state, unless the grid
+    is large enough for the process pool of backend: the coating is then
+    solved by solve() in parallel and the state only built on the next
+    single-layer edit. Stacks with repeated groups of layers are solved by
+    solve() as well, which evaluates the groups as matrix powers, as are
+    stacks of more than INCREMENTAL_MAX_SIZE layers times sweep points,
+    since memory grows with both.
+    """
+
+    def __init__(self, grids=2):
+        self.lock = threading.Lock()
+        self.grids = grids
+        self.states = OrderedDict()
+
+    def solve(self, coating, wavelengths, AOI=0.0, progress=None, backend=None):
+        wavelengths = np.asarray(wavelengths, dtype=float)
+        media = stack_materials(coating)
+        keys = material_keys(media)
+        thicknesses = stack_thicknesses(coating)
+        grid = array_key(wavelengths, AOI)
+        points = np.broadcast(wavelengths, AOI).size
+        if (len(thicknesses) * points > INCREMENTAL_MAX_SIZE or
+                find_repeats(list(zip(keys[1:-1], thicknesses.tolist())))):
+            with self.lock:
+                self.states.pop(grid, None)
+            return solve(coating, wavelengths, AOI, progress, backend)
+        parallel = backend is not None and backend.parallel(points)
+
+        with self.lock:
+            state = self.states.pop(grid, None) or SweepState(wavelengths, AOI)
+            self.states[grid] = state
+            while len(self.states) > self.grids:
+                self.states.popitem(last=False)
+
+            changed = state.changed_layers(keys, thicknesses)
+            edit = changed is not None and len(changed) <= 1
+            if state.prefix is not None and edit:
+                if changed:
+                    j = changed[0]
+                    state.replace_layer(j, media[j+1], keys[j+1], thicknesses[j])
+                return state.result()
+            if not parallel or (edit and changed):
+                state.rebuild(media, keys, thicknesses, progress)
+                return state.result()
+            state.remember(keys, thicknesses)
+        return solve(coating, wavelengths, AOI, progress, backend)
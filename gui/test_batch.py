@@ -0,0 +1,43 @@
+#!/usr/bin/env python
+# This work is licensed under the Creative Commons Attribution-NonCommercial-
+# ShareAlike 4.0 International License. To view a copy of this license, visit
+# http://creativecommons.org/licenses/by-nc-sa/4.0/ or send a letter to Creative
+# Commons, PO Box 1866, Mountain View, CA 94042, USA.
+
+import os
+import shutil
+import tempfile
+import numpy as np
+from gui import batch
+import unittest
+
+class TestBatch(unittest.TestCase):
+    """Testing the headless project evaluation"""
+
+    def setUp(self):
+        self.output = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.output)
+
+    def test_output_names(self):
+        self.assertEqual(batch.output_names(['a/x.cgp', 'b/x.cgp', 'y.cgp']),
+                         ['x', 'x_2', 'y'])
+
+    def test_run(self):
+        projects = [batch.DEFAULT_CONFIG, 'does_not_exist.cgp']
+        failed = batch.run(projects, self.output, ['r_lambda', 'EFI'], jobs=1)
+        self.assertEqual(failed, 1)
+
+        with open(os.path.join(self.output, batch.SUMMARY_FILE)) as fp:
+            rows = [line.rstrip('\n').split('\t') for line in fp]
+        self.assertEqual(rows[0], batch.SUMMARY_COLUMNS)
+        self.assertEqual([r[1] for r in rows[1:]], ['ok', 'error'])
+
+        data = np.load(os.path.join(self.output, 'default.r_lambda.npz'))
+        self.assertEqual(data['R'].shape, (len(data['wavelengths']), 2))
+        np.testing.assert_allclose(data['R'] + data['T'], 1.0, atol=1e-9)
+        self.assertTrue(os.path.exists(os.path.join(self.output, 'default.EFI.npz')))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+# This work is licensed under the Creative Commons Attribution-NonCommercial-
+# ShareAlike 4.0 International License. To view a copy of this license, visit
+# http://creativecommons.org/licenses/by-nc-sa/4.0/ or send a letter to Creative
+# Commons, PO Box 1866, Mountain View, CA 94042, USA.
+
+import io
+import numpy as np
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from gui.plots.blit import BlitManager
+import unittest
+
+class TestBlit(unittest.TestCase):
+    """Testing the in-place redraw of plot artists"""
+
+    def setUp(self):
+        self.X = np.linspace(0, 1, 100)
+
+    def figure(self, Y):
+        fig = Figure(figsize=(4, 3), dpi=50)
+        canvas = FigureCanvasAgg(fig)
+        ax = fig.add_subplot(111)
+        lines = ax.plot(self.X, Y)
+        ax.set_ylim(-2, 2)
+        legend = ax.legend(lines, ['a', 'b'])
+        return canvas, lines, legend
+
+    def pixels(self, canvas):
+        return np.asarray(canvas.buffer_rgba()).copy()
+
+    def test_update_matches_full_draw(self):
+        Y1 = np.column_stack((np.sin(3*self.X), np.cos(3*self.X)))
+        Y2 = np.column_stack((np.sin(5*self.X), -np.cos(5*self.X)))
+
+        canvas, lines, legend = self.figure(Y1)
+        blitter = BlitManager(canvas)
+        blitter.add(lines + [legend])
+        canvas.draw()
+        for line, y in zip(lines, Y2.T):
+            line.set_ydata(y)
+        blitter.update()
+
+        reference, _, _ = self.figure(Y2)
+        reference.draw()
+        np.testing.assert_array_equal(self.pixels(canvas), self.pixels(reference))
+
+    def test_static(self):
+        canvas, lines, legend = self.figure(np.zeros((len(self.X), 2)))
+        blitter = BlitManager(canvas)
+        blitter.add(lines)
+        with blitter.static():
+            self.assertFalse(lines[0].get_animated())
+            canvas.print_figure(io.BytesIO(), format='pdf')
+        self.assertTrue(lines[0].get_animated())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+# This work is licensed under the Creative Commons Attribution-NonCommercial-
+# ShareAlike 4.0 International License. To view a copy of this license, visit
+# http://creativecommons.org/licenses/by-nc-sa/4.0/ or send a letter to Creative
+# Commons, PO Box 1866, Mountain View, CA 94042, USA.
+
+import numpy as np
+from gui.cache import ResultCache, fingerprint, nbytes
+from gui.datasets import Dataset
+import unittest
+
+class TestResultCache(unittest.TestCase):
+    """Testing the plot result cache"""
+
+    def test_fingerprint(self):
+        self.assertEqual(fingerprint({'a': 1, 'b': [2, 3]}),
+                         fingerprint({'b': [2, 3], 'a': 1}))
+        self.assertNotEqual(fingerprint({'a': 1}), fingerprint({'a': 2}))
+
+    def test_hits_and_misses(self):
+        cache = ResultCache()
+        self.assertIsNone(cache.get('foo'))
+        cache.put('foo', 42)
+        self.assertEqual(cache.get('foo'), 42)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_lru_eviction(self):
+        data = dict((k, Dataset({'R': np.zeros(100)})) for k in 'abc')
+        cache = ResultCache(maxbytes=2000)
+        cache.put('a', data['a'])
+        cache.put('b', data['b'])
+        cache.get('a')
+        cache.put('c', data['c'])
+        self.assertIsNone(cache.get('b'))
+        self.assertIs(cache.get('a'), data['a'])
+        self.assertIs(cache.get('c'), data['c'])
+        self.assertEqual(cache.size, 1600)
+
+    def test_byte_budget(self):
+        class Result(object):
+            pass
+        result = Result()
+        result.r = np.zeros((10, 2), dtype=complex)
+        small = Dataset({'X': np.zeros(10), 'R': np.zeros((10, 2))}, result=result)
+        self.assertEqual(nbytes(small), 80 + 160 + 320)
+        large = Dataset({'R': np.zeros(1000)})
+        cache = ResultCache(maxbytes=4000)
+        cache.put('small', small)
+        cache.put('large', large)
+        self.assertIsNone(cache.get('small'))
+        # replacing an entry, e.g. with refined data, updates its size
+        cache.put('large', small)
+        cache.put('other', small)
+        self.assertEqual(cache.size, 2 * nbytes(small))
+        # an entry larger than the budget is kept on its own
+        huge = Dataset({'R': np.zeros(10000)})
+        cache.put('huge', huge)
+        self.assertEqual(list(cache.entries), ['huge'])
+        self.assertEqual(cache.size, nbytes(huge))
+
+if __name__ == '__main__':
+    unittest.main()
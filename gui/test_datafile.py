@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+# This work is licensed under the Creative Commons Attribution-NonCommercial-
+# ShareAlike 4.0 International License. To view a copy of this license, visit
+# http://creativecommons.org/licenses/by-nc-sa/4.0/ or send a letter to Creative
+# Commons, PO Box 1866, Mountain View, CA 94042, USA.
+
+import unittest
+import os
+import numpy as np
+from coatingtk.utils import UnreadableFile, UnexpectedFileLayout
+from gui.datafile import TabulatedData, sidecar_name
+
+class TestTabulatedData(unittest.TestCase):
+    """Test the TabulatedData class"""
+
+    def setUp(self):
+        fn = open('tmp_data_file.dat', 'w')
+        fn.write('# comment\n200\t20\n100\t10\n250\t25\n')
+        fn.close()
+
+    def tearDown(self):
+        for fn in ['tmp_data_file.dat', sidecar_name('tmp_data_file.dat')]:
+            if os.path.exists(fn):
+                os.remove(fn)
+
+    def test_nonexisting_file(self):
+        self.assertRaises(UnreadableFile, TabulatedData, 'does_not_exist.dat')
+
+    def test_wrong_shape(self):
+        fn = open('tmp_data_file.dat', 'w')
+        fn.write('100\t10\t20\n')
+        fn.close()
+        self.assertRaises(UnexpectedFileLayout, TabulatedData, 'tmp_data_file.dat')
+
+    def test_vectorised_interpolation(self):
+        td = TabulatedData('tmp_data_file.dat')
+        np.testing.assert_allclose(td.value([-100, 0, 100, 150, 225, 300]),
+                                   [10, 10, 10, 15, 22.5, 25])
+        self.assertAlmostEqual(float(td.value(150)), 15)
+
+    def test_sidecar(self):
+        TabulatedData('tmp_data_file.dat')
+        self.assertTrue(os.path.exists(sidecar_name('tmp_data_file.dat')))
+        td = TabulatedData('tmp_data_file.dat')
+        self.assertIsInstance(td.x, np.memmap)
+        self.assertAlmostEqual(float(td.value(150)), 15)
+
+    def test_sidecar_invalidation(self):
+        TabulatedData('tmp_data_file.dat')
+        fn = open('tmp_data_file.dat', 'w')
+        fn.write('100\t1\n200\t2\n300\t3\n')
+        fn.close()
+        td = TabulatedData('tmp_data_file.dat')
+        self.assertAlmostEqual(float(td.value(150)), 1.5)
+
+if __name__ == '__main__':
+    unittest.main()
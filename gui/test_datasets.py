@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+# This work is licensed under the Creative Commons Attribution-NonCommercial-
+# ShareAlike 4.0 International License. To view a copy of this license, visit
+# http://creativecommons.org/licenses/by-nc-sa/4.0/ or send a letter to Creative
+# Commons, PO Box 1866, Mountain View, CA 94042, USA.
+
+import sys
+import subprocess
+import numpy as np
+from coatingtk.coating import Coating
+from coatingtk.materials import MaterialLibrary
+from coatingtk.utils.config import Config
+from gui import datasets, sweep
+import unittest
+
+class TestDatasets(unittest.TestCase):
+    """Testing the plot data computed without the GUI"""
+
+    def setUp(self):
+        self.config = Config.Instance()
+        self.config.load_default('default.cgp')
+        MaterialLibrary.Instance().load_materials()
+        self.coating = Coating.create_from_config(self.config)
+
+    def test_no_gui_imports(self):
+        code = ('import sys, gui.datasets; '
+                'print(any(m.split(".")[0] in ("qtpy", "PyQt5", "matplotlib") '
+                'for m in sys.modules))')
+        out = subprocess.check_output([sys.executable, '-c', code])
+        self.assertEqual(out.decode().strip(), 'False')
+
+    def test_spectral(self):
+        config = self.config.view('plot.r_lambda')
+        data = datasets.compute('r_lambda', self.coating, config)
+        self.assertEqual(data.plot, 'r_lambda')
+        X = data['wavelengths']
+        self.assertEqual(len(X), config.get('xaxis.steps'))
+        self.assertEqual(data.meta['xlim'], datasets.wavelength_limits(config))
+        R = sweep.reflectivity(self.coating, X)
+        np.testing.assert_allclose(data['R'], R, atol=1e-12)
+        np.testing.assert_allclose(data['R'] + data['T'], 1.0, atol=1e-9)
+
+    def test_max_steps(self):
+        data = datasets.compute('r_map', self.coating,
+                                self.config.view('plot.r_map'), max_steps=20)
+        self.assertEqual(data['R'].shape, (20, 20, 2))
+
+    def test_refine(self):
+        config = self.config.view('plot.r_lambda')
+        data = datasets.compute('r_lambda', self.coating, config)
+        X = data['wavelengths']
+        self.assertFalse(datasets.needs_refinement(data, [0, 1e4], 500))
+        self.assertFalse(datasets.needs_refinement(data, [X[0], X[-1]], 500))
+        view = [X[10], X[20]]
+        self.assertTrue(datasets.needs_refinement(data, view, 500))
+
+        refined = datasets.refine(data, self.coating, config, view, 500)
+        self.assertEqual(refined.plot, 'r_lambda')
+        self.assertEqual(refined.meta, data.meta)
+        XR = refined['wavelengths']
+        self.assertTrue(np.all(np.diff(XR) > 0))
+        self.assertTrue(np.all(np.isin(X, XR)))
+        self.assertEqual(len(XR), len(X) + 500 - 2)
+        np.testing.assert_allclose(refined['R'], sweep.reflectivity(self.coating, XR),
+                                   atol=1e-12)
+        self.assertFalse(datasets.needs_refinement(refined, view, 500))
+
+    def test_tolerance(self):
+        data = datasets.compute('tolerance', self.coating,
+                                self.config.view('plot.tolerance'), max_steps=20)
+        result = data.result
+        for q, R in zip(data['percentiles'], data['R']):
+            for ii, pol in enumerate(['s', 'p', 'avg']):
+                np.testing.assert_allclose(R[:,ii], result.percentiles(q, pol))
+        np.testing.assert_array_equal(data['nominal0'], result.nominal0)
+
+    def test_all_plots(self):
+        for name in datasets.evaluators:
+            data = datasets.compute(name, self.coating,
+                                    self.config.view('plot.'+name), max_steps=10)
+            for key, value in data.arrays.items():
+                self.assertTrue(np.all(np.isfinite(value)), (name, key))
+
+if __name__ == '__main__':
+    unittest.main()
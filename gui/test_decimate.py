@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+# This work is licensed under the Creative Commons Attribution-NonCommercial-
+# ShareAlike 4.0 International License. To view a copy of this license, visit
+# http://creativecommons.org/licenses/by-nc-sa/4.0/ or send a letter to Creative
+# Commons, PO Box 1866, Mountain View, CA 94042, USA.
+
+import numpy as np
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from gui.plots.decimate import minmax, Decimator
+import unittest
+
+class TestDecimate(unittest.TestCase):
+    """Testing the display decimation of dense curves"""
+
+    def setUp(self):
+        self.X = np.linspace(500, 1500, 1000001)
+        self.Y = np.sin(self.X) * np.exp(-((self.X - 1000) / 300)**2)
+        # narrow spike that must survive decimation
+        self.Y[123457] = 5.0
+
+    def test_small(self):
+        X, Y = minmax(self.X[:100], self.Y[:100], 0, 2000, 100)
+        np.testing.assert_array_equal(X, self.X[:100])
+        np.testing.assert_array_equal(Y, self.Y[:100])
+
+    def test_extremes(self):
+        X, Y = minmax(self.X, self.Y, 500, 1500, 800)
+        self.assertLessEqual(len(X), 2 * 800)
+        self.assertTrue(np.all(np.diff(X) >= 0))
+        self.assertEqual(Y.max(), 5.0)
+        self.assertEqual(Y.min(), self.Y.min())
+        self.assertEqual((X[0], X[-1]), (self.X[0], self.X[-1]))
+
+    def test_view(self):
+        X, Y = minmax(self.X, self.Y, 1000, 1001, 800)
+        self.assertLessEqual(X[0], 1000)
+        self.assertGreaterEqual(X[-1], 1001)
+        self.assertLess(X[-1], 1001.01)
+        inside = (self.X >= 1000) & (self.X <= 1001)
+        self.assertEqual(Y.max(), self.Y[inside].max())
+
+    def test_log(self):
+        X = np.logspace(0, 4, 100000)
+        Y = 1 / np.sqrt(X)
+        Xd, Yd = minmax(X, Y, 1, 1e4, 100, log=True)
+        self.assertLessEqual(len(Xd), 200)
+        # equal buckets in log X: each decade gets about the same share
+        counts = np.histogram(np.log10(Xd), bins=4, range=(0, 4))[0]
+        self.assertLess(counts.max() - counts.min(), 6)
+
+    def test_zoom(self):
+        fig = Figure(figsize=(4, 3), dpi=50)
+        FigureCanvasAgg(fig)
+        ax = fig.add_subplot(111)
+        decimator = Decimator(ax)
+        line, = decimator.plot(self.X, self.Y)
+        ax.set_xlim(500, 1500)
+        coarse = len(line.get_xdata())
+        self.assertLessEqual(coarse, 2 * ax.bbox.width)
+        ax.set_xlim(1000, 1001)
+        self.assertGreaterEqual(line.get_xdata()[0], 999.99)
+        X, Y = decimator.full_data(line)
+        self.assertIs(X, self.X)
+        np.testing.assert_array_equal(Y, self.Y)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+# This work is licensed under the Creative Commons Attribution-NonCommercial-
+# ShareAlike 4.0 International License. To view a copy of this license, visit
+# http://creativecommons.org/licenses/by-nc-sa/4.0/ or send a letter to Creative
+# Commons, PO Box 1866, Mountain View, CA 94042, USA.
+
+import numpy as np
+from coatingtk.coating import Coating
+from gui import fields, sweep
+import unittest
+
+class TestFields(unittest.TestCase):
+    """Testing the batched electric field intensity"""
+
+    def setUp(self):
+        self.coating = Coating("1.0", "1.45",
+                               [(1.45, 364.4)] + [(2.1, 127.5), (1.45, 182.2)]*10)
+
+    def test_bare_interface(self):
+        c = Coating("1.0", "1.5", [])
+        result = fields.efi(c, np.array([500.0, 1000.0]), 20)
+        self.assertEqual(result.efi.shape, (2, len(result.depths), 2))
+        substrate = result.depths >= 0
+        np.testing.assert_allclose(result.efi[:,substrate], (2/2.5)**2,
+                                   rtol=1e-12)
+        # standing wave in the superstrate between (1-r)^2 and (1+r)^2
+        superstrate = result.efi[:,~substrate]
+        self.assertGreaterEqual(superstrate.min(), (1-0.2)**2 - 1e-12)
+        self.assertLessEqual(superstrate.max(), (1+0.2)**2 + 1e-12)
+
+    def test_transmitted_intensity(self):
+        X = np.linspace(800, 1300, 11)
+        for AOI in [0.0, 40.0]:
+            result = fields.efi(self.coating, X, 5, AOI)
+            T = sweep.solve(self.coating, X, AOI).transmission()
+            # the EFI is constant in the lossless substrate, and carries
+            # the transmitted power for both polarisations
+            n0, ns = 1.0, 1.45
+            cos0 = np.cos(np.radians(AOI))
+            coss = np.sqrt(1 - (n0 * np.sin(np.radians(AOI)) / ns)**2)
+            E = result.efi[:,-1]
+            Ts = E[0] * ns * coss / (n0 * cos0)
+            Tp = E[1] * ns * coss / (n0 * cos0)
+            np.testing.assert_allclose(Ts, T[:,0], rtol=1e-10)
+            np.testing.assert_allclose(Tp, T[:,1], rtol=1e-10)
+
+    def test_matches_stack_efi(self):
+        # the previous engine, which agrees for both polarisations at
+        # normal incidence
+        stack = self.coating.create_stack(1064.0, AOI=0.0)
+        X = np.array([1064.0])
+        indices = sweep.stack_indices(self.coating, X)
+        thicknesses = sweep.stack_thicknesses(self.coating)
+        for pol, p in [('s', 0), ('p', 1)]:
+            depths, Y = stack.efi(20, pol)
+            I = fields.field_intensity(indices, thicknesses, X, depths)
+            np.testing.assert_allclose(I[p,:,0], Y, rtol=1e-9, atol=1e-12)
+
+    def test_progress_blocks(self):
+        X = np.linspace(800, 1300, 200)
+        expected = fields.efi(self.coating, X, 5)
+        fractions = []
+        chunk = fields.MAP_CHUNK_POINTS
+        try:
+            # blocks of 3 wavelengths
+            fields.MAP_CHUNK_POINTS = 3 * len(expected.depths)
+            result = fields.efi(self.coating, X, 5, progress=fractions.append)
+        finally:
+            fields.MAP_CHUNK_POINTS = chunk
+        np.testing.assert_array_equal(result.efi, expected.efi)
+        self.assertEqual(len(fractions), 67)
+        self.assertEqual(fractions[-1], 1.0)
+        self.assertEqual(fractions, sorted(fractions))
+
+if __name__ == '__main__':
+    unittest.main()
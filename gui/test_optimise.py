@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+# This work is licensed under the Creative Commons Attribution-NonCommercial-
+# ShareAlike 4.0 International License. To view a copy of this license, visit
+# http://creativecommons.org/licenses/by-nc-sa/4.0/ or send a letter to Creative
+# Commons, PO Box 1866, Mountain View, CA 94042, USA.
+
+import numpy as np
+from coatingtk.coating import Coating
+from gui import sweep, optimise
+import unittest
+
+class TestOptimise(unittest.TestCase):
+    """Testing the adjoint gradient and thickness optimisation"""
+
+    def setUp(self):
+        self.coating = Coating("1.0", "1.45",
+                               [(2.1, 130.0), (1.45, 175.0)]*4 + [(2.1, 120.0)])
+        self.X = np.linspace(950, 1150, 21)
+
+    def check_gradient(self, targets):
+        merit = optimise.MeritFunction(self.coating, targets)
+        d = merit.thicknesses
+        _, grad = merit.evaluate(d)
+        h = 1e-4
+        fd = np.array([(merit(d + h*e) - merit(d - h*e)) / (2*h)
+                       for e in np.eye(len(d))])
+        np.testing.assert_allclose(grad, fd, rtol=1e-5, atol=1e-9)
+
+    def test_gradient_R(self):
+        self.check_gradient([optimise.Target('R', self.X, [0.0, 30.0], 1.0, 's'),
+                             optimise.Target('R', self.X, 45.0, 0.9, 'p', '>=')])
+
+    def test_gradient_T(self):
+        self.check_gradient([optimise.Target('T', self.X, [0.0, 20.0], 0.2, 'avg', '<=', 2.0)])
+
+    def test_gradient_phase(self):
+        self.check_gradient([optimise.Target('phase', self.X, 0.0, 90.0, 's'),
+                             optimise.Target('phase', self.X, 45.0, 10.0, 'delta')])
+
+    def test_merit(self):
+        target = optimise.Target('R', self.X, 10.0, 1.0, 'avg')
+        merit = optimise.MeritFunction(self.coating, [target])
+        R = sweep.reflectivity(self.coating, self.X, 10.0).mean(axis=-1)
+        self.assertAlmostEqual(merit(merit.thicknesses), np.mean((R - 1.0)**2), places=12)
+
+    def test_optimise(self):
+        target = optimise.Target('R', [1064.0], 0.0, 0.0)
+        merit = optimise.MeritFunction(self.coating, [target])
+        result = optimise.optimise(merit, starts=3, lower=10.0, iterations=100)
+        self.assertLess(result.merit, 1e-8)
+        self.assertLess(result.merit, result.initial)
+        self.assertTrue(np.all(result.thicknesses >= 10.0))
+        self.assertEqual(result.merit, result.merits.min())
+
+    def test_insertion_sensitivity(self):
+        target = optimise.Target('R', self.X, [0.0, 30.0], 0.5, 'avg')
+        merit = optimise.MeritFunction(self.coating, [target])
+        d = merit.thicknesses
+        layer, position, sensitivity = merit.insertion_sensitivity(d, 3)
+        f0 = merit(d)
+        h = 1e-5
+        for ii in [1, 4, 13, 25]:
+            j, n = layer[ii], 1 - merit.layers[layer[ii]]
+            layers = np.insert(merit.layers, j + 1, [n, merit.layers[j]])
+            thicknesses = np.insert(d, j + 1, [h, d[j] - position[ii]])
+            thicknesses[j] = position[ii]
+            needle = merit.restructure(layers, thicknesses)
+            self.assertAlmostEqual(sensitivity[n, ii], (needle(thicknesses) - f0) / h,
+                                   delta=1e-4 * abs(sensitivity[n, ii]) + 1e-9)
+            self.assertEqual(sensitivity[1 - n, ii], 0.0)
+
+    def test_needle_optimise(self):
+        coating = Coating("1.0", "1.45", [(2.1, 127.5), (1.45, 1000.0)])
+        target = optimise.Target('R', np.linspace(1000, 1100, 11), 0.0, 0.99, 'avg', '>=')
+        merit = optimise.MeritFunction(coating, [target])
+        result = optimise.needle_optimise(merit, needles=6, min_thickness=1.0)
+        self.assertLess(result.merit, result.initial)
+        self.assertGreater(len(result.design), 2)
+        self.assertTrue(all(d >= 1.0 for _, d in result.design))
+        self.assertEqual(result.merit, min(result.history))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+# This work is licensed under the Creative Commons Attribution-NonCommercial-
+# ShareAlike 4.0 International License. To view a copy of this license, visit
+# http://creativecommons.org/licenses/by-nc-sa/4.0/ or send a letter to Creative
+# Commons, PO Box 1866, Mountain View, CA 94042, USA.
+
+import numpy as np
+from coatingtk.coating import Coating
+from gui import parallel, sweep
+import unittest
+
+class TestParallel(unittest.TestCase):
+    """Testing the process pool backend"""
+
+    def setUp(self):
+        self.backend = parallel.ProcessBackend()
+        self.backend.configure(2)
+
+    def tearDown(self):
+        self.backend.shutdown()
+
+    def test_split(self):
+        blocks = parallel.split(10, 3)
+        self.assertEqual(len(blocks), 3)
+        self.assertEqual(np.concatenate([np.arange(10)[b] for b in blocks]).tolist(),
+                         list(range(10)))
+        self.assertEqual(len(parallel.split(2, 8)), 2)
+
+    def test_fill(self):
+        blocks = [((slice(ii, ii+1),), np.full, ((1, 3), float(ii)))
+                  for ii in range(5)]
+        fractions = []
+        for backend in [parallel.ProcessBackend(), self.backend]:
+            out = backend.fill((5, 3), float, blocks, fractions.append)
+            np.testing.assert_array_equal(out, np.repeat(np.arange(5.0), 3).reshape(5, 3))
+            self.assertEqual(fractions[-1], 1.0)
+
+    def test_solve(self):
+        coating = Coating("1.0", "1.45",
+                          [(1.45, 364.4)] + [(2.1, 127.5), (1.45, 182.2)]*10)
+        X = np.linspace(700, 1400, 300)
+        Y = np.linspace(0, 80, 200)[:,np.newaxis]
+        self.assertTrue(self.backend.parallel(X.size * Y.size))
+        result = sweep.solve(coating, X, Y, backend=self.backend)
+        np.testing.assert_allclose(result.r, sweep.solve(coating, X, Y).r, atol=1e-14)
+        R = sweep.reflectivity_map(coating, X, Y[:,0], backend=self.backend).R
+        np.testing.assert_allclose(R, result.reflectivity(), atol=1e-6)
+
+    def test_incremental_solver(self):
+        layers = [(2.1 if j % 2 else 1.45, 100.0 + j) for j in range(10)]
+        X = np.linspace(700, 1400, parallel.MIN_PARALLEL_POINTS)
+        solver = sweep.IncrementalSolver()
+        c = Coating("1.0", "1.45", layers)
+        np.testing.assert_allclose(solver.solve(c, X, backend=self.backend).r,
+                                   sweep.solve(c, X).r, atol=1e-14)
+        # solved by the pool, the products are only built on the first edit
+        state, = solver.states.values()
+        self.assertIsNone(state.prefix)
+        for j in [3, 7]:
+            layers[j] = (1.8, 140.0)
+            c = Coating("1.0", "1.45", layers)
+            np.testing.assert_allclose(solver.solve(c, X, backend=self.backend).r,
+                                       sweep.solve(c, X).r, atol=1e-12)
+            self.assertIsNotNone(state.prefix)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+# This work is licensed under the Creative Commons Attribution-NonCommercial-
+# ShareAlike 4.0 International License. To view a copy of this license, visit
+# http://creativecommons.org/licenses/by-nc-sa/4.0/ or send a letter to Creative
+# Commons, PO Box 1866, Mountain View, CA 94042, USA.
+
+from qtpy.QtCore import Qt
+from gui.stackmodel import StackModel
+import unittest
+
+class TestStackModel(unittest.TestCase):
+    """Testing the array-backed model of the layer table"""
+
+    def setUp(self):
+        self.layers = [['Ta2O5', 266.0], ['SiO2', 127.0]] * 5 + [['1.5', 10.0]]
+        self.blocks = [[2, 2, 4]]
+        self.model = StackModel()
+        self.model.set_stack(self.layers, self.blocks)
+
+    def text(self, row, col):
+        return self.model.data(self.model.index(row, col))
+
+    def test_rows(self):
+        self.assertEqual(self.model.rowCount(), 4)
+        self.assertEqual(self.text(2, 0), '4 x (Ta2O5 SiO2)')
+        self.assertEqual(self.text(2, 1), '1572')
+        self.assertEqual(self.text(3, 0), '1.5')
+        self.assertFalse(self.model.flags(self.model.index(2, 1)) & Qt.ItemIsEditable)
+        self.assertEqual(self.model.get_stack(), (self.layers, self.blocks))
+
+    def test_edit(self):
+        self.assertTrue(self.model.setData(self.model.index(0, 1), '250.5'))
+        self.assertTrue(self.model.setData(self.model.index(3, 0), 'SiO2'))
+        layers, blocks = self.model.get_stack()
+        self.assertEqual(layers[0], ['Ta2O5', 250.5])
+        self.assertEqual(layers[-1], ['SiO2', 10.0])
+        self.assertEqual(blocks, self.blocks)
+
+        failed = []
+        self.model.conversion_failed.connect(failed.append)
+        self.assertFalse(self.model.setData(self.model.index(0, 1), 'abc'))
+        self.assertEqual(failed, ['abc'])
+        self.assertEqual(self.text(0, 1), '250.5')
+
+    def test_edit_in_place(self):
+        layers, blocks = self.model.get_stack()
+        self.model.setData(self.model.index(1, 1), '99')
+        self.assertIs(self.model.get_stack()[0], layers)
+        self.assertEqual(layers[1], ['SiO2', 99.0])
+        self.assertEqual(layers[2:], self.layers[2:])
+        self.assertFalse(self.model.blocks_changed)
+
+        # a layer without thickness drops out, and the group moves up
+        self.model.setData(self.model.index(0, 1), '')
+        self.assertEqual(layers, [['SiO2', 99.0]] + self.layers[2:])
+        self.assertEqual(blocks, [[1, 2, 4]])
+        self.assertTrue(self.model.blocks_changed)
+        self.model.setData(self.model.index(0, 1), '266')
+        self.assertEqual(layers[0], ['Ta2O5', 266.0])
+        self.assertEqual(blocks, [[2, 2, 4]])
+
+    def test_insert_remove(self):
+        self.model.insertRows(1, 1)
+        self.assertEqual(self.model.get_stack(), (self.layers, [[2, 2, 4]]))
+        self.model.setData(self.model.index(1, 0), 'SiO2')
+        self.model.setData(self.model.index(1, 1), '100')
+        layers, blocks = self.model.get_stack()
+        self.assertEqual(layers[1], ['SiO2', 100.0])
+        self.assertEqual(blocks, [[3, 2, 4]])
+
+        self.model.removeRows(0, 2)
+        self.assertEqual(self.model.get_stack(), (self.layers[1:], [[1, 2, 4]]))
+        self.model.removeRows(1, 1)
+        self.assertEqual(self.model.get_stack(), (self.layers[1:2] + self.layers[-1:], []))
+
+    def test_expand(self):
+        self.assertTrue(self.model.expand(2))
+        self.assertFalse(self.model.expand(2))
+        self.assertEqual(self.model.rowCount(), len(self.layers))
+        self.assertEqual(self.model.get_stack(), (self.layers, []))
+
+    def test_large(self):
+        layers = [['SiO2' if ii % 2 else 'Ta2O5', 100.0 + ii] for ii in range(10000)]
+        self.model.set_stack(layers, [])
+        self.assertEqual(self.model.rowCount(), 10000)
+        self.assertEqual(len(self.model.names), 2)
+        self.model.setData(self.model.index(5000, 1), '1.25')
+        layers[5000][1] = 1.25
+        self.assertEqual(self.model.get_stack(), (layers, []))
+
+if __name__ == '__main__':
+    unittest.main()
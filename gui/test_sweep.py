@@ -0,0 +1,210 @@
+#!/usr/bin/env python
+# This work is licensed under the Creative Commons Attribution-NonCommercial-
+# ShareAlike 4.0 International License. To view a copy of this license, visit
+# http://creativecommons.org/licenses/by-nc-sa/4.0/ or send a letter to Creative
+# Commons, PO Box 1866, Mountain View, CA 94042, USA.
+
+import os
+import numpy as np
+from coatingtk.coating import Coating
+from gui import sweep
+from gui.datafile import sidecar_name
+import unittest
+
+
+class FileMaterial(object):
+    """A material with a tabulated refractive index file."""
+
+    def __init__(self, filename):
+        self.name = 'tabulated'
+        self.filename = filename
+
+    def save(self):
+        return {'n_file': self.filename}
+
+class TestSweep(unittest.TestCase):
+    """Testing the batched transfer-matrix engine"""
+
+    def setUp(self):
+        self.coating = Coating("1.0", "1.45",
+                               [(1.45, 364.4)] + [(2.1, 127.5), (1.45, 182.2)]*10)
+
+    def test_bare_interface(self):
+        c = Coating("1.0", "1.5", [])
+        R = sweep.reflectivity(c, np.array([500.0, 1000.0]))
+        self.assertEqual(R.shape, (2, 2))
+        np.testing.assert_allclose(R, ((1.5-1.0)/(1.5+1.0))**2, atol=1e-15)
+
+    def test_matches_create_stack(self):
+        X = np.linspace(700, 1400, 50)
+        for AOI in [0.0, 45.0]:
+            R = sweep.reflectivity(self.coating, X, AOI)
+            for step in range(len(X)):
+                stack = self.coating.create_stack(X[step], AOI=AOI)
+                np.testing.assert_allclose(R[step], stack.reflectivity(),
+                                           rtol=0, atol=1e-12)
+
+    def test_angle_sweep(self):
+        X = np.linspace(0, 89, 90)
+        R = sweep.reflectivity(self.coating, 1064.0, X)
+        self.assertEqual(R.shape, (len(X), 2))
+        for step in range(len(X)):
+            stack = self.coating.create_stack(1064.0, AOI=X[step])
+            np.testing.assert_allclose(R[step], stack.reflectivity(),
+                                       rtol=0, atol=1e-12)
+
+    def test_spectral_result(self):
+        X = np.linspace(700, 1400, 50)
+        result = sweep.solve(self.coating, X, 30.0)
+        R = result.reflectivity()
+        T = result.transmission()
+        self.assertEqual(result.phase().shape, (len(X), 3))
+        np.testing.assert_allclose(R + T, 1.0, atol=1e-12)
+        np.testing.assert_allclose(R, sweep.reflectivity(self.coating, X, 30.0))
+
+    def test_phase_matches_create_stack(self):
+        X = np.linspace(700, 1400, 50)
+        for AOI in [0.0, 45.0]:
+            phase = sweep.solve(self.coating, X, AOI).phase()
+            for step in range(len(X)):
+                stack = self.coating.create_stack(X[step], AOI=AOI)
+                # equal modulo 2 pi, as drawn by the phase plot
+                diff = np.angle(np.exp(1j * (phase[step] - stack.phase())))
+                np.testing.assert_allclose(diff, 0.0, rtol=0, atol=1e-9)
+
+    def test_incremental_solver(self):
+        X = np.linspace(700, 1400, 50)
+        solver = sweep.IncrementalSolver()
+        # graded, since repeated groups are not solved incrementally
+        layers = [(1.45, 364.4)]
+        for j in range(10):
+            layers += [(2.1, 127.5 + j), (1.45, 182.2)]
+        solver.solve(Coating("1.0", "1.45", layers), X, 10.0)
+        for j, layer in [(3, (2.1, 140.0)), (3, (1.8, 140.0)), (15, (2.1, 90.0))]:
+            layers[j] = layer
+            c = Coating("1.0", "1.45", layers)
+            np.testing.assert_allclose(solver.solve(c, X, 10.0).r,
+                                       sweep.solve(c, X, 10.0).r, atol=1e-12)
+        self.assertEqual(len(solver.states), 1)
+
+    def test_incremental_deep_stack(self):
+        X = np.linspace(700, 1400, 50)
+        # slightly graded, so that the 2000 periods don't repeat exactly
+        layers = []
+        for j in range(2000):
+            layers += [(2.1, 127.5 + 1e-3 * j), (1.45, 182.2)]
+        solver = sweep.IncrementalSolver()
+        c = Coating("1.0", "1.45", layers)
+        np.testing.assert_allclose(solver.solve(c, X, 10.0).r,
+                                   sweep.solve(c, X, 10.0).r, atol=1e-12)
+        for j, layer in [(1001, (1.45, 150.0)), (3000, (2.1, 100.0))]:
+            layers[j] = layer
+            c = Coating("1.0", "1.45", layers)
+            result = solver.solve(c, X, 10.0)
+            self.assertTrue(np.all(np.isfinite(result.r)))
+            np.testing.assert_allclose(result.r, sweep.solve(c, X, 10.0).r,
+                                       atol=1e-12)
+
+        # repeated groups are solved as matrix powers
+        c = Coating("1.0", "1.45", [(2.1, 127.5), (1.45, 182.2)] * 2000)
+        np.testing.assert_allclose(solver.solve(c, X, 10.0).r,
+                                   sweep.solve(c, X, 10.0).r, atol=1e-12)
+
+    def test_incremental_size_limit(self):
+        X = np.linspace(700, 1400, 200)
+        N = sweep.INCREMENTAL_MAX_SIZE // len(X) + 1
+        c = Coating("1.0", "1.45", [(2.1 if j % 2 else 1.45, 100.0 + 0.01 * j)
+                                    for j in range(N)])
+        solver = sweep.IncrementalSolver()
+        np.testing.assert_allclose(solver.solve(c, X).r, sweep.solve(c, X).r,
+                                   atol=1e-12)
+        self.assertEqual(len(solver.states), 0)
+
+    def test_adaptive_sweep(self):
+        solve = lambda X: sweep.solve(self.coating, X, 0.0)
+        result = sweep.adaptive_sweep(solve, [700, 1400], 400)
+        X = result.wavelengths
+        self.assertTrue(len(X) <= 400)
+        self.assertTrue(np.all(np.diff(X) > 0))
+        np.testing.assert_allclose(result.r, solve(X).r, atol=1e-12)
+
+    def test_dispersion_table(self):
+        X = np.linspace(700, 1400, 50)
+        table = sweep.DispersionTable()
+        media = sweep.stack_materials(self.coating)
+        indices = table.indices(media, X)
+        self.assertIs(indices[2], indices[4])
+        self.assertIs(table.indices(media, X)[2], indices[2])
+        np.testing.assert_allclose(indices[2], 2.1)
+
+    def data_file(self, text):
+        filename = 'tmp_sweep_data.dat'
+        if not os.path.exists(filename):
+            self.addCleanup(lambda: [os.remove(fn) for fn in
+                                     [filename, sidecar_name(filename)]
+                                     if os.path.exists(fn)])
+        with open(filename, 'w') as fp:
+            fp.write(text)
+        return FileMaterial(filename)
+
+    def test_dispersion_table_memory(self):
+        material = self.data_file('500\t1.5\n1500\t1.6\n')
+        X = np.linspace(700, 1400, 100)
+        table = sweep.DispersionTable(maxbytes=2.5 * X.nbytes)
+        for step in range(3):
+            table.lookup(material, X + step)
+        self.assertEqual(len(table.entries), 2)
+        self.assertEqual(table.size, 2 * X.nbytes)
+        # broadcast indices of constant materials count once
+        n = sweep.dispersion(self.coating.substrate, X)
+        self.assertEqual(sweep.array_nbytes(n), n.itemsize)
+
+    def test_data_file_key(self):
+        material = self.data_file('500\t1.5\n1500\t1.5\n')
+        X = np.linspace(700, 1400, 10)
+        table = sweep.DispersionTable()
+        key = sweep.material_key(material)
+        np.testing.assert_allclose(table.lookup(material, X), 1.5)
+        self.data_file('500\t2.0\n1500\t2.0\n1600\t2.0\n')
+        self.assertNotEqual(sweep.material_key(material), key)
+        np.testing.assert_allclose(table.lookup(material, X), 2.0)
+
+    def test_reflectivity_map(self):
+        X = np.linspace(700, 1400, 101)
+        Y = np.linspace(0, 80, 37)
+        result = sweep.reflectivity_map(self.coating, X, Y, chunk_points=500)
+        self.assertEqual(result.R.shape, (len(Y), len(X), 2))
+        R = sweep.reflectivity(self.coating, X, Y[:,np.newaxis])
+        np.testing.assert_allclose(result.R, R, atol=1e-6)
+        np.testing.assert_allclose(result.average(), R.mean(axis=-1), atol=1e-6)
+
+    def test_shift_map(self):
+        X = np.linspace(700, 1400, 101)
+        factors = np.linspace(0.9, 1.1, 21)
+        result = sweep.shift_map(self.coating, X, factors, 20.0, chunk_points=500)
+        self.assertEqual(result.R.shape, (len(factors), len(X), 2))
+        for ii in [0, 7, 20]:
+            c = Coating("1.0", "1.45", [(l.material.n(1000.0), l.thickness * factors[ii])
+                                        for l in self.coating.layers])
+            np.testing.assert_allclose(result.R[ii], sweep.reflectivity(c, X, 20.0),
+                                       atol=1e-6)
+
+    def test_find_repeats(self):
+        self.assertEqual(sweep.find_repeats(['C'] + ['H', 'L']*10 + ['H']),
+                         [(1, 2, 10)])
+        self.assertEqual(sweep.find_repeats(['H', 'L']*3), [])
+        self.assertEqual(sweep.stack_repeats(self.coating), [(1, 2, 10)])
+
+    def test_repeats(self):
+        c = Coating("1.0", "1.45", [(1.45, 364.4)] + [(2.1, 127.5), (1.45, 182.2)]*1001)
+        X = np.linspace(700, 1400, 71)
+        indices = sweep.stack_indices(c, X)
+        thicknesses = sweep.stack_thicknesses(c)
+        r, t = sweep.amplitudes(indices, thicknesses, X, 30.0)
+        r_rep, t_rep = sweep.amplitudes(indices, thicknesses, X, 30.0,
+                                        repeats=sweep.stack_repeats(c))
+        np.testing.assert_allclose(r_rep, r, rtol=0, atol=1e-9)
+        np.testing.assert_allclose(t_rep, t, rtol=0, atol=1e-9)
+
+if __name__ == '__main__':
+    unittest.main()
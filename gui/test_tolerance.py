@@ -0,0 +1,50 @@
+#!/usr/bin/env python
+# This work is licensed under the Creative Commons Attribution-NonCommercial-
+# ShareAlike 4.0 International License. To view a copy of this license, visit
+# http://creativecommons.org/licenses/by-nc-sa/4.0/ or send a letter to Creative
+# Commons, PO Box 1866, Mountain View, CA 94042, USA.
+
+import numpy as np
+from coatingtk.coating import Coating
+from gui import sweep, tolerance
+import unittest
+
+class TestTolerance(unittest.TestCase):
+    """Testing the Monte Carlo tolerance analysis"""
+
+    def setUp(self):
+        self.coating = Coating("1.0", "1.45",
+                               [(1.45, 364.4)] + [(2.1, 127.5), (1.45, 182.2)]*10)
+        self.X = np.linspace(800, 1300, 51)
+
+    def test_error_model(self):
+        sigma_d, sigma_n = tolerance.error_model(self.coating, 1.0, 0.01,
+            materials={str(self.coating.layers[1].material.name): {'index': 0.02}},
+            layers={1: {'thickness': 0.0}})
+        self.assertEqual(sigma_d[0], 0.0)
+        self.assertEqual(sigma_d[1], 0.01)
+        self.assertEqual(sigma_n[0], 0.01)
+        self.assertEqual(sigma_n[1], 0.02)
+
+    def test_nominal(self):
+        N = len(self.coating.layers)
+        result = tolerance.analyse(self.coating, self.X, 1064.0, 10.0,
+                                   np.zeros(N), np.zeros(N), 4)
+        R = sweep.reflectivity(self.coating, self.X, 10.0)
+        np.testing.assert_allclose(result.nominal, R, atol=1e-12)
+        np.testing.assert_allclose(result.R, np.broadcast_to(R, result.R.shape), atol=1e-6)
+        np.testing.assert_allclose(result.R0, sweep.reflectivity(self.coating, 1064.0, 10.0)
+                                   * np.ones((4, 1)), atol=1e-6)
+
+    def test_reproducible(self):
+        sigma_d, sigma_n = tolerance.error_model(self.coating, 1.0, 0.01)
+        a = tolerance.analyse(self.coating, self.X, 1064.0, 0.0, sigma_d, sigma_n,
+                              30, seed=5)
+        b = tolerance.analyse(self.coating, self.X, 1064.0, 0.0, sigma_d, sigma_n,
+                              30, seed=5, chunk_points=200)
+        np.testing.assert_array_equal(a.R, b.R)
+        self.assertTrue(np.all(a.percentiles(5) <= a.percentiles(95)))
+        self.assertGreater(np.std(a.R0), 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+# This work is licensed under the Creative Commons Attribution-NonCommercial-
+# ShareAlike 4.0 International License. To view a copy of this license, visit
+# http://creativecommons.org/licenses/by-nc-sa/4.0/ or send a letter to Creative
+# Commons, PO Box 1866, Mountain View, CA 94042, USA.
+
+"""
+Monte Carlo tolerance analysis of coatings.
+
+Each sample perturbs the thickness of every layer by a normally distributed
+relative error and its refractive index by a normally distributed absolute
+error. All samples are drawn up front from a seeded generator, so results
+do not depend on how the samples are split into blocks, and all samples of
+a block are solved together with the wavelengths as one broadcast grid.
+"""
+
+import numpy as np
+from . import parallel
+from .sweep import (amplitudes, reflectivity, stack_indices, stack_thicknesses,
+                    MAP_CHUNK_POINTS)
+
+
+def error_model(coating, thickness, index, materials=None, layers=None):
+    """
+    Standard deviations of the relative thickness error and the absolute
+    index error of each layer. thickness is given in percent, index as an
+    absolute change of the refractive index. The defaults are overridden by
+    materials, keyed by material name, and then by layers, keyed by layer
+    number starting at 1; both map to dicts with 'thickness' and/or 'index'.
+    """
+    sigma_d = np.full(len(coating.layers), thickness / 100.0)
+    sigma_n = np.full(len(coating.layers), float(index))
+    materials = materials or {}
+    layers = layers or {}
+    for j, l in enumerate(coating.layers):
+        for errors in [materials.get(str(l.material.name)), layers.get(j + 1)]:
+            if errors:
+                if 'thickness' in errors:
+                    sigma_d[j] = errors['thickness'] / 100.0
+                if 'index' in errors:
+                    sigma_n[j] = errors['index']
+    return sigma_d, sigma_n
+
+
+def perturbed_block(indices, thicknesses, dn, wavelengths, AOI, progress=None):
+    """
+    Reflectivity of a block of perturbed stacks, with shape (samples,
+    wavelengths, 2). thicknesses and dn hold one row per sample.
+    """
+    layers = [indices[j+1][np.newaxis,:] + dn[:,j,np.newaxis]
+              for j in range(dn.shape[1])]
+    r, _ = amplitudes([indices[0]] + layers + [indices[-1]],
+                      [d[:,np.newaxis] for d in thicknesses.T],
+                      wavelengths[np.newaxis,:], AOI, progress)
+    r = np.broadcast_to(r, (2, dn.shape[0], len(wavelengths)))
+    return np.moveaxis(np.abs(r)**2, 0, -1)
+
+
+class ToleranceResult(object):
+    """
+    Reflectivity of the nominal coating and of all samples. nominal has shape
+    (len(wavelengths), 2) and R (samples, len(wavelengths), 2); nominal0 and
+    R0 hold the same at lambda0.
+    """
+
+    def __init__(self, wavelengths, lambda0, nominal, R, nominal0, R0):
+        self.wavelengths = wavelengths
+        self.lambda0 = lambda0
+        self.nominal = nominal
+        self.R = R
+        self.nominal0 = nominal0
+        self.R0 = R0
+
+    @staticmethod
+    def polarisation(R, pol):
+        """Selects 's', 'p' or the average of both from the last axis of R."""
+        if pol == 's':
+            return R[...,0]
+        elif pol == 'p':
+            return R[...,1]
+        return R.mean(axis=-1)
+
+    def percentiles(self, q, pol='avg'):
+        """Percentiles q of the reflectivity over samples, one row per q."""
+        return np.percentile(self.polarisation(self.R, pol), q, axis=0)
+
+    def yield_fraction(self, spec, pol='avg'):
+        """Fraction of samples with a reflectivity of at least spec at lambda0."""
+        return np.mean(self.polarisation(self.R0, pol) >= spec)
+
+
+def analyse(coating, wavelengths, lambda0, AOI, sigma_d, sigma_n, samples,
+            seed=0, chunk_points=MAP_CHUNK_POINTS, progress=None, backend=None):
+    """
+    Reflectivity of samples perturbed versions of coating over wavelengths
+    and at lambda0, with errors drawn from a generator seeded with seed.
+    Samples are solved in blocks of at most chunk_points grid points, in
+    parallel if backend is given and the grid is large enough.
+    """
+    wavelengths = np.asarray(wavelengths, dtype=float)
+    X = np.append(wavelengths, lambda0)
+    indices = stack_indices(coating, X)
+    thicknesses = stack_thicknesses(coating)
+
+    rng = np.random.default_rng(seed)
+    N = len(thicknesses)
+    d = thicknesses * (1 + rng.standard_normal((samples, N)) * sigma_d)
+    d = np.maximum(d, 0.0)
+    dn = rng.standard_normal((samples, N)) * sigma_n
+
+    points = samples * len(X)
+    use_backend = backend and backend.parallel(points)
+    if use_backend:
+        parts = backend.workers * parallel.BLOCKS_PER_WORKER
+        chunk_points = min(chunk_points, -(-points // parts))
+    rows = max(1, chunk_points // len(X))
+    blocks = [((slice(s, s+rows),), perturbed_block,
+               (indices, d[s:s+rows], dn[s:s+rows], X, AOI))
+              for s in range(0, samples, rows)]
+    shape = (samples, len(X), 2)
+    if use_backend:
+        R = backend.fill(shape, np.float32, blocks, progress)
+    else:
+        R = np.empty(shape, dtype=np.float32)
+        for ii, (index, func, args) in enumerate(blocks):
+            def block_progress(fraction):
+                progress((ii + fraction) / len(blocks))
+            R[index] = func(*args, progress=block_progress if progress else None)
+
+    nominal = reflectivity(coating, X, AOI)
+    return ToleranceResult(wavelengths, lambda0, nominal[:-1], R[:,:-1],
+                           nominal[-1], R[:,-1])
@@ -5,9 +5,13 @@
 # Commons, PO Box 1866, Mountain View, CA 94042, USA.
 
 from qtpy.QtCore import QObject
+from qtpy.QtWidgets import QMessageBox
+from coatingtk.coating import Coating
 from coatingtk.utils.config import Config
 from coatingtk.materials import MaterialLibrary
 from .wizardDialog import *
+from .worker import TaskDialog
+from . import optimise, parallel
 
 class Wizard(QObject):
     def __init__(self, parent):
@@ -27,29 +31,89 @@ class Wizard(QObject):
         stack = self.config.get('coating.layers')
         if add_hw_cap:
             stack.append([material2, 2*t_qw2])
+        start = len(stack)
         for ii in range(num_bilayers):
             stack.append([material1, t_qw1])
             stack.append([material2, t_qw2])
 
         self.config.set('coating.layers', stack)
+        if num_bilayers > 1:
+            # keep the bilayers as one group in the stack table
+            blocks = self.config.get('coating.blocks') or []
+            self.config.set('coating.blocks', blocks + [[start, 2, num_bilayers]])
         return True
 
     def shift_stack(self, percentage):
         stack = self.config.get('coating.layers')
         shift = 1.0 + percentage / 100.0
-        stack = [[s[0], round(s[1]*shift,1)] for s in stack]
+        stack = [[s[0], round(s[1]*shift,2)] for s in stack]
         self.config.set('coating.layers', stack)
         return True
 
+    def save_optimiser(self, dlg):
+        options = self.config.view('optimiser')
+        for key in ['targets', 'starts', 'iterations', 'spread',
+                    'min_thickness', 'needles', 'max_layers']:
+            options.set(key, getattr(dlg, key))
+        return options
+
+    def merit_function(self, targets):
+        coating = Coating.create_from_config(self.config)
+        return optimise.MeritFunction(coating,
+            [optimise.Target.from_config(t) for t in targets])
+
+    def optimise_stack(self, options):
+        merit = self.merit_function(options.get('targets'))
+        parallel.backend.configure(self.config.get('parallel.workers'))
+        def task(progress):
+            return optimise.optimise(merit, options.get('starts'),
+                options.get('spread'), options.get('seed'),
+                options.get('min_thickness'), options.get('iterations'),
+                progress, parallel.backend)
+        result = TaskDialog('Optimising layer thicknesses...', self.parent).run(task)
+        if result is None or result.merit >= result.initial:
+            return False
+
+        stack = self.config.get('coating.layers')
+        stack = [[s[0], round(float(d),2)] for s, d in zip(stack, result.thicknesses)]
+        self.config.set('coating.layers', stack)
+        # the optimised layers no longer repeat
+        self.config.set('coating.blocks', [])
+        return True
+
+    def needle_stack(self, options):
+        merit = self.merit_function(options.get('targets'))
+        def task(progress):
+            return optimise.needle_optimise(merit, options.get('needles'),
+                options.get('needle_steps'), options.get('min_thickness'),
+                options.get('iterations'), options.get('max_layers'),
+                progress=progress)
+        result = TaskDialog('Inserting needles...', self.parent).run(task)
+        if result is None or result.merit >= result.initial:
+            return False
+
+        QMessageBox.information(self.parent, 'Needle Optimisation',
+            'Merit reduced from {0:.4g} to {1:.4g} with {2} layers ({3}).'.format(
+                result.initial, result.merit, len(result.design), result.reason))
+        self.config.set('coating.layers',
+                        [[m, round(d,2)] for m, d in result.design])
+        self.config.set('coating.blocks', [])
+        return True
+
     def run(self):
         dlg = WizardDialog(self.parent)
         dlg.load_materials(self.materials)
+        dlg.load_optimiser(self.config.view('optimiser'))
         retval = dlg.exec_()
         if retval == WIZARD_BILAYERS:
             return self.add_bilayers(dlg.num_bilayers,
                 dlg.material1, dlg.material2, dlg.add_hw_cap)
         elif retval == WIZARD_SHIFT:
             return self.shift_stack(dlg.shift_percentage)
+        elif retval == WIZARD_OPTIMISE:
+            return self.optimise_stack(self.save_optimiser(dlg))
+        elif retval == WIZARD_NEEDLE:
+            return self.needle_stack(self.save_optimiser(dlg))
         else:
             return False
 
@@ -4,14 +4,28 @@
 # http://creativecommons.org/licenses/by-nc-sa/4.0/ or send a letter to Creative
 # Commons, PO Box 1866, Mountain View, CA 94042, USA.
 
-from qtpy.QtWidgets import QDialog
-from qtpy.QtCore import Slot
+from qtpy.QtWidgets import QDialog, QTableWidgetItem, QMessageBox
+from qtpy.QtCore import Slot, Qt
 from qtpy import uic
-from .helpers import int_conversion_error, float_conversion_error
+from .helpers import int_conversion_error, float_conversion_error, to_float
+from .optimise import Target
 
 # actions
 WIZARD_BILAYERS = 1
 WIZARD_SHIFT = 2
+WIZARD_OPTIMISE = 3
+WIZARD_NEEDLE = 4
+
+# columns of the optimisation target table
+TARGET_COLUMNS = [
+    ('quantity', None), ('polarisation', None),
+    ('wavelength', 0), ('wavelength', 1), ('wavelength', 2),
+    ('AOI', 0), ('AOI', 1), ('AOI', 2),
+    ('condition', None), ('value', None), ('weight', None),
+]
+NEW_TARGET = {'quantity': 'R', 'polarisation': 'avg',
+              'wavelength': [1000.0, 1100.0, 21], 'AOI': [0.0, 0.0, 1],
+              'condition': '=', 'value': 1.0, 'weight': 1.0}
 
 class WizardDialog(QDialog):
     def __init__(self, parent=None):
@@ -27,12 +41,70 @@ class WizardDialog(QDialog):
         # "shift stack" wizardry
         self.shift_percentage = 0
 
+        # "optimise thicknesses" wizardry
+        self.targets = []
+
     def load_materials(self, materials):
         materials = sorted([m for m in materials.list_materials()])
         self.cbMaterial1.clear()
         self.cbMaterial2.clear()
         self.cbMaterial1.addItems(materials)
         self.cbMaterial2.addItems(materials)
+
+    def load_optimiser(self, options):
+        """Shows the targets and settings of the optimiser config view."""
+        self.sbStarts.setValue(options.get('starts'))
+        self.sbIterations.setValue(options.get('iterations'))
+        self.dsbSpread.setValue(options.get('spread'))
+        self.dsbMinThickness.setValue(options.get('min_thickness'))
+        self.sbNeedles.setValue(options.get('needles'))
+        self.sbMaxLayers.setValue(options.get('max_layers'))
+        self.tblTargets.setRowCount(0)
+        for target in options.get('targets') or []:
+            self.add_target(target)
+        self.tblTargets.resizeColumnsToContents()
+
+    def add_target(self, target):
+        row = self.tblTargets.rowCount()
+        self.tblTargets.insertRow(row)
+        for col, (key, index) in enumerate(TARGET_COLUMNS):
+            value = target[key] if index is None else target[key][index]
+            item = QTableWidgetItem(value if isinstance(value, str) else to_float(value))
+            if not isinstance(value, str):
+                item.setTextAlignment(Qt.AlignRight)
+            self.tblTargets.setItem(row, col, item)
+
+    def read_targets(self):
+        """
+        Returns the targets in the table as config entries, or None after
+        showing an error if one of them is invalid.
+        """
+        targets = []
+        for row in range(self.tblTargets.rowCount()):
+            target = {'wavelength': [0, 0, 0], 'AOI': [0, 0, 0]}
+            for col, (key, index) in enumerate(TARGET_COLUMNS):
+                item = self.tblTargets.item(row, col)
+                text = str(item.text()).strip() if item else ''
+                if key in ['quantity', 'polarisation', 'condition']:
+                    target[key] = text
+                    continue
+                try:
+                    value = float(text)
+                except ValueError:
+                    float_conversion_error(text, self)
+                    return None
+                if index is None:
+                    target[key] = value
+                else:
+                    target[key][index] = int(value) if index == 2 else value
+            try:
+                Target.from_config(target)
+            except ValueError as e:
+                QMessageBox.critical(self, 'Invalid Target',
+                    'Target {0}: {1}'.format(row + 1, e))
+                return None
+            targets.append(target)
+        return targets
     
     # ==== SLOTS ====
 
@@ -68,3 +140,37 @@ class WizardDialog(QDialog):
     @Slot()
     def on_btnShift_clicked(self):
         self.done(WIZARD_SHIFT)
+
+    @Slot()
+    def on_btnAddTarget_clicked(self):
+        self.add_target(NEW_TARGET)
+
+    @Slot()
+    def on_btnRemoveTarget_clicked(self):
+        rows = sorted(set(i.row() for i in self.tblTargets.selectedIndexes()))
+        for row in reversed(rows):
+            self.tblTargets.removeRow(row)
+
+    def accept_optimiser(self, action):
+        targets = self.read_targets()
+        if targets is None:
+            return
+        if not targets:
+            QMessageBox.critical(self, 'Invalid Target', 'No targets defined.')
+            return
+        self.targets = targets
+        self.starts = self.sbStarts.value()
+        self.iterations = self.sbIterations.value()
+        self.spread = self.dsbSpread.value()
+        self.min_thickness = self.dsbMinThickness.value()
+        self.needles = self.sbNeedles.value()
+        self.max_layers = self.sbMaxLayers.value()
+        self.done(action)
+
+    @Slot()
+    def on_btnOptimise_clicked(self):
+        self.accept_optimiser(WIZARD_OPTIMISE)
+
+    @Slot()
+    def on_btnNeedle_clicked(self):
+        self.accept_optimiser(WIZARD_NEEDLE)
@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+# This work is licensed under the Creative Commons Attribution-NonCommercial-
+# ShareAlike 4.0 International License. To view a copy of this license, visit
+# http://creativecommons.org/licenses/by-nc-sa/4.0/ or send a letter to Creative
+# Commons, PO Box 1866, Mountain View, CA 94042, USA.
+
+from qtpy.QtCore import QThread, Signal, Slot, Qt
+from qtpy.QtWidgets import QProgressDialog, QMessageBox
+
+
+class ComputationCancelled(Exception):
+    pass
+
+
+class TaskWorker(QThread):
+    """
+    Runs task(progress) outside the GUI thread and hands its result back
+    through the computed signal. progress raises ComputationCancelled
+    once cancel() has been called.
+    """
+
+    progressed = Signal(float)
+    computed = Signal(object)
+    failed = Signal(str)
+
+    def __init__(self, task, parent=None):
+        super(TaskWorker, self).__init__(parent)
+        self.task = task
+        self.cancelled = False
+
+    def cancel(self):
+        """Requests the computation to stop at the next progress report."""
+        self.cancelled = True
+
+    def report_progress(self, fraction):
+        if self.cancelled:
+            raise ComputationCancelled()
+        self.progressed.emit(fraction)
+
+    def run(self):
+        try:
+            data = self.task(self.report_progress)
+        except ComputationCancelled:
+            return
+        except Exception as e:
+            self.failed.emit(str(e))
+            return
+        if not self.cancelled:
+            self.computed.emit(data)
+
+
+class PlotWorker(TaskWorker):
+    """
+    Runs plot.compute(coating) outside the GUI thread. The Dataset is
+    handed back through the computed signal, so that rendering happens
+    on the main thread.
+    """
+
+    def __init__(self, plot, coating, parent=None):
+        super(PlotWorker, self).__init__(
+            lambda progress: plot.compute(coating, progress), parent)
+        self.plot = plot
+        self.coating = coating
+
+
+class RefineWorker(TaskWorker):
+    """
+    Adds points samples within limits to the Dataset data of plot outside
+    the GUI thread, e.g. for the visible range of a zoomed-in plot. Like
+    PlotWorker, the refined Dataset is handed back through computed.
+    """
+
+    def __init__(self, plot, coating, data, limits, points, parent=None):
+        super(RefineWorker, self).__init__(
+            lambda progress: plot.refine(data, coating, limits, points, progress),
+            parent)
+        self.plot = plot
+        self.coating = coating
+
+
+class TaskDialog(QProgressDialog):
+    """
+    Modal progress dialog for a long-running task, which can be cancelled.
+    run() returns the result of the task, or None if it was cancelled or
+    failed.
+    """
+
+    def __init__(self, label, parent=None):
+        super(TaskDialog, self).__init__(label, 'Cancel', 0, 1000, parent)
+        self.setWindowModality(Qt.WindowModal)
+        self.setAutoClose(False)
+        self.setAutoReset(False)
+        self.setMinimumDuration(0)
+        self.result = None
+        self.error = None
+
+    def run(self, task):
+        worker = TaskWorker(task, self)
+        worker.progressed.connect(self.handle_progress)
+        worker.computed.connect(self.handle_result)
+        worker.failed.connect(self.handle_error)
+        worker.finished.connect(self.accept)
+        self.canceled.connect(worker.cancel)
+        worker.start()
+        self.exec_()
+        worker.cancel()
+        worker.wait()
+        if self.error:
+            QMessageBox.critical(self.parent(), 'Computation Error', self.error)
+        return self.result
+
+    @Slot(float)
+    def handle_progress(self, fraction):
+        self.setValue(int(fraction * self.maximum()))
+
+    @Slot(object)
+    def handle_result(self, data):
+        self.result = data
+
+    @Slot(str)
+    def handle_error(self, message):
+        self.error = message